@@ -21,6 +21,37 @@ class Settings(BaseSettings):
     yolo_model_path: str = "model_files/yolov8n-face.pt"  # Usar modelo específico para rostros
     haar_cascade_path: str = "model_files/haarcascade_frontalface_default.xml"
     confidence_threshold: float = 0.6
+    eager_model_loading: bool = True  # Cargar y calentar modelos al arrancar
+    
+    # Backend del detector de rostros: torch | onnx | openvino
+    detector_backend: str = "torch"
+    detector_onnx_path: str = "model_files/yolov8n-face.onnx"
+    detector_input_size: int = 640  # Entrada fija de los backends ONNX/OpenVINO
+    detector_int8: bool = False  # Usar el modelo ONNX cuantizado a int8
+    
+    # Preprocesado antes de detectar: off | fast | quality | auto
+    preprocess_profile: str = "quality"
+    # En modo auto se mejora la imagen si el brillo o el contraste (0-255) quedan por debajo
+    preprocess_auto_min_brightness: float = 80.0
+    preprocess_auto_min_contrast: float = 35.0
+    
+    # Inferencia multirresolución: detectar sobre una versión reducida y clasificar
+    # recortes a resolución completa (0 / 1 = desactivado)
+    detection_max_width: int = 0  # Ancho máximo del frame que ve el detector
+    decode_reduction: int = 1  # /analyze: decodificar a 1/2, 1/4 u 1/8 para detectar
+    
+    # Ventanas de emociones en memoria: segundos de buckets por sesión (ventana máxima consultable)
+    emotion_window_horizon_seconds: int = 300
+    
+    # Pool de procesos para inferencia de /analyze (0 = hilo en el proceso principal)
+    inference_workers: int = 2
+    inference_max_pending: int = 8  # Por encima se responde 429
+    inference_timeout: float = 10.0  # Segundos antes de responder 503
+    
+    # Micro-lotes de /analyze (latencia a cambio de rendimiento)
+    microbatch_enabled: bool = True
+    microbatch_max_size: int = 8
+    microbatch_max_wait_ms: float = 15.0
     
     # Umbrales por defecto
     frustration_threshold_medium: int = 25
@@ -47,6 +78,36 @@ class Settings(BaseSettings):
     video_fps: int = 15
     frame_width: int = 640
     frame_height: int = 480
+    # Calidad JPEG del stream de video
+    stream_jpeg_quality: int = 85
+    # Dibujar las anotaciones en el servidor si el cliente no indica ?annotated=
+    stream_annotated: bool = True
+    # Fuente de la cámara por defecto: índice de dispositivo o URL (RTSP/HTTP)
+    camera_source: str = "0"
+    
+    # Actualizaciones en vivo por WebSocket (mensajes por segundo por tópico)
+    ws_max_update_rate: float = 4.0
+    # Mensajes en cola por conexión y retraso tolerado antes de desconectar
+    ws_queue_size: int = 32
+    ws_max_lag_seconds: float = 5.0
+    
+    # Pipeline de cámara (colas entre etapas)
+    pipeline_queue_size: int = 2
+    pipeline_drop_oldest: bool = True
+    # Slots del anillo de frames en memoria compartida (0 = desactivado)
+    frame_ring_slots: int = 16
+    
+    # Seguimiento de rostros (evita reclasificar rostros estables)
+    tracker_enabled: bool = True
+    tracker_iou_threshold: float = 0.3
+    tracker_max_missed: int = 10
+    tracker_reclassify_every: int = 15
+    tracker_appearance_threshold: float = 12.0
+    
+    # Detección cada k frames (el tracker interpola entre medias)
+    detection_stride: int = 1
+    max_detection_stride: int = 6
+    adaptive_detection_stride: bool = True
     
     class Config:
         env_file = ".env"
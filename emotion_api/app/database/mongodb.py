@@ -1,6 +1,7 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import MongoClient
 from typing import Optional
+import asyncio
 import logging
 from app.config.settings import settings
 
@@ -47,26 +48,28 @@ async def close_mongo_connection():
         logger.info("Conexión a MongoDB cerrada")
 
 async def create_indexes():
-    """Crea índices para optimizar consultas"""
+    """Crea índices para optimizar consultas (en paralelo)"""
     try:
-        # Índices para sesiones de aula
-        await database.classroomSessions.create_index("teacher_id")
-        await database.classroomSessions.create_index("start_time")
-        await database.classroomSessions.create_index("status")
-        await database.classroomSessions.create_index([("teacher_id", 1), ("start_time", -1)])
-        
-        # Índices para métricas emocionales
-        await database.emotion_metrics.create_index("classroomSessions_id")
-        await database.emotion_metrics.create_index([("classroomSessions_id", 1)])
-        
-        # Nota: La tabla 'alerts' no se utiliza en este proyecto
-        
-        # Nota: Las tablas 'users' y 'config' no se utilizan en este proyecto
-        
-        # Índices para aulas
-        await database.classrooms.create_index("number")
-        await database.classrooms.create_index("name")
-        await database.classrooms.create_index("created_at")
+        await asyncio.gather(
+            # Índices para sesiones de aula
+            database.classroomSessions.create_index("teacher_id"),
+            database.classroomSessions.create_index("start_time"),
+            database.classroomSessions.create_index("status"),
+            database.classroomSessions.create_index([("teacher_id", 1), ("start_time", -1)]),
+            
+            # Índices para métricas emocionales
+            database.emotion_metrics.create_index("classroomSessions_id"),
+            database.emotion_metrics.create_index([("classroomSessions_id", 1)]),
+            
+            # Nota: La tabla 'alerts' no se utiliza en este proyecto
+            
+            # Nota: Las tablas 'users' y 'config' no se utilizan en este proyecto
+            
+            # Índices para aulas
+            database.classrooms.create_index("number"),
+            database.classrooms.create_index("name"),
+            database.classrooms.create_index("created_at"),
+        )
         
         logger.info("Índices de MongoDB creados exitosamente")
         
@@ -1,11 +1,18 @@
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
+import json
 import logging
 from contextlib import asynccontextmanager
 
 from app.config.settings import settings
-from app.database.mongodb import connect_to_mongo, close_mongo_connection
+from app.database.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.services.model_registry import model_registry
+from app.services.inference_pool import inference_service
+from app.services.camera_registry import camera_registry
+from app.services.connection_manager import manager
+from app.services.live_updates import live_updates
 from app.routes import emotion_routes, session_routes, classroom_routes
 
 # Configurar logging
@@ -15,11 +22,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _log_warmup_result(task: asyncio.Task):
+    """Registra el fallo de la carga de modelos en segundo plano (si lo hubo)"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error en la carga de modelos en segundo plano: %s", task.exception())
+
 @asynccontextmanager
 async def lifespan(fastapi_app: FastAPI):
     """Gestiona el ciclo de vida de la aplicación"""
     # Startup
     logger.info("Iniciando Emotion Analysis API...")
+    
+    # Cargar y calentar modelos en segundo plano mientras se conecta la base de datos
+    model_warmup = None
+    if settings.eager_model_loading:
+        model_warmup = asyncio.create_task(asyncio.to_thread(model_registry.load_and_warm))
+        model_warmup.add_done_callback(_log_warmup_result)
+    
+    # Pool de procesos para la inferencia de las rutas HTTP
+    inference_service.start()
+    
     try:
         await connect_to_mongo()
         logger.info("API iniciada exitosamente")
@@ -31,6 +53,11 @@ async def lifespan(fastapi_app: FastAPI):
     
     # Shutdown
     logger.info("Cerrando Emotion Analysis API...")
+    if model_warmup and not model_warmup.done():
+        logger.info("Esperando a que termine la carga de modelos...")
+        await asyncio.wait([model_warmup])
+    camera_registry.stop_all()
+    inference_service.shutdown()
     await close_mongo_connection()
     logger.info("API cerrada exitosamente")
 
@@ -66,41 +93,50 @@ app.include_router(session_routes.router)
 app.include_router(classroom_routes.router)
 
 # WebSocket para comunicación en tiempo real
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception:
-                # Remover conexiones cerradas
-                self.active_connections.remove(connection)
-
-manager = ConnectionManager()
-
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    """
+    Actualizaciones en vivo por tópicos (``camera:<id>``, ``session:<id>``)
+    
+    El cliente envía ``{"action": "subscribe", "topic": "camera:default"}`` (o
+    ``unsubscribe``) o indica ``?topics=a,b`` al conectar. Recibe un mensaje
+    ``snapshot`` con el estado completo y después mensajes ``delta`` con los
+    canales ``distribution``, ``camera_status`` y ``window`` que cambiaron.
+    """
     await manager.connect(websocket)
     try:
+        for topic in filter(None, websocket.query_params.get("topics", "").split(",")):
+            await live_updates.subscribe(websocket, topic.strip())
+        
         while True:
             data = await websocket.receive_text()
-            # Procesar mensaje del cliente si es necesario
-            await manager.send_personal_message(f"Echo: {data}", websocket)
+            try:
+                message = json.loads(data)
+            except ValueError:
+                message = None
+            
+            if isinstance(message, dict) and message.get("action") in ("subscribe", "unsubscribe") and message.get("topic"):
+                if message["action"] == "subscribe":
+                    await live_updates.subscribe(websocket, str(message["topic"]))
+                else:
+                    live_updates.unsubscribe(websocket, str(message["topic"]))
+            else:
+                # Procesar mensaje del cliente si es necesario
+                await manager.send_personal_message(f"Echo: {data}", websocket)
     except WebSocketDisconnect:
+        pass
+    finally:
+        # También da de baja sus suscripciones a tópicos
         manager.disconnect(websocket)
 
+@app.get("/ws/stats")
+async def websocket_stats():
+    """Métricas de las conexiones WebSocket (retraso y colas por cliente) y de los tópicos"""
+    return {
+        **manager.get_stats(),
+        "live_updates": live_updates.get_stats()
+    }
+
 @app.get("/")
 async def root():
     """Endpoint raíz de la API"""
@@ -122,6 +158,39 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: el proceso está vivo y atiende peticiones"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness: modelos calentados y base de datos conectada
+    
+    Sin ``EAGER_MODEL_LOADING`` los modelos se cargan con la primera petición
+    que los usa, así que su estado no bloquea la disponibilidad.
+    """
+    database_connected = False
+    try:
+        db = get_database()
+        if db is not None:
+            await db.command("ping")
+            database_connected = True
+    except Exception as e:
+        logger.warning("Readiness: base de datos no disponible: %s", e)
+    
+    models_ready = model_registry.is_ready() or not settings.eager_model_loading
+    ready = models_ready and database_connected
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "models": model_registry.get_status(),
+            "database_connected": database_connected
+        }
+    )
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Manejador personalizado de excepciones HTTP"""
@@ -1,60 +1,55 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import StreamingResponse
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Optional
 import logging
+from functools import lru_cache
 from datetime import datetime
 import base64
+import json
 import cv2
 import numpy as np
 import asyncio
-import threading
-import time
 
 from app.models.schemas import (
     EmotionAnalysisRequest, EmotionMetric, EmotionDistribution,
     HealthCheck, SessionSummary
 )
-from app.models.yolo_detector import YOLODetector
-from app.models.emotion_classifier import EmotionClassifier
 from app.services.aggregator import EmotionAggregator
+from app.services.emotion_window import session_windows
+from app.services.model_registry import model_registry
+from app.services.inference_pool import (
+    EncodedImage, inference_service, InferenceSaturatedError, InferenceUnavailableError
+)
+from app.services.micro_batcher import analyze_batcher
+from app.services.camera_registry import camera_registry, DEFAULT_CAMERA_ID
+from app.services.frame_broadcaster import StreamProfile
+from app.services.connection_manager import manager
+from app.services.video_transport import VideoSubscription
+from app.utils.image_processing import PREPROCESS_PROFILES
 # AlertService no se utiliza en este proyecto
-from app.services.emotion_storage import emotion_storage
-from app.utils.image_processing import base64_to_image, validate_image
 from app.database.mongodb import get_database
+from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/emotion", tags=["emotion"])
 
-# Variables globales para control de cámara
-camera_active = False
-camera_thread = None
-camera_stop_event = threading.Event()
-current_cap = None
-current_frame = None
-current_session_id = None
+# Tipos de contenido aceptados como frame binario crudo en /analyze-frame
+BINARY_FRAME_CONTENT_TYPES = ("image/jpeg", "image/jpg", "image/png", "application/octet-stream")
+# Subidas multipart hasta este tamaño se leen en el event loop (están en memoria)
+UPLOAD_INLINE_READ_BYTES = 1024 * 1024
 
 # Instancias globales de los servicios
-yolo_detector = None
-emotion_classifier = None
 aggregator = EmotionAggregator()
 # alert_service no se utiliza en este proyecto
 
 def get_yolo_detector():
-    global yolo_detector
-    if yolo_detector is None:
-        try:
-            yolo_detector = YOLODetector()
-        except Exception as e:
-            logger.error(f"Error inicializando YOLO detector: {e}")
-            # Retornar None para manejar el error en camera_worker
-            return None
-    return yolo_detector
+    return model_registry.get_yolo_detector()
 
 def get_emotion_classifier():
-    global emotion_classifier
-    if emotion_classifier is None:
-        emotion_classifier = EmotionClassifier()
-    return emotion_classifier
+    return model_registry.get_emotion_classifier()
+
+def get_batch_classifier():
+    return model_registry.get_batch_classifier()
 
 @router.get("/health", response_model=HealthCheck)
 async def health_check():
@@ -66,10 +61,8 @@ async def health_check():
         await db.command("ping")
         db_connected = True
         
-        # Verificar modelos cargados
-        yolo = get_yolo_detector()
-        classifier = get_emotion_classifier()
-        models_loaded = yolo.is_model_loaded() and classifier.is_model_loaded()
+        # Verificar modelos cargados (sin forzar su carga)
+        models_loaded = model_registry.is_ready()
         
         # Contar sesiones activas
         active_classroomSessions = await db.classroomSessions.count_documents({"status": "active"})
@@ -92,87 +85,110 @@ async def health_check():
             active_sessions=0
         )
 
-@router.post("/analyze", response_model=EmotionMetric)
-async def analyze_emotion(
-    request: EmotionAnalysisRequest,
-    yolo: YOLODetector = Depends(get_yolo_detector),
-    classifier: EmotionClassifier = Depends(get_emotion_classifier)
-):
+async def _read_frame_upload(frame: UploadFile) -> np.ndarray:
+    """
+    Lee el archivo subido directamente en un array uint8
+    
+    ``UploadFile.read`` crea un ``bytes`` nuevo; aquí el archivo temporal se
+    vuelca una sola vez en el array que se decodifica.
     """
-    Analiza un frame de video y devuelve distribución emocional
+    if frame.size is None:
+        return np.frombuffer(await frame.read(), np.uint8)
+    buffer = np.empty(frame.size, dtype=np.uint8)
+    await frame.seek(0)
+    if frame.size > UPLOAD_INLINE_READ_BYTES:
+        # El archivo temporal pasa a disco con subidas grandes: se lee fuera
+        # del event loop, como hace UploadFile.read
+        read = await asyncio.to_thread(frame.file.readinto, buffer)
+    else:
+        read = frame.file.readinto(buffer)
+    return buffer[:read]
+
+async def _analyze_image_data(session_id: str, image_data: EncodedImage) -> EmotionMetric:
+    """
+    Analiza una imagen codificada y guarda la métrica resultante
+    
+    ``image_data`` puede ser ``bytes`` o cualquier buffer (p. ej. un array
+    uint8 sobre el cuerpo de la petición): se decodifica sin copiarlo.
+    
+    La inferencia se ejecuta en el pool de procesos, sin bloquear el event loop;
+    los frames que llegan a la vez se agrupan en un mismo lote.
     """
     try:
-        # Convertir base64 a imagen
-        image = base64_to_image(request.frame_data)
-        if image is None:
-            raise HTTPException(status_code=400, detail="No se pudo procesar la imagen")
-        
-        # Validar imagen
-        if not validate_image(image):
-            raise HTTPException(status_code=400, detail="Imagen inválida")
-        
-        # Detectar rostros
-        faces = yolo.detect_faces(image)
-        if not faces:
-            logger.info("No se detectaron rostros en el frame")
-            return EmotionMetric(
-                session_id=request.session_id,
-                timestamp=datetime.utcnow(),
-                emotion_distribution=EmotionDistribution(
-                    frustracion=0.0,
-                    tristeza=0.0,
-                    enojo=0.0,
-                    desmotivacion=0.0,
-                    atencion_baja=100.0
-                ),
-                total_faces_detected=0,
-                average_confidence=0.0
-            )
-        
-        # Clasificar emociones para cada rostro
-        detections = []
-        total_confidence = 0.0
-        
-        for face_coords in faces:
-            x, y, width, height, confidence = face_coords
-            total_confidence += confidence
-            
-            # Extraer ROI del rostro
-            face_roi = yolo.extract_face_roi(image, (x, y, width, height))
-            if face_roi is not None:
-                # Clasificar emoción
-                emotion, emotion_confidence = classifier.classify_emotion(face_roi)
-                detections.append({
-                    "emotion": emotion,
-                    "confidence": emotion_confidence,
-                    "timestamp": datetime.utcnow()
-                })
-        
-        # Agregar emociones
-        emotion_distribution = aggregator.aggregate_emotions(detections)
-        
-        # Calcular confianza promedio
-        avg_confidence = total_confidence / len(faces) if faces else 0.0
-        
-        # Crear métrica
-        metric = EmotionMetric(
-            session_id=request.session_id,
+        if settings.microbatch_enabled:
+            result = await analyze_batcher.submit(image_data)
+        else:
+            result = await inference_service.analyze(image_data)
+    except InferenceSaturatedError:
+        raise HTTPException(status_code=429, detail="Servicio de inferencia saturado, reintente")
+    except InferenceUnavailableError as e:
+        logger.warning(f"Inferencia no disponible: {e}")
+        raise HTTPException(status_code=503, detail="Servicio de inferencia no disponible")
+    
+    if result["status"] == "decode_error":
+        raise HTTPException(status_code=400, detail="No se pudo procesar la imagen")
+    
+    # Validar imagen
+    if result["status"] == "invalid_image":
+        raise HTTPException(status_code=400, detail="Imagen inválida")
+    
+    detections = result["detections"]
+    if not len(detections):
+        logger.info("No se detectaron rostros en el frame")
+        return EmotionMetric(
+            session_id=session_id,
             timestamp=datetime.utcnow(),
-            emotion_distribution=emotion_distribution,
-            total_faces_detected=len(faces),
-            average_confidence=avg_confidence
+            emotion_distribution=EmotionDistribution(
+                frustracion=0.0,
+                tristeza=0.0,
+                enojo=0.0,
+                desmotivacion=0.0,
+                atencion_baja=100.0
+            ),
+            total_faces_detected=0,
+            average_confidence=0.0
         )
+    
+    # Agregar emociones de todos los rostros (clasificadas en un solo lote);
+    # el lote llega en columnas, sin un objeto por rostro
+    emotion_distribution = aggregator.aggregate_batch(detections)
+    
+    # Calcular confianza promedio
+    avg_confidence = detections.average_detection_confidence()
+    
+    # Crear métrica
+    metric = EmotionMetric(
+        session_id=session_id,
+        timestamp=datetime.utcnow(),
+        emotion_distribution=emotion_distribution,
+        total_faces_detected=len(detections),
+        average_confidence=avg_confidence
+    )
+    
+    # Guardar en base de datos
+    db = get_database()
+    metric_dict = metric.dict()
+    metric_dict["_id"] = None  # MongoDB generará el ID
+    insert_result = await db.emotion_metrics.insert_one(metric_dict)
+    metric.id = str(insert_result.inserted_id)
+    
+    # Nota: Sistema de alertas no implementado en este proyecto
+    
+    return metric
+
+@router.post("/analyze", response_model=EmotionMetric)
+async def analyze_emotion(request: EmotionAnalysisRequest):
+    """
+    Analiza un frame de video (base64 en JSON) y devuelve distribución emocional
+    """
+    try:
+        # Decodificar base64 (la imagen se decodifica en el worker)
+        try:
+            image_data = base64.b64decode(request.frame_data)
+        except Exception:
+            raise HTTPException(status_code=400, detail="No se pudo procesar la imagen")
         
-        # Guardar en base de datos
-        db = get_database()
-        metric_dict = metric.dict()
-        metric_dict["_id"] = None  # MongoDB generará el ID
-        result = await db.emotion_metrics.insert_one(metric_dict)
-        metric.id = str(result.inserted_id)
-        
-        # Nota: Sistema de alertas no implementado en este proyecto
-        
-        return metric
+        return await _analyze_image_data(request.session_id, image_data)
         
     except HTTPException:
         raise
@@ -180,333 +196,455 @@ async def analyze_emotion(
         logger.error(f"Error analizando emoción: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
-
-def camera_worker():
-    """Worker thread para captura de video"""
-    global current_cap, camera_active, current_session_id
+@router.post("/analyze-frame", response_model=EmotionMetric)
+async def analyze_emotion_frame(
+    request: Request,
+    session_id: Optional[str] = None,
+    frame: Optional[UploadFile] = File(None, description="Frame JPEG/PNG (subida multipart)"),
+    form_session_id: Optional[str] = Form(None, alias="session_id")
+):
+    """
+    Analiza un frame binario y devuelve distribución emocional
     
+    Acepta el JPEG/PNG como cuerpo crudo (``Content-Type: image/jpeg``) o como
+    subida multipart (campo ``frame``), sin base64 ni JSON. El cuerpo crudo se
+    decodifica con ``cv2.imdecode`` sobre una vista (``np.frombuffer``), sin
+    copiarlo; la subida multipart se vuelca una vez en el array a decodificar.
+    """
     try:
-        # Crear nueva instancia de cámara
-        current_cap = cv2.VideoCapture(0)
-        
-        if not current_cap.isOpened():
-            logger.error("No se pudo abrir la cámara")
-            camera_active = False
-            return
-        
-        # Configurar resolución de cámara
-        current_cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        current_cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        current_cap.set(cv2.CAP_PROP_FPS, 30)
-        
-        # Obtener instancias de los modelos
-        yolo = get_yolo_detector()
-        emotion_classifier = get_emotion_classifier()
-        
-        if yolo is None:
-            logger.error("No se pudo inicializar YOLO detector")
-            camera_active = False
-            return
-        
-        logger.info("Cámara iniciada correctamente")
-        
-        # Contador para guardar datos cada cierto tiempo
-        frame_count = 0
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        
+        if content_type == "multipart/form-data":
+            if frame is None:
+                raise HTTPException(status_code=400, detail="Falta el archivo 'frame'")
+            image_data = await _read_frame_upload(frame)
+            session_id = session_id or form_session_id
+        elif content_type in BINARY_FRAME_CONTENT_TYPES:
+            image_data = np.frombuffer(await request.body(), np.uint8)
+        else:
+            raise HTTPException(status_code=415, detail="Tipo de contenido no soportado")
         
-        # Inicializar ventana de agregación de 30 segundos
-        logger.info("🚀 Iniciando sistema de agregación de emociones...")
-        emotion_storage.start_aggregation_window()
+        if not session_id:
+            raise HTTPException(status_code=400, detail="Falta session_id")
+        if not image_data.size:
+            raise HTTPException(status_code=400, detail="No se pudo procesar la imagen")
         
-        # Inicializar conexión a base de datos
-        logger.info("🔗 Inicializando conexión a base de datos...")
-        emotion_storage.initialize()
+        return await _analyze_image_data(session_id, image_data)
         
-        while camera_active and not camera_stop_event.is_set():
-            ret, frame = current_cap.read()
-            if not ret:
-                logger.warning("No se pudo leer frame de la cámara")
-                break
-            
-            frame_count += 1
-            
-            # Preprocesar frame
-            frame = yolo.preprocess_frame(frame)
-            
-            # Detectar rostros con YOLO
-            faces = yolo.detect_faces(frame)
-            
-            # Dibujar información del sistema
-            cv2.putText(frame, "YOLO + DeepFace Detection", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(frame, f"N. Rostros: {len(faces)}", (10, 60), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            
-            # Procesar cada rostro detectado
-            for i, (x, y, w, h, confidence) in enumerate(faces):
-                # Extraer ROI del rostro
-                face_roi = yolo.extract_face_roi(frame, (x, y, w, h))
-                
-                if face_roi is not None and face_roi.size > 0:
-                    # Clasificar emoción con DeepFace
-                    emotion, emotion_confidence = emotion_classifier.classify_emotion(face_roi)
-                    
-                    # Agregar emoción al sistema de agregación de 30 segundos
-                    if current_session_id:
-                        emotion_storage.add_emotion_to_aggregation(emotion, emotion_confidence)
-                        logger.debug(f"Emoción agregada: {emotion} ({emotion_confidence:.2f}) - Total: {emotion_storage.total_detections}")
-                    
-                    # Definir colores según la emoción (emociones en español)
-                    color_map = {
-                        "enojo": (0, 0, 255),            # Rojo
-                        "tristeza": (255, 0, 0),         # Azul
-                        "asco": (0, 255, 255),           # Amarillo
-                        "miedo": (128, 0, 128),          # Púrpura
-                        "felicidad": (0, 255, 0),        # Verde
-                        "sorpresa": (255, 165, 0),       # Naranja
-                        "neutral": (128, 128, 128)       # Gris
-                    }
-                    
-                    color = color_map.get(emotion, (0, 255, 0))  # Verde por defecto
-                    
-                    # Dibujar rectángulo alrededor del rostro
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), color, 3)
-                    
-                    # Dibujar etiqueta de emoción
-                    label = f"{emotion.replace('_', ' ').title()}: {emotion_confidence:.2f}"
-                    label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-                    
-                    # Fondo para el texto
-                    cv2.rectangle(frame, (x, y-35), (x + label_size[0] + 10, y-5), color, -1)
-                    
-                    # Texto de la emoción
-                    cv2.putText(frame, label, (x+5, y-15), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    
-                    # Información de confianza YOLO
-                    yolo_label = f"YOLO: {confidence:.2f}"
-                    cv2.putText(frame, yolo_label, (x+5, y+h+20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            
-            # Mostrar mensaje si no hay rostros
-            if len(faces) == 0:
-                cv2.putText(frame, "Rostros no detectados", (10, 100), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                cv2.putText(frame, "La posicion del rostro debe estar en frente de la camara", (10, 130), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-            
-            # Verificar si debe guardar agregación cada 30 segundos
-            if current_session_id and emotion_storage.should_save_aggregation():
-                logger.info(f"💾 Guardando agregación - Detecciones: {emotion_storage.total_detections}")
-                try:
-                    emotion_storage.save_emotion_aggregation(current_session_id)
-                    logger.info("✅ Agregación guardada exitosamente")
-                except Exception as e:
-                    logger.error(f"❌ Error guardando agregación de 30 segundos: {e}")
-                    import traceback
-                    traceback.print_exc()
-            elif not current_session_id:
-                # Log cada 100 frames si no hay sesión activa
-                if frame_count % 100 == 0:
-                    logger.warning("⚠️ No hay sesión activa - Los datos no se están guardando")
-            
-            # Almacenar frame para el stream
-            global current_frame
-            current_frame = frame
-            
-            # Control de FPS
-            time.sleep(0.033)  # ~30 FPS
-            
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error en worker de cámara: {e}")
-    finally:
-        if current_cap:
-            current_cap.release()
-            current_cap = None
-        camera_active = False
-        logger.info("Cámara detenida")
+        logger.error(f"Error analizando frame binario: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
 
-def generate_frames():
-    """Genera frames de video con detección de emociones en tiempo real"""
-    global current_frame, camera_active
-    
-    # Esperar a que la cámara esté activa
-    max_wait = 10  # 10 segundos máximo
-    wait_count = 0
-    
-    while not camera_active and wait_count < max_wait:
-        time.sleep(0.1)
-        wait_count += 1
-    
-    if not camera_active:
+
+@lru_cache(maxsize=None)
+def _placeholder_jpeg(kind: str) -> bytes:
+    """Frame de espera o de error codificado una sola vez"""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    if kind == "error":
         # Frame de error si no se puede iniciar
-        frame = np.zeros((480, 640, 3), dtype=np.uint8)
         cv2.putText(frame, "Error: Camara no disponible", (150, 200), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
         cv2.putText(frame, "Presiona 'Iniciar Camara'", (180, 240), 
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        if ret:
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    else:
+        # Frame de espera
+        cv2.putText(frame, "Iniciando camara...", (200, 240), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return buffer.tobytes()
+
+def _mjpeg_part(frame_bytes: bytes, seq: int = 0) -> bytes:
+    # X-Frame-Seq permite al cliente emparejar el frame con sus metadatos de overlay
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n'
+            b'X-Frame-Seq: ' + str(seq).encode() + b'\r\n\r\n' + frame_bytes + b'\r\n')
+
+async def generate_frames(camera_id: str = DEFAULT_CAMERA_ID, profile: Optional[StreamProfile] = None):
+    """
+    Genera frames de video con detección de emociones en tiempo real
+    
+    Cada cliente espera la notificación de un frame nuevo (sin sondeo ni
+    hilos bloqueados) y nunca recibe dos veces el mismo frame.
+    
+    Args:
+        camera_id: Cámara a transmitir
+        profile: Ancho máximo, FPS y calidad negociados por el cliente
+    """
+    entry = camera_registry.get_or_create(camera_id)
+    broadcaster = entry.broadcaster
+    profile = profile or broadcaster.default_profile
+    min_interval = 1.0 / profile.fps if profile.fps > 0 else 0.0
+    loop = asyncio.get_running_loop()
+    
+    # Esperar a que la cámara esté activa (start() notifica al broadcaster)
+    if not entry.active:
+        await broadcaster.wait_for_version(broadcaster.version, timeout=1.0)
+    
+    if not entry.active:
+        yield _mjpeg_part(_placeholder_jpeg("error"))
         return
     
-    # Generar frames mientras la cámara esté activa
-    while camera_active:
-        if current_frame is not None:
-            # Codificar frame como JPEG
-            ret, buffer = cv2.imencode('.jpg', current_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        else:
-            # Frame de espera
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            cv2.putText(frame, "Iniciando camara...", (200, 240), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        time.sleep(0.033)  # ~30 FPS
+    # Cada frame se codifica una vez y se comparte entre todos los clientes
+    broadcaster.subscribe(profile)
+    try:
+        last_version = 0
+        next_due = 0.0
+        sent_placeholder = False
+        
+        # Generar frames mientras la cámara esté activa
+        while entry.active:
+            # Límite de FPS del cliente: los frames intermedios se saltan
+            delay = next_due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            version = await broadcaster.wait_for_version(last_version, timeout=1.0)
+            if version == last_version:
+                continue
+            
+            encoded = await broadcaster.get_jpeg_async(profile)
+            last_version = encoded.version
+            if encoded.data is not None:
+                sent_placeholder = False
+                next_due = loop.time() + min_interval
+                yield _mjpeg_part(encoded.data, encoded.seq)
+            elif not sent_placeholder and entry.active:
+                sent_placeholder = True
+                yield _mjpeg_part(_placeholder_jpeg("waiting"))
+    finally:
+        broadcaster.unsubscribe(profile)
 
 @router.get("/video-stream")
-async def video_stream():
+async def video_stream(
+    max_width: Optional[int] = None,
+    fps: Optional[float] = None,
+    quality: Optional[int] = None,
+    annotated: Optional[bool] = None
+):
+    """
+    Stream de video en tiempo real con detección de emociones (cámara por defecto)
     """
-    Stream de video en tiempo real con detección de emociones
+    return await camera_video_stream(DEFAULT_CAMERA_ID, max_width, fps, quality, annotated)
+
+@router.get("/cameras/{camera_id}/video-stream")
+async def camera_video_stream(
+    camera_id: str,
+    max_width: Optional[int] = None,
+    fps: Optional[float] = None,
+    quality: Optional[int] = None,
+    annotated: Optional[bool] = None
+):
+    """
+    Stream de video en tiempo real con detección de emociones de una cámara
+    
+    Args:
+        max_width: Ancho máximo del frame (p. ej. 320 para miniaturas)
+        fps: FPS máximos para este cliente
+        quality: Calidad JPEG (10-95)
+        annotated: Dibujar las anotaciones en el servidor; con ``false`` el
+            frame llega limpio y el cliente dibuja con ``/overlay``
+    
+    Los clientes con el mismo ancho, calidad y anotación comparten la misma codificación.
     """
     try:
+        entry = camera_registry.get_or_create(camera_id)
+        profile = entry.broadcaster.profile(max_width, fps, quality, annotated)
         return StreamingResponse(
-            generate_frames(),
+            generate_frames(camera_id, profile),
             media_type="multipart/x-mixed-replace; boundary=frame"
         )
     except Exception as e:
         logger.error(f"Error iniciando stream de video: {e}")
         raise HTTPException(status_code=500, detail="Error iniciando cámara")
 
+async def generate_overlay(camera_id: str):
+    """Emite (Server-Sent Events) los metadatos de cada frame nuevo de una cámara"""
+    entry = camera_registry.get_or_create(camera_id)
+    broadcaster = entry.broadcaster
+    last_version = 0
+    
+    while entry.active:
+        version = await broadcaster.wait_for_version(last_version, timeout=15.0)
+        if version == last_version:
+            # Comentario keep-alive para proxies
+            yield ": keep-alive\n\n"
+            continue
+        
+        last_version, snapshot, frame_size = broadcaster.latest_metadata()
+        if snapshot is not None:
+            yield f"data: {json.dumps(snapshot.to_overlay(frame_size))}\n\n"
+
+@router.get("/cameras/{camera_id}/overlay")
+async def camera_overlay(camera_id: str):
+    """
+    Canal de metadatos por frame (cajas, emociones, confianzas y frame_seq)
+    
+    Permite al cliente dibujar las anotaciones sobre el stream limpio
+    (``/video-stream?annotated=false``), emparejando por ``X-Frame-Seq``.
+    """
+    if camera_registry.get(camera_id) is None:
+        raise HTTPException(status_code=404, detail=f"Cámara no registrada: {camera_id}")
+    
+    return StreamingResponse(
+        generate_overlay(camera_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def _parse_bool(value) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).lower() in ("1", "true", "yes", "si", "sí")
+
+@router.websocket("/ws/video")
+async def video_websocket(websocket: WebSocket):
+    """
+    Video por WebSocket: frames JPEG binarios con cámara y secuencia de frame
+    
+    Varias cámaras por conexión. Al conectar: ``?cameras=a,b`` más el perfil
+    (``max_width``, ``fps``, ``quality``, ``annotated``, ``adaptive``). Después:
+    ``{"action": "subscribe", "camera_id": "a", "max_width": 320, ...}``,
+    ``{"action": "unsubscribe", "camera_id": "a"}`` o ``{"action": "stats"}``.
+    Un cliente atrasado sólo recibe el frame más reciente de cada cámara.
+    """
+    await manager.connect(websocket)
+    subscriptions = {}
+    
+    def subscribe(camera_id: str, params: dict):
+        entry = camera_registry.get_or_create(camera_id)
+        previous = subscriptions.pop(camera_id, None)
+        if previous is not None:
+            previous.stop()
+        profile = entry.broadcaster.profile(
+            params.get("max_width"), params.get("fps"), params.get("quality"),
+            _parse_bool(params.get("annotated"))
+        )
+        subscription = VideoSubscription(
+            manager, websocket, camera_id, entry, profile,
+            adaptive=bool(_parse_bool(params.get("adaptive")))
+        )
+        subscription.start()
+        subscriptions[camera_id] = subscription
+    
+    try:
+        params = dict(websocket.query_params)
+        for camera_id in filter(None, params.get("cameras", "").split(",")):
+            subscribe(camera_id.strip(), params)
+        
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                continue
+            
+            action = message.get("action")
+            camera_id = str(message.get("camera_id") or DEFAULT_CAMERA_ID)
+            if action == "subscribe":
+                subscribe(camera_id, message)
+            elif action == "unsubscribe" and camera_id in subscriptions:
+                subscriptions.pop(camera_id).stop()
+            elif action == "stats":
+                manager.send(websocket, {
+                    "type": "stats",
+                    "subscriptions": [subscription.get_stats() for subscription in subscriptions.values()]
+                })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for subscription in subscriptions.values():
+            subscription.stop()
+        manager.disconnect(websocket)
+
 @router.post("/start-camera")
 async def start_camera():
     """
-    Inicia la cámara y verifica que esté funcionando
+    Inicia la cámara por defecto y verifica que esté funcionando
+    """
+    return await start_camera_by_id(DEFAULT_CAMERA_ID)
+
+@router.post("/cameras/{camera_id}/start")
+async def start_camera_by_id(camera_id: str, source: Optional[str] = None, preprocess: Optional[str] = None):
     """
-    global camera_active, camera_thread, camera_stop_event
+    Inicia una cámara (registrándola si no existe)
+    
+    Args:
+        camera_id: Aula o sesión asociada a la cámara
+        source: Índice de dispositivo o URL de la cámara (opcional)
+        preprocess: Perfil de preprocesado según la iluminación del aula
+            (off | fast | quality | auto; opcional)
+    """
+    if preprocess is not None and preprocess not in PREPROCESS_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Perfil de preprocesado no válido: {preprocess}")
     
     try:
-        if camera_active:
-            return {"message": "Cámara ya está activa", "status": "active"}
-        
-        # Detener cualquier proceso anterior
-        if camera_thread and camera_thread.is_alive():
-            camera_stop_event.set()
-            camera_thread.join(timeout=2)
+        entry = camera_registry.get_or_create(camera_id, source)
         
-        # Limpiar frame anterior
-        current_frame = None
+        # start() puede esperar al hilo anterior: fuera del event loop
+        if not await asyncio.to_thread(entry.start, source, preprocess):
+            return {"message": "Cámara ya está activa", "status": "active", "camera_id": camera_id}
         
-        # Resetear eventos
-        camera_stop_event.clear()
-        camera_active = True
+        # Esperar al primer frame (o a que el worker falle) sin bloquear el event loop
+        await entry.broadcaster.wait_for_version(entry.broadcaster.version, timeout=1.0)
         
-        # Iniciar nuevo thread de cámara
-        camera_thread = threading.Thread(target=camera_worker, daemon=True)
-        camera_thread.start()
-        
-        # Esperar un momento para que la cámara se inicialice
-        time.sleep(1)
-        
-        return {"message": "Cámara iniciada correctamente", "status": "active"}
+        return {"message": "Cámara iniciada correctamente", "status": "active", "camera_id": camera_id}
     except Exception as e:
-        logger.error(f"Error iniciando cámara: {e}")
-        camera_active = False
+        logger.error(f"Error iniciando cámara {camera_id}: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.post("/stop-camera")
 async def stop_camera():
     """
-    Detiene la cámara
+    Detiene la cámara por defecto
+    """
+    return await stop_camera_by_id(DEFAULT_CAMERA_ID)
+
+@router.post("/cameras/{camera_id}/stop")
+async def stop_camera_by_id(camera_id: str):
+    """
+    Detiene una cámara
     """
-    global camera_active, camera_thread, camera_stop_event, current_frame
-    
     try:
-        if not camera_active:
-            return {"message": "Cámara ya está detenida", "status": "stopped"}
-        
-        # Detener la cámara
-        camera_active = False
-        camera_stop_event.set()
-        
-        # Limpiar frame actual
-        current_frame = None
+        entry = camera_registry.get(camera_id)
+        if entry is None or not await asyncio.to_thread(entry.stop):
+            return {"message": "Cámara ya está detenida", "status": "stopped", "camera_id": camera_id}
         
-        # Esperar a que el thread termine
-        if camera_thread and camera_thread.is_alive():
-            camera_thread.join(timeout=3)
-        
-        # Limpiar referencias
-        camera_thread = None
-        
-        return {"message": "Cámara detenida correctamente", "status": "stopped"}
+        return {"message": "Cámara detenida correctamente", "status": "stopped", "camera_id": camera_id}
     except Exception as e:
-        logger.error(f"Error deteniendo cámara: {e}")
+        logger.error(f"Error deteniendo cámara {camera_id}: {e}")
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+@router.get("/inference-stats")
+async def get_inference_stats():
+    """
+    Obtiene métricas del servicio de inferencia y de los micro-lotes
+    """
+    return {
+        **inference_service.get_stats(),
+        "microbatching": analyze_batcher.get_stats() if settings.microbatch_enabled else None
+    }
+
+@router.get("/cameras")
+async def list_cameras():
+    """
+    Lista las cámaras registradas y su estado
+    """
+    return {"cameras": camera_registry.list_status()}
+
 @router.get("/camera-status")
 async def get_camera_status():
     """
-    Obtiene el estado actual de la cámara
+    Obtiene el estado actual de la cámara por defecto
+    """
+    return await get_camera_status_by_id(DEFAULT_CAMERA_ID)
+
+def _encode_raw_snapshot(entry, attempts: int = 3):
     """
-    global camera_active, camera_thread
+    Codifica el último frame del anillo y comprueba que no se reescribió
     
-    return {
-        "active": camera_active,
-        "thread_alive": camera_thread.is_alive() if camera_thread else False,
-        "status": "active" if camera_active else "stopped"
-    }
+    La captura no espera a los lectores: si el slot cambia durante la
+    codificación, el JPEG mezcla dos frames y se reintenta con el más reciente.
+    
+    Returns:
+        (seq, JPEG); (0, None) si no hay frames
+    """
+    for _ in range(attempts):
+        seq, frame = entry.read_latest_raw()
+        if frame is None:
+            return 0, None
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        del frame
+        if not ret:
+            raise HTTPException(status_code=500, detail="Error codificando frame")
+        if entry.is_raw_frame_valid(seq):
+            return seq, buffer.tobytes()
+    raise HTTPException(status_code=503, detail="El frame se sobrescribió durante la codificación")
+
+@router.get("/cameras/{camera_id}/snapshot")
+async def get_camera_snapshot(camera_id: str):
+    """
+    Último frame capturado por una cámara, sin anotaciones, como JPEG
+    
+    Se codifica directamente desde el anillo de frames compartido, sin copiar
+    el frame, en un hilo para no bloquear el event loop.
+    """
+    entry = camera_registry.get(camera_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Cámara no registrada: {camera_id}")
+    
+    seq, data = await asyncio.to_thread(_encode_raw_snapshot, entry)
+    if data is None:
+        raise HTTPException(status_code=404, detail="No hay frames disponibles")
+    
+    return Response(content=data, media_type="image/jpeg", headers={"X-Frame-Seq": str(seq)})
+
+@router.get("/cameras/{camera_id}/status")
+async def get_camera_status_by_id(camera_id: str):
+    """
+    Obtiene el estado actual de una cámara
+    """
+    entry = camera_registry.get(camera_id)
+    if entry is None:
+        return {
+            "camera_id": camera_id,
+            "active": False,
+            "thread_alive": False,
+            "status": "stopped",
+            "pipeline": None
+        }
+    return entry.get_status()
 
 @router.post("/create-session")
 async def create_session(session_data: dict):
     """
     Crea una nueva sesión de análisis de emociones
-    """
-    global current_session_id
     
+    La sesión se asocia a la cámara ``camera_id`` (por defecto, la cámara por defecto).
+    """
     logger.info(f"📝 Creando sesión con datos: {session_data}")
     
+    camera_id = session_data.get("camera_id", DEFAULT_CAMERA_ID)
+    entry = camera_registry.get_or_create(camera_id)
+    
     try:
-        if not current_session_id:
+        if not entry.session_id:
             # Crear nueva sesión
             from bson import ObjectId
             session_id = ObjectId()
-            current_session_id = str(session_id)
             
             # Guardar sesión en la base de datos
-            db = await get_database()
+            db = get_database()
             session_doc = {
                 "_id": session_id,
                 "classroom_id": session_data.get("classroom_id", "default_classroom"),
                 "classroom_name": session_data.get("classroom_name", "Aula Demo"),
                 "subject": session_data.get("subject", "General"),
                 "student_count": session_data.get("student_count", 0),
+                "camera_id": camera_id,
                 "start_time": datetime.utcnow(),
                 "status": "active",
                 "created_at": datetime.utcnow()
             }
             
             await db.classroomSessions.insert_one(session_doc)
+            # Guarda la ventana pendiente en MongoDB: fuera del event loop
+            await asyncio.to_thread(entry.set_session, str(session_id))
             
-            logger.info(f"✅ Sesión creada exitosamente: {current_session_id}")
+            logger.info(f"✅ Sesión creada exitosamente: {entry.session_id} (cámara {camera_id})")
             
             return {
                 "session_id": str(session_id),
+                "camera_id": camera_id,
                 "message": "Sesión creada correctamente",
                 "status": "active"
             }
         else:
             return {
-                "session_id": current_session_id,
+                "session_id": entry.session_id,
+                "camera_id": camera_id,
                 "message": "Ya hay una sesión activa",
                 "status": "active"
             }
@@ -516,18 +654,18 @@ async def create_session(session_data: dict):
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.post("/end-session")
-async def end_session():
+async def end_session(camera_id: str = DEFAULT_CAMERA_ID):
     """
-    Termina la sesión actual
+    Termina la sesión actual de una cámara
     """
-    global current_session_id
+    entry = camera_registry.get(camera_id)
     
     try:
-        if current_session_id:
+        if entry and entry.session_id:
             # Actualizar sesión en la base de datos
-            db = await get_database()
+            db = get_database()
             await db.classroomSessions.update_one(
-                {"_id": current_session_id},
+                {"_id": entry.session_id},
                 {
                     "$set": {
                         "end_time": datetime.utcnow(),
@@ -537,11 +675,12 @@ async def end_session():
                 }
             )
             
-            session_id = current_session_id
-            current_session_id = None
+            session_id = entry.session_id
+            await asyncio.to_thread(entry.set_session, None)
             
             return {
                 "session_id": session_id,
+                "camera_id": camera_id,
                 "message": "Sesión terminada correctamente",
                 "status": "completed"
             }
@@ -556,226 +695,60 @@ async def end_session():
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 @router.get("/emotion-distribution")
-async def get_emotion_distribution():
+async def get_emotion_distribution(window: int = 10, session_id: Optional[str] = None):
     """
     Obtiene la distribución emocional en tiempo real desde el stream de video
+    
+    Se calcula en memoria con los buckets por segundo de la sesión (sin
+    consultar la base de datos). ``window`` son los segundos que abarca
+    (p. ej. 10, 30 o 300, hasta EMOTION_WINDOW_HORIZON_SECONDS); sin
+    ``session_id`` se usa la sesión de la cámara por defecto.
     """
+    default_camera = camera_registry.get(DEFAULT_CAMERA_ID)
+    camera_active = default_camera is not None and default_camera.active
+    
     try:
-        # Si la cámara no está activa, devolver datos vacíos
-        if not camera_active:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-        # Obtener datos de la sesión activa más reciente
-        db = get_database()
-        active_classroomSession = await db.classroomSessions.find_one(
-            {"status": "active"},
-            sort=[("start_time", -1)]
-        )
-        
-        if not active_classroomSession:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-        # Obtener las últimas detecciones de los últimos 10 segundos
-        from datetime import datetime, timedelta
-        ten_seconds_ago = datetime.utcnow() - timedelta(seconds=10)
-        
-        recent_detections = await db.emotion_metrics.find(
-            {
-                "session_id": active_classroomSession["_id"],
-                "timestamp": {"$gte": ten_seconds_ago}
-            },
-            sort=[("timestamp", -1)]
-        ).to_list(50)  # Últimas 50 detecciones
-        
-        if not recent_detections:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-        # Procesar detecciones recientes
-        emotion_counts = {
-            "felicidad": 0,
-            "tristeza": 0,
-            "enojo": 0,
-            "neutral": 0
-        }
-        total_detections = 0
-        
-        for detection in recent_detections:
-            if "emotion_distribution" in detection:
-                emotion_dist = detection["emotion_distribution"]
-                total_detections += detection.get("total_faces_detected", 0)
-                
-                # Mapear las emociones del sistema a nuestro formato
-                if "frustracion" in emotion_dist:
-                    emotion_counts["enojo"] += emotion_dist.get("frustracion", 0)
-                if "tristeza" in emotion_dist:
-                    emotion_counts["tristeza"] += emotion_dist.get("tristeza", 0)
-                if "desmotivacion" in emotion_dist:
-                    emotion_counts["tristeza"] += emotion_dist.get("desmotivacion", 0)
-                if "atencion_baja" in emotion_dist:
-                    emotion_counts["neutral"] += emotion_dist.get("atencion_baja", 0)
-        
-        # Calcular porcentajes
-        total_emotions = sum(emotion_counts.values())
-        
-        if total_emotions > 0:
-            return {
-                "felicidad": {
-                    "percentage": round((emotion_counts["felicidad"] / total_emotions) * 100, 1),
-                    "count": int(emotion_counts["felicidad"])
-                },
-                "tristeza": {
-                    "percentage": round((emotion_counts["tristeza"] / total_emotions) * 100, 1),
-                    "count": int(emotion_counts["tristeza"])
-                },
-                "enojo": {
-                    "percentage": round((emotion_counts["enojo"] / total_emotions) * 100, 1),
-                    "count": int(emotion_counts["enojo"])
-                },
-                "neutral": {
-                    "percentage": round((emotion_counts["neutral"] / total_emotions) * 100, 1),
-                    "count": int(emotion_counts["neutral"])
-                },
-                "total_detections": total_detections,
-                "camera_active": camera_active
-            }
-        else:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": total_detections,
-                "camera_active": camera_active
-            }
+        if session_id is None:
+            # Si la cámara no está activa, devolver datos vacíos
+            if not camera_active:
+                return {**session_windows.distribution(None, window), "camera_active": camera_active}
+            
+            session_id = default_camera.session_id
+            if session_id is None:
+                # Sesión activa más reciente (creada fuera de esta cámara)
+                db = get_database()
+                active_classroomSession = await db.classroomSessions.find_one(
+                    {"status": "active"},
+                    sort=[("start_time", -1)]
+                )
+                session_id = str(active_classroomSession["_id"]) if active_classroomSession else None
+        
+        return {**session_windows.distribution(session_id, window), "camera_active": camera_active}
         
     except Exception as e:
         logger.error(f"Error obteniendo distribución emocional: {e}")
-        return {
-            "felicidad": {"percentage": 0, "count": 0},
-            "tristeza": {"percentage": 0, "count": 0},
-            "enojo": {"percentage": 0, "count": 0},
-            "neutral": {"percentage": 0, "count": 0},
-            "total_detections": 0,
-            "camera_active": camera_active
-        }
+        return {**session_windows.distribution(None, window), "camera_active": camera_active}
 
 @router.get("/realtime-emotions")
 async def get_realtime_emotions():
     """
-    Obtiene las emociones detectadas en tiempo real desde el frame actual
+    Obtiene las emociones del último frame procesado por la cámara por defecto
     """
-    try:
-        if not camera_active or current_frame is None:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-        # Procesar el frame actual
-        yolo = get_yolo_detector()
-        classifier = get_emotion_classifier()
-        
-        # Detectar rostros en el frame actual
-        faces = yolo.detect_faces(current_frame)
-        
-        if not faces:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-        # Clasificar emociones para cada rostro
-        emotion_counts = {
-            "felicidad": 0,
-            "tristeza": 0,
-            "enojo": 0,
-            "neutral": 0
-        }
-        
-        for face_coords in faces:
-            x, y, width, height, confidence = face_coords
-            
-            # Extraer ROI del rostro
-            face_roi = yolo.extract_face_roi(current_frame, (x, y, width, height))
-            if face_roi is not None:
-                # Clasificar emoción
-                emotion, emotion_confidence = classifier.classify_emotion(face_roi)
-                
-                # Mapear emociones del sistema a nuestro formato
-                if emotion in ["felicidad", "alegria", "satisfaccion"]:
-                    emotion_counts["felicidad"] += 1
-                elif emotion in ["tristeza", "desmotivacion", "depresion"]:
-                    emotion_counts["tristeza"] += 1
-                elif emotion in ["enojo", "frustracion", "ira"]:
-                    emotion_counts["enojo"] += 1
-                else:
-                    emotion_counts["neutral"] += 1
-        
-        # Calcular porcentajes
-        total_faces = len(faces)
-        
-        if total_faces > 0:
-            return {
-                "felicidad": {
-                    "percentage": round((emotion_counts["felicidad"] / total_faces) * 100, 1),
-                    "count": emotion_counts["felicidad"]
-                },
-                "tristeza": {
-                    "percentage": round((emotion_counts["tristeza"] / total_faces) * 100, 1),
-                    "count": emotion_counts["tristeza"]
-                },
-                "enojo": {
-                    "percentage": round((emotion_counts["enojo"] / total_faces) * 100, 1),
-                    "count": emotion_counts["enojo"]
-                },
-                "neutral": {
-                    "percentage": round((emotion_counts["neutral"] / total_faces) * 100, 1),
-                    "count": emotion_counts["neutral"]
-                },
-                "total_detections": total_faces,
-                "camera_active": camera_active
-            }
-        else:
-            return {
-                "felicidad": {"percentage": 0, "count": 0},
-                "tristeza": {"percentage": 0, "count": 0},
-                "enojo": {"percentage": 0, "count": 0},
-                "neutral": {"percentage": 0, "count": 0},
-                "total_detections": 0,
-                "camera_active": camera_active
-            }
-        
-    except Exception as e:
-        logger.error(f"Error obteniendo emociones en tiempo real: {e}")
+    return await get_camera_realtime_emotions(DEFAULT_CAMERA_ID)
+
+@router.get("/cameras/{camera_id}/realtime-emotions")
+async def get_camera_realtime_emotions(camera_id: str):
+    """
+    Obtiene las emociones del último frame procesado por el worker de una cámara
+    
+    Lee la instantánea publicada por el pipeline en lugar de volver a ejecutar
+    la inferencia, por lo que coincide con lo que muestra el stream.
+    """
+    entry = camera_registry.get(camera_id)
+    camera_active = entry is not None and entry.active
+    snapshot = entry.snapshots.latest() if entry else None
+    
+    if not camera_active or snapshot is None:
         return {
             "felicidad": {"percentage": 0, "count": 0},
             "tristeza": {"percentage": 0, "count": 0},
@@ -784,6 +757,8 @@ async def get_realtime_emotions():
             "total_detections": 0,
             "camera_active": camera_active
         }
+    
+    return {**snapshot.to_response(), "camera_active": camera_active}
 
 @router.get("/current-stats")
 async def get_current_stats():
@@ -1,7 +1,10 @@
 from typing import List, Dict, Any, Optional
 import logging
+import numpy as np
 from app.models.schemas import EmotionDistribution, SessionSummary
 from app.database.mongodb import get_database
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_labels import METRIC_CATEGORIES, METRIC_MATRIX, encode_labels, label_counts
 
 logger = logging.getLogger(__name__)
 
@@ -19,53 +22,39 @@ class EmotionAggregator:
         Returns:
             Distribución emocional agregada
         """
-        try:
-            if not detections:
-                return EmotionDistribution(
-                    frustracion=0.0,
-                    tristeza=0.0,
-                    enojo=0.0,
-                    desmotivacion=0.0,
-                    atencion_baja=0.0
-                )
-            
-            # Contar emociones
-            emotion_counts = {
-                "frustracion": 0,
-                "tristeza": 0,
-                "enojo": 0,
-                "desmotivacion": 0,
-                "atencion_baja": 0
-            }
-            
-            total_detections = len(detections)
+        label_ids = encode_labels(detection.get("emotion", "atencion_baja") for detection in detections)
+        return self.aggregate_label_ids(label_ids)
+    
+    def aggregate_batch(self, detections: DetectionBatch) -> EmotionDistribution:
+        """Agrega las emociones clasificadas de un lote de detecciones de un frame"""
+        label_ids, _ = detections.classified_emotions()
+        return self.aggregate_label_ids(label_ids)
+    
+    def aggregate_label_ids(self, label_ids: np.ndarray) -> EmotionDistribution:
+        """
+        Agrega detecciones codificadas como identificadores de etiqueta
+        
+        Args:
+            label_ids: Identificadores del registro de etiquetas (uno por rostro)
             
-            for detection in detections:
-                emotion = detection.get("emotion", "atencion_baja")
-                if emotion in emotion_counts:
-                    emotion_counts[emotion] += 1
+        Returns:
+            Distribución emocional agregada (porcentaje de rostros por categoría)
+        """
+        try:
+            total_detections = len(label_ids)
+            if not total_detections:
+                return EmotionDistribution(**{category: 0.0 for category in METRIC_CATEGORIES})
             
-            # Calcular porcentajes
-            distribution = EmotionDistribution(
-                frustracion=(emotion_counts["frustracion"] / total_detections) * 100,
-                tristeza=(emotion_counts["tristeza"] / total_detections) * 100,
-                enojo=(emotion_counts["enojo"] / total_detections) * 100,
-                desmotivacion=(emotion_counts["desmotivacion"] / total_detections) * 100,
-                atencion_baja=(emotion_counts["atencion_baja"] / total_detections) * 100
-            )
+            # Conteo por etiqueta y proyección a las categorías de la métrica
+            percentages = label_counts(label_ids) @ METRIC_MATRIX * (100.0 / total_detections)
+            distribution = EmotionDistribution(**dict(zip(METRIC_CATEGORIES, percentages.tolist())))
             
             logger.debug(f"Agregadas {total_detections} detecciones en distribución emocional")
             return distribution
             
         except Exception as e:
             logger.error(f"Error agregando emociones: {e}")
-            return EmotionDistribution(
-                frustracion=0.0,
-                tristeza=0.0,
-                enojo=0.0,
-                desmotivacion=0.0,
-                atencion_baja=0.0
-            )
+            return EmotionDistribution(**{category: 0.0 for category in METRIC_CATEGORIES})
     
     
     def get_session_summary(self, session_id: str) -> Optional[SessionSummary]:
@@ -115,20 +104,14 @@ class EmotionAggregator:
                 duration = session["end_time"] - session["start_time"]
                 duration_minutes = int(duration.total_seconds() / 60)
             
-            # Calcular distribución emocional promedio
-            total_frustracion = sum(m.get("emotion_distribution", {}).get("frustracion", 0) for m in metrics)
-            total_tristeza = sum(m.get("emotion_distribution", {}).get("tristeza", 0) for m in metrics)
-            total_enojo = sum(m.get("emotion_distribution", {}).get("enojo", 0) for m in metrics)
-            total_desmotivacion = sum(m.get("emotion_distribution", {}).get("desmotivacion", 0) for m in metrics)
-            total_atencion_baja = sum(m.get("emotion_distribution", {}).get("atencion_baja", 0) for m in metrics)
-            
+            # Calcular distribución emocional promedio (una fila por métrica)
             num_metrics = len(metrics)
+            distributions = np.array([
+                [m.get("emotion_distribution", {}).get(category, 0) for category in METRIC_CATEGORIES]
+                for m in metrics
+            ], dtype=np.float64)
             avg_distribution = EmotionDistribution(
-                frustracion=total_frustracion / num_metrics,
-                tristeza=total_tristeza / num_metrics,
-                enojo=total_enojo / num_metrics,
-                desmotivacion=total_desmotivacion / num_metrics,
-                atencion_baja=total_atencion_baja / num_metrics
+                **dict(zip(METRIC_CATEGORIES, distributions.mean(axis=0).tolist()))
             )
             
             # Sistema de alertas no implementado
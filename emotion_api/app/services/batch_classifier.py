@@ -0,0 +1,183 @@
+"""
+Clasificación de emociones por lotes (todos los rostros de un frame en una sola inferencia)
+"""
+
+import threading
+from typing import List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from app.services.emotion_labels import CLASSIFIER_LABELS
+from app.utils.buffer_pool import buffer_pool
+
+logger = logging.getLogger(__name__)
+
+
+class BatchEmotionClassifier:
+    """
+    Clasifica una lista de rostros con una sola pasada del modelo de emociones.
+
+    Si el modelo de DeepFace no se puede construir, se recurre a
+    ``EmotionClassifier.classify_emotion`` rostro por rostro. El lote se
+    prepara como lo hace el modelo Emotion de DeepFace para un solo rostro
+    (gris, 48x48 con interpolación bilineal, escala 0-1), de modo que ambos
+    caminos dan la misma etiqueta y confianza.
+    """
+
+    INPUT_SIZE = 48
+
+    def __init__(self, classifier=None):
+        self.classifier = classifier
+        self.model = None
+        self._lock = threading.Lock()
+        self._load_model()
+
+    def _load_model(self):
+        """Construye el modelo de emociones de DeepFace"""
+        try:
+            from deepface import DeepFace
+
+            try:
+                client = DeepFace.build_model(task="facial_attribute", model_name="Emotion")
+            except TypeError:
+                # Versiones anteriores de DeepFace
+                client = DeepFace.build_model("Emotion")
+
+            # Las versiones recientes devuelven un cliente que envuelve el modelo Keras
+            self.model = getattr(client, "model", client)
+            logger.info("Modelo de emociones por lotes cargado correctamente")
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el modelo por lotes, se usará clasificación individual: {e}")
+            self.model = None
+
+    def is_model_loaded(self) -> bool:
+        """Indica si hay algún camino de clasificación disponible"""
+        return self.model is not None or self.classifier is not None
+
+    def _prepare_batch(self, face_rois: List[np.ndarray]) -> np.ndarray:
+        """
+        Apila los rostros en un tensor (N, 48, 48, 1) normalizado
+
+        El tensor y los buffers intermedios salen del pool de buffers: cada
+        rostro se reduce a 48x48 antes de pasarlo a gris, así ningún paso
+        depende del tamaño (variable) del recorte. Ambas operaciones son
+        lineales, así que el orden sólo cambia el redondeo respecto a DeepFace.
+
+        Args:
+            face_rois: Lista de regiones de rostro BGR
+
+        Returns:
+            Tensor listo para el modelo (válido hasta el siguiente lote del mismo hilo)
+        """
+        size = self.INPUT_SIZE
+        batch = buffer_pool.get_batch("emotion_batch", len(face_rois), (size, size, 1))
+        resized = buffer_pool.get("emotion_face", (size, size, 3))
+        gray = buffer_pool.get("emotion_gray", (size, size))
+
+        for i, roi in enumerate(face_rois):
+            if roi.ndim == 2:
+                cv2.resize(roi, (size, size), dst=gray, interpolation=cv2.INTER_LINEAR)
+            else:
+                cv2.resize(roi, (size, size), dst=resized, interpolation=cv2.INTER_LINEAR)
+                cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY, dst=gray)
+            batch[i, :, :, 0] = gray
+
+        batch *= 1.0 / 255.0
+        return batch
+
+    def classify_batch(self, face_rois: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """
+        Clasifica todos los rostros de un frame
+
+        Args:
+            face_rois: Lista de regiones de rostro BGR o en gris
+
+        Returns:
+            Lista de tuplas (emoción, confianza 0-1) en el mismo orden que la
+            entrada; los recortes vacíos o inválidos quedan como ("neutral", 0.0)
+        """
+        valid = [i for i, roi in enumerate(face_rois) if is_valid_roi(roi)]
+        results = [("neutral", 0.0)] * len(face_rois)
+        if not valid:
+            return results
+
+        rois = [face_rois[i] for i in valid]
+        for i, result in zip(valid, self._classify_valid(rois)):
+            results[i] = result
+        return results
+
+    def _classify_valid(self, face_rois: List[np.ndarray]) -> List[Tuple[str, float]]:
+        if self.model is None:
+            return self._classify_individually(face_rois)
+
+        try:
+            batch = self._prepare_batch(face_rois)
+
+            with self._lock:
+                predictions = np.asarray(self.model.predict_on_batch(batch))
+
+            # Normalizar por fila (equivalente a DeepFace.analyze)
+            totals = predictions.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            probabilities = predictions / totals
+
+            best = probabilities.argmax(axis=1)
+            results = []
+            for row, label_index in enumerate(best):
+                emotion = CLASSIFIER_LABELS[label_index]
+                results.append((emotion, float(probabilities[row, label_index])))
+
+            return results
+
+        except Exception as e:
+            logger.error(f"Error clasificando lote de {len(face_rois)} rostros: {e}")
+            return self._classify_individually(face_rois)
+
+    def _classify_individually(self, face_rois: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """Camino de respaldo: una llamada al clasificador por rostro"""
+        if self.classifier is None:
+            return [("neutral", 0.0) for _ in face_rois]
+
+        results = []
+        for roi in face_rois:
+            try:
+                results.append(self.classifier.classify_emotion(roi))
+            except Exception as e:
+                logger.error(f"Error clasificando rostro: {e}")
+                results.append(("neutral", 0.0))
+        return results
+
+
+def is_valid_roi(roi: Optional[np.ndarray]) -> bool:
+    """True si el recorte es una imagen no vacía en gris o BGR"""
+    return (
+        roi is not None
+        and roi.size > 0
+        and (roi.ndim == 2 or (roi.ndim == 3 and roi.shape[2] == 3))
+    )
+
+
+def extract_face_rois(yolo, image: np.ndarray, faces: List[tuple]) -> Tuple[List[int], List[np.ndarray]]:
+    """
+    Extrae las regiones de rostro válidas de un frame
+
+    Args:
+        yolo: Detector con ``extract_face_roi``
+        image: Frame completo
+        faces: Detecciones (x, y, width, height, confidence)
+
+    Returns:
+        Índices de las detecciones válidas y sus regiones de rostro
+    """
+    indices = []
+    rois = []
+
+    for i, (x, y, width, height, _confidence) in enumerate(faces):
+        face_roi: Optional[np.ndarray] = yolo.extract_face_roi(image, (x, y, width, height))
+        if face_roi is not None and face_roi.size > 0:
+            indices.append(i)
+            rois.append(face_roi)
+
+    return indices, rois
@@ -0,0 +1,563 @@
+"""
+Pipeline de cámara por etapas: captura, detección, clasificación, anotación y persistencia
+
+Cada etapa corre en su propio hilo y se comunica con la siguiente mediante
+colas acotadas, de modo que el rendimiento lo fija la etapa más lenta y no
+la suma de todas. Con un tracker, el detector puede ejecutarse sólo cada k
+frames; k se ajusta a partir de la latencia medida para alcanzar los FPS
+objetivo.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from app.services.batch_classifier import extract_face_rois
+from app.services.detection_batch import DetectionBatch
+from app.services.face_tracker import FaceTracker
+from app.services.realtime_snapshot import FrameSnapshot, SnapshotStore
+from app.utils.buffer_pool import buffer_pool
+from app.utils.image_processing import downscale_to_width, preprocess_for_detection, scale_detections
+from app.utils.shared_frame_ring import FrameRingReader, SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+# Colores según la emoción (emociones en español)
+EMOTION_COLORS = {
+    "enojo": (0, 0, 255),            # Rojo
+    "tristeza": (255, 0, 0),         # Azul
+    "asco": (0, 255, 255),           # Amarillo
+    "miedo": (128, 0, 128),          # Púrpura
+    "felicidad": (0, 255, 0),        # Verde
+    "sorpresa": (255, 165, 0),       # Naranja
+    "neutral": (128, 128, 128)       # Gris
+}
+
+
+class FrameQueue:
+    """
+    Cola acotada entre etapas
+
+    Con ``drop_oldest`` activo, ``put`` nunca bloquea: si la cola está llena
+    se descarta el elemento más antiguo. Sin él, ``put`` espera hueco.
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = True):
+        self.maxsize = max(1, maxsize)
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Encola un elemento; devuelve False si no hubo hueco a tiempo"""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout):
+                    return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Desencola un elemento o devuelve None si se agota el tiempo"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class AdaptiveStride:
+    """
+    Elige cada cuántos frames ejecutar el detector
+
+    Con modo adaptativo, k es el menor valor que mantiene el coste medio por
+    frame de la etapa de detección por debajo del intervalo objetivo.
+
+    Args:
+        target_fps: FPS objetivo del pipeline
+        stride: k inicial (o fijo si no es adaptativo)
+        max_stride: k máximo permitido
+        adaptive: Recalcular k a partir de las latencias medidas
+    """
+
+    def __init__(self, target_fps: float, stride: int = 1, max_stride: int = 6, adaptive: bool = True):
+        self.target_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.max_stride = max(1, max_stride)
+        self.adaptive = adaptive
+        self.value = min(max(1, stride), self.max_stride)
+        self.detection_latency = 0.0
+        self.overhead_latency = 0.0
+
+    @staticmethod
+    def _ema(previous: float, sample: float) -> float:
+        return sample if previous == 0.0 else 0.8 * previous + 0.2 * sample
+
+    def observe_detection(self, seconds: float):
+        """Registra el coste de una detección completa"""
+        self.detection_latency = self._ema(self.detection_latency, seconds)
+        self._recompute()
+
+    def observe_overhead(self, seconds: float):
+        """Registra el coste fijo por frame (preprocesado o predicción del tracker)"""
+        self.overhead_latency = self._ema(self.overhead_latency, seconds)
+
+    def _recompute(self):
+        if not self.adaptive or self.target_interval <= 0:
+            return
+        # Presupuesto por frame que queda para amortizar la detección
+        budget = max(self.target_interval - self.overhead_latency, 1e-3)
+        self.value = min(max(1, math.ceil(self.detection_latency / budget)), self.max_stride)
+
+
+@dataclass
+class FramePacket:
+    """Frame y resultados que viajan entre etapas"""
+    seq: int
+    frame: np.ndarray
+    captured_at: float
+    faces: List[tuple] = field(default_factory=list)
+    # False si las cajas vienen de la predicción del tracker
+    detected: bool = True
+    # Rostros y emociones del frame en columnas (tras la clasificación)
+    detections: Optional[DetectionBatch] = None
+
+
+class PersistRecord(NamedTuple):
+    """Lo que necesita la persistencia de un frame (sin el frame)"""
+    seq: int
+    detections: DetectionBatch
+    captured_at: float
+
+
+def annotate_frame(frame: np.ndarray, faces: List[tuple], emotions: List[Tuple[int, Tuple[str, float]]]) -> np.ndarray:
+    """
+    Dibuja cabecera, rectángulos y etiquetas de emoción sobre el frame
+
+    Args:
+        frame: Frame a anotar (se modifica en el lugar)
+        faces: Detecciones (x, y, w, h, confianza)
+        emotions: Pares (índice del rostro, (emoción, confianza))
+
+    Returns:
+        El mismo frame anotado
+    """
+    # Dibujar información del sistema
+    cv2.putText(frame, "YOLO + DeepFace Detection", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    cv2.putText(frame, f"N. Rostros: {len(faces)}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    for i, (emotion, emotion_confidence) in emotions:
+        x, y, w, h, confidence = faces[i]
+        color = EMOTION_COLORS.get(emotion, (0, 255, 0))  # Verde por defecto
+
+        # Dibujar rectángulo alrededor del rostro
+        cv2.rectangle(frame, (x, y), (x+w, y+h), color, 3)
+
+        # Dibujar etiqueta de emoción con fondo
+        label = f"{emotion.replace('_', ' ').title()}: {emotion_confidence:.2f}"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+        cv2.rectangle(frame, (x, y-35), (x + label_size[0] + 10, y-5), color, -1)
+        cv2.putText(frame, label, (x+5, y-15),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        # Información de confianza YOLO
+        yolo_label = f"YOLO: {confidence:.2f}"
+        cv2.putText(frame, yolo_label, (x+5, y+h+20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    # Mostrar mensaje si no hay rostros
+    if len(faces) == 0:
+        cv2.putText(frame, "Rostros no detectados", (10, 100),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        cv2.putText(frame, "La posicion del rostro debe estar en frente de la camara", (10, 130),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+    return frame
+
+
+def annotate_snapshot(frame: np.ndarray, snapshot: FrameSnapshot) -> np.ndarray:
+    """Dibuja sobre el frame los resultados de una instantánea (ver ``annotate_frame``)"""
+    return annotate_frame(frame, snapshot.detections.faces(), snapshot.detections.emotions())
+
+
+class CameraPipeline:
+    """
+    Orquesta las etapas del procesamiento de cámara
+
+    Args:
+        cap: Fuente de video ya abierta (``cv2.VideoCapture``)
+        yolo: Detector de rostros
+        classifier: Clasificador por lotes
+        storage: Servicio de agregación de emociones
+        get_session_id: Devuelve la sesión activa (o None)
+        on_frame: Callback con cada frame limpio y su instantánea, listos para el stream
+        snapshots: Almacén donde se publica la instantánea de cada frame
+        tracker: Tracker de rostros; si se indica, sólo se reclasifican las pistas que lo necesitan
+        target_fps: FPS objetivo; la captura no encola más rápido que esto (0 = sin límite)
+        detection_stride: Ejecutar el detector cada k frames (requiere tracker)
+        max_detection_stride: k máximo en modo adaptativo
+        adaptive_stride: Ajustar k según la latencia medida del detector
+        queue_size: Capacidad de las colas entre etapas
+        drop_oldest: Descartar el frame más antiguo cuando una cola se llena
+        frame_ring_slots: Slots del anillo de frames en memoria compartida (0 = sin anillo);
+            la detección lee del anillo con su propio lector y la clasificación
+            trabaja sobre la vista del slot; sólo el frame que se publica al stream se copia
+        preprocess_profile: Perfil de preprocesado de esta cámara (None = ``settings.preprocess_profile``)
+        detection_max_width: Detectar sobre el frame reducido a este ancho y llevar las
+            cajas a resolución completa; la clasificación usa recortes del frame original (0 = no)
+    """
+
+    STAGES = ("capture", "detection", "classification", "annotation", "persistence")
+
+    def __init__(
+        self,
+        cap,
+        yolo,
+        classifier,
+        storage,
+        get_session_id: Callable[[], Optional[str]],
+        on_frame: Callable[[np.ndarray, FrameSnapshot], None],
+        queue_size: int = 2,
+        drop_oldest: bool = True,
+        stop_event: Optional[threading.Event] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        tracker: Optional[FaceTracker] = None,
+        target_fps: float = 0,
+        detection_stride: int = 1,
+        max_detection_stride: int = 6,
+        adaptive_stride: bool = False,
+        frame_ring_slots: int = 0,
+        preprocess_profile: Optional[str] = None,
+        detection_max_width: int = 0
+    ):
+        self.cap = cap
+        self.yolo = yolo
+        self.classifier = classifier
+        self.storage = storage
+        self.get_session_id = get_session_id
+        self.on_frame = on_frame
+        self.snapshots = snapshots or SnapshotStore()
+        self.tracker = tracker
+        self.target_fps = target_fps
+        # Sin tracker no hay con qué interpolar: se detecta en todos los frames
+        self.stride = AdaptiveStride(
+            target_fps,
+            stride=detection_stride if tracker else 1,
+            max_stride=max_detection_stride if tracker else 1,
+            adaptive=adaptive_stride and tracker is not None
+        )
+        self._frames_since_detection = 0
+        self.preprocess_profile = preprocess_profile
+        self.detection_max_width = detection_max_width
+        # El anillo se crea con el primer frame, cuando se conoce su forma
+        self.frame_ring_slots = frame_ring_slots
+        self.frame_ring: Optional[SharedFrameRing] = None
+        self.detection_reader: Optional[FrameRingReader] = None
+        # Avisa a la detección de que hay un frame nuevo en el anillo
+        self._ring_written = threading.Condition()
+        self.stop_event = stop_event or threading.Event()
+
+        self.detect_queue = FrameQueue(queue_size, drop_oldest)
+        self.classify_queue = FrameQueue(queue_size, drop_oldest)
+        self.annotate_queue = FrameQueue(queue_size, drop_oldest)
+        # La persistencia sólo recibe los resultados (no el frame) y nunca hace
+        # esperar a la clasificación: si la base de datos se atasca y la cola se
+        # llena, el registro se descarta y se cuenta
+        self.persist_queue = FrameQueue(max(queue_size, 64), drop_oldest=False)
+        self.persist_dropped = 0
+
+        self.frames_captured = 0
+        # Frames descartados porque su slot del anillo se reescribió antes de tiempo
+        self.overwritten_frames = 0
+        self.stage_latency: Dict[str, float] = {stage: 0.0 for stage in self.STAGES}
+        self._threads: List[threading.Thread] = []
+
+    def _record_latency(self, stage: str, started: float):
+        """Media móvil exponencial de la latencia de cada etapa (segundos)"""
+        elapsed = time.perf_counter() - started
+        previous = self.stage_latency[stage]
+        self.stage_latency[stage] = elapsed if previous == 0.0 else 0.9 * previous + 0.1 * elapsed
+
+    def _stage_loop(self, stage: str, in_queue: FrameQueue, handler: Callable[[Any], None]):
+        """Bucle genérico: toma elementos de la cola de entrada y los procesa"""
+        while not self.stop_event.is_set():
+            packet = in_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            started = time.perf_counter()
+            try:
+                handler(packet)
+            except Exception as e:
+                logger.error(f"Error en etapa {stage}: {e}")
+            self._record_latency(stage, started)
+
+    # Etapas
+
+    def _preprocess(self, frame: np.ndarray) -> np.ndarray:
+        # Sin perfil propio de la cámara se usa el global (PREPROCESS_PROFILE)
+        return preprocess_for_detection(frame, self.preprocess_profile)
+
+    def _is_ring_view(self, packet: FramePacket) -> bool:
+        """True si el frame del paquete sigue siendo una vista de un slot del anillo"""
+        return self.frame_ring is not None and self.frame_ring.owns(packet.frame)
+
+    def _slot_intact(self, packet: FramePacket) -> bool:
+        """
+        Comprueba, después de usar la vista, que su slot no se reescribió
+
+        La captura no espera a las demás etapas: si una etapa se retrasa más
+        de lo que cabe en el anillo, lo que leyó de la vista puede mezclar
+        dos frames y el paquete se descarta.
+        """
+        if self.frame_ring is None or self.frame_ring.is_valid(packet.seq):
+            return True
+        self.overwritten_frames += 1
+        return False
+
+    def _detect(self, packet: FramePacket):
+        started = time.perf_counter()
+        multi_resolution = 0 < self.detection_max_width < packet.frame.shape[1]
+        if not multi_resolution:
+            packet.frame = self._preprocess(packet.frame)
+
+        skip_detection = (
+            self.tracker is not None
+            and self._frames_since_detection + 1 < self.stride.value
+            and self.tracker.has_tracks()
+        )
+
+        if skip_detection:
+            # Entre detecciones, las cajas se extrapolan desde las pistas
+            packet.faces = self.tracker.predict(packet.captured_at)
+            packet.detected = False
+            self._frames_since_detection += 1
+            self.stride.observe_overhead(time.perf_counter() - started)
+        else:
+            preprocessed = time.perf_counter()
+            if multi_resolution:
+                # Detección barata sobre el frame reducido (sólo éste se preprocesa);
+                # las cajas vuelven a resolución completa para recortar los rostros
+                small, _ = downscale_to_width(packet.frame, self.detection_max_width, reuse=True)
+                small = self._preprocess(small)
+                packet.faces = scale_detections(self.yolo.detect_faces(small), small.shape, packet.frame.shape)
+            else:
+                packet.faces = self.yolo.detect_faces(packet.frame)
+            self._frames_since_detection = 0
+            self.stride.observe_overhead(preprocessed - started)
+            self.stride.observe_detection(time.perf_counter() - preprocessed)
+
+        # El preprocesado pudo generar un frame propio; aun así la detección leyó el slot
+        if not self._slot_intact(packet):
+            return
+        self.classify_queue.put(packet)
+
+    def _classify(self, packet: FramePacket):
+        face_indices, face_rois = extract_face_rois(self.yolo, packet.frame, packet.faces)
+        if self._is_ring_view(packet):
+            # Se copian sólo los recortes (pequeños) y se valida el slot una vez
+            # copiados: el clasificador nunca ve un slot a medio reescribir
+            face_rois = [roi.copy() for roi in face_rois]
+            if not self._slot_intact(packet):
+                return
+        if self.tracker is None:
+            emotions = self.classifier.classify_batch(face_rois)
+        else:
+            # Las pistas estables conservan su última etiqueta entre reclasificaciones
+            valid_faces = [packet.faces[i] for i in face_indices]
+            _, emotions = self.tracker.classify(
+                valid_faces, face_rois, self.classifier, packet.captured_at, detected=packet.detected
+            )
+        packet.detections = DetectionBatch.from_results(
+            packet.faces, list(zip(face_indices, emotions)), packet.captured_at
+        )
+        self.annotate_queue.put(packet)
+        record = PersistRecord(packet.seq, packet.detections, packet.captured_at)
+        if not self.persist_queue.put(record, timeout=0):
+            self.persist_dropped += 1
+
+    def _annotate(self, packet: FramePacket):
+        # La instantánea se publica junto al frame para que coincidan
+        snapshot = FrameSnapshot.from_batch(packet.seq, packet.detections)
+
+        if self._is_ring_view(packet):
+            # El broadcaster conserva el frame hasta que llega el siguiente y lo
+            # codifica bajo demanda: es la única copia del frame fuera del anillo
+            frame = packet.frame.copy()
+            if not self._slot_intact(packet):
+                return
+            packet.frame = frame
+        self.snapshots.publish(snapshot)
+
+        # El frame sale limpio: las anotaciones viajan como metadatos y sólo
+        # se dibujan si algún cliente pide el stream anotado
+        self.on_frame(packet.frame, snapshot)
+
+    def _persist(self, record: PersistRecord):
+        session_id = self.get_session_id()
+
+        if not session_id:
+            # Log cada 100 frames si no hay sesión activa
+            if record.seq % 100 == 0:
+                logger.warning("⚠️ No hay sesión activa - Los datos no se están guardando")
+            return
+
+        # Agregar emociones al sistema de agregación de 30 segundos
+        self.storage.add_batch(record.detections, session_id)
+
+        # Verificar si debe guardar agregación cada 30 segundos
+        if self.storage.should_save_aggregation():
+            logger.info(f"💾 Guardando agregación - Detecciones: {self.storage.total_detections}")
+            try:
+                self.storage.save_emotion_aggregation(session_id)
+                logger.info("✅ Agregación guardada exitosamente")
+            except Exception as e:
+                logger.error(f"❌ Error guardando agregación de 30 segundos: {e}")
+
+    def _ring_detection_loop(self):
+        """
+        Detección alimentada desde el anillo con su propio lector
+
+        Toma siempre el frame más reciente que no ha leído; los que se saltó
+        cuentan en ``detection_reader.skipped``.
+        """
+        while not self.stop_event.is_set():
+            ring, reader = self.frame_ring, self.detection_reader
+            if reader is None:
+                with self._ring_written:
+                    self._ring_written.wait(timeout=0.1)
+                continue
+            with self._ring_written:
+                if not self._ring_written.wait_for(lambda: reader.lag > 0, timeout=0.1):
+                    continue
+            seq, frame = reader.read_latest()
+            captured_at = ring.timestamp(seq) if frame is not None else None
+            if captured_at is None:
+                continue
+            started = time.perf_counter()
+            try:
+                self._detect(FramePacket(seq=seq, frame=frame, captured_at=captured_at))
+            except Exception as e:
+                logger.error(f"Error en etapa detection: {e}")
+            self._record_latency("detection", started)
+
+    def _capture_loop(self):
+        """Lee frames de la cámara; nunca espera a las etapas de inferencia"""
+        min_interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+        last_enqueued = 0.0
+
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                logger.warning("No se pudo leer frame de la cámara")
+                break
+
+            # Se sigue leyendo para vaciar el buffer de la cámara, pero sólo se
+            # encolan frames al ritmo objetivo
+            if started - last_enqueued < min_interval:
+                continue
+            last_enqueued = started
+
+            self.frames_captured += 1
+            captured_at = time.time()
+            seq = self.frames_captured
+
+            if self.frame_ring_slots > 0:
+                if self.frame_ring is None:
+                    self.frame_ring = SharedFrameRing.create(self.frame_ring_slots, frame.shape)
+                    self.detection_reader = self.frame_ring.reader("detection")
+                # Única copia del frame: la detección lo lee del slot con su lector
+                self.frame_ring.write(frame, captured_at)
+                with self._ring_written:
+                    self._ring_written.notify_all()
+            else:
+                self.detect_queue.put(FramePacket(
+                    seq=seq,
+                    frame=frame,
+                    captured_at=captured_at
+                ))
+            self._record_latency("capture", started)
+
+    def run(self):
+        """
+        Arranca las etapas y ejecuta la captura en el hilo actual hasta que
+        se detenga el pipeline o falle la cámara
+        """
+        workers = [
+            ("classification", self.classify_queue, self._classify),
+            ("annotation", self.annotate_queue, self._annotate),
+            ("persistence", self.persist_queue, self._persist),
+        ]
+        if self.frame_ring_slots > 0:
+            detection = threading.Thread(target=self._ring_detection_loop, name="camera-detection", daemon=True)
+        else:
+            detection = threading.Thread(
+                target=self._stage_loop, args=("detection", self.detect_queue, self._detect),
+                name="camera-detection", daemon=True
+            )
+        self._threads = [detection] + [
+            threading.Thread(target=self._stage_loop, args=worker, name=f"camera-{worker[0]}", daemon=True)
+            for worker in workers
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            self._capture_loop()
+        finally:
+            self.stop()
+            if self.frame_ring is not None:
+                self.frame_ring.close()
+
+    def stop(self):
+        """Detiene todas las etapas y espera a que terminen"""
+        self.stop_event.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self._threads = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de rendimiento del pipeline"""
+        return {
+            "frames_captured": self.frames_captured,
+            "stage_latency_ms": {stage: round(value * 1000, 2) for stage, value in self.stage_latency.items()},
+            "queue_depth": {
+                "detection": len(self.detect_queue),
+                "classification": len(self.classify_queue),
+                "annotation": len(self.annotate_queue),
+                "persistence": len(self.persist_queue)
+            },
+            "dropped_frames": {
+                "detection": self.detection_reader.skipped if self.detection_reader else self.detect_queue.dropped,
+                "classification": self.classify_queue.dropped,
+                "annotation": self.annotate_queue.dropped,
+                "persistence": self.persist_dropped,
+                "ring_overwritten": self.overwritten_frames
+            },
+            "tracker": self.tracker.get_stats() if self.tracker else None,
+            "target_fps": self.target_fps,
+            "preprocess_profile": self.preprocess_profile,
+            "detection_max_width": self.detection_max_width,
+            "detection_stride": self.stride.value,
+            "detection_latency_ms": round(self.stride.detection_latency * 1000, 2),
+            "frame_ring": self.frame_ring.get_stats() if self.frame_ring else None,
+            "buffer_pool": buffer_pool.get_stats()
+        }
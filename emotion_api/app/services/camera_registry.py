@@ -0,0 +1,365 @@
+"""
+Registro de cámaras: una entrada por aula/sesión con su propia fuente,
+worker, último frame y estado de agregación
+
+Los modelos se comparten entre todas las cámaras a través de ``model_registry``.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Union
+import logging
+
+import cv2
+import numpy as np
+
+from app.config.settings import settings
+from app.services.camera_pipeline import CameraPipeline, annotate_snapshot
+from app.services.emotion_storage import EmotionStorageService
+from app.services.face_tracker import FaceTracker
+from app.services.frame_broadcaster import FrameBroadcaster
+from app.services.live_updates import camera_topic, live_updates, session_topic
+from app.services.model_registry import model_registry
+from app.services.realtime_snapshot import FrameSnapshot, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+# Cámara usada por los endpoints sin identificador (compatibilidad)
+DEFAULT_CAMERA_ID = "default"
+
+
+def parse_camera_source(source: Union[str, int, None]) -> Union[str, int]:
+    """Convierte la fuente a índice de dispositivo si es numérica (``"0"`` -> ``0``)"""
+    if source is None:
+        source = settings.camera_source
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source.strip())
+    return source
+
+
+class CameraEntry:
+    """
+    Estado de una cámara: fuente, hilo de captura, último frame y agregación
+
+    Args:
+        camera_id: Identificador (aula o sesión)
+        source: Índice de dispositivo o URL (RTSP/HTTP/archivo) para ``cv2.VideoCapture``
+    """
+
+    def __init__(self, camera_id: str, source: Union[str, int, None] = None):
+        self.camera_id = camera_id
+        self.source = parse_camera_source(source)
+        self.session_id: Optional[str] = None
+        # Perfil de preprocesado según la iluminación del aula (None = global)
+        self.preprocess_profile: Optional[str] = None
+
+        # active, thread, stop_event, cap y pipeline cambian desde las rutas
+        # (start/stop) y desde el worker: siempre con _lock. Cada ejecución
+        # del worker tiene su propio stop_event, que la identifica
+        self._lock = threading.Lock()
+        self.active = False
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.cap = None
+        self.pipeline: Optional[CameraPipeline] = None
+
+        # Último frame limpio y sus metadatos; se codifica una vez por perfil de cliente
+        self.broadcaster = FrameBroadcaster(
+            quality=settings.stream_jpeg_quality,
+            annotated=settings.stream_annotated,
+            render=annotate_snapshot
+        )
+        self.snapshots = SnapshotStore()
+        self.storage = EmotionStorageService(source_id=camera_id)
+        # Segundo del frame con el que se publicó por última vez la ventana en vivo
+        self._window_second: Optional[int] = None
+
+    def _publish_frame(self, frame: np.ndarray, snapshot: FrameSnapshot):
+        """Publica el último frame (sin anotar) y sus metadatos para el stream"""
+        self.broadcaster.publish(frame, snapshot)
+
+        # Actualizaciones en vivo (el hub las agrupa y envía sólo deltas)
+        distribution = {**snapshot.distribution, "frame_seq": snapshot.seq, "timestamp": snapshot.timestamp}
+        topics = self._topics()
+        for topic in topics:
+            live_updates.publish(topic, "distribution", distribution)
+
+        # La ventana suma todos sus buckets: se recalcula una vez por segundo
+        # y sólo si algún tópico tiene suscriptores
+        second = int(snapshot.timestamp)
+        if second != self._window_second and any(live_updates.has_subscribers(topic) for topic in topics):
+            self._window_second = second
+            window = self.storage.get_window_distribution()
+            for topic in topics:
+                live_updates.publish(topic, "window", window)
+
+    def _topics(self):
+        topics = [camera_topic(self.camera_id)]
+        if self.session_id:
+            topics.append(session_topic(self.session_id))
+        return topics
+
+    def publish_status(self):
+        """Publica el estado de la cámara en sus tópicos en vivo"""
+        status = {
+            "camera_id": self.camera_id,
+            "session_id": self.session_id,
+            "active": self.active,
+            "status": "active" if self.active else "stopped"
+        }
+        for topic in self._topics():
+            live_updates.publish(topic, "camera_status", status)
+
+    def set_session(self, session_id: Optional[str]):
+        """Asocia (o desasocia, con None) una sesión a la cámara"""
+        previous = self.session_id
+        # Los buckets de emociones de la cámara pasan a la nueva sesión (la
+        # ventana pendiente se guarda en la anterior); hasta entonces los lotes
+        # que el pipeline persista con la sesión nueva se descartan
+        self.storage.set_session(session_id)
+        self.session_id = session_id
+        if previous and previous != session_id:
+            # Los suscriptores de la sesión anterior ven que terminó
+            live_updates.publish(session_topic(previous), "camera_status", {
+                "camera_id": self.camera_id,
+                "session_id": None,
+                "active": self.active,
+                "status": "session_ended"
+            })
+        self.publish_status()
+
+    def _worker(self, stop_event: threading.Event):
+        """
+        Worker thread para captura de video
+
+        Args:
+            stop_event: Evento de parada de esta ejecución; si ya no es el de
+                la entrada, otra ejecución la reemplazó y ésta no toca su estado
+        """
+        cap = None
+        try:
+            # Crear nueva instancia de cámara
+            cap = cv2.VideoCapture(self.source)
+
+            if not cap.isOpened():
+                logger.error(f"No se pudo abrir la cámara {self.camera_id} ({self.source})")
+                return
+
+            # Configurar resolución de cámara
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.frame_width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.frame_height)
+            cap.set(cv2.CAP_PROP_FPS, settings.video_fps)
+
+            # Modelos compartidos entre cámaras
+            yolo = model_registry.get_yolo_detector()
+            classifier = model_registry.get_batch_classifier()
+
+            if yolo is None:
+                logger.error("No se pudo inicializar YOLO detector")
+                return
+
+            logger.info(f"Cámara {self.camera_id} iniciada correctamente")
+
+            # Inicializar ventana de agregación de 30 segundos
+            logger.info("🚀 Iniciando sistema de agregación de emociones...")
+            self.storage.start_aggregation_window()
+
+            # Inicializar conexión a base de datos
+            logger.info("🔗 Inicializando conexión a base de datos...")
+            self.storage.initialize()
+
+            self.snapshots.clear()
+
+            # Captura, detección, clasificación, anotación y persistencia en etapas
+            # conectadas por colas; el ritmo lo marca la propia cámara
+            pipeline = CameraPipeline(
+                cap=cap,
+                yolo=yolo,
+                classifier=classifier,
+                storage=self.storage,
+                get_session_id=lambda: self.session_id,
+                on_frame=self._publish_frame,
+                queue_size=settings.pipeline_queue_size,
+                drop_oldest=settings.pipeline_drop_oldest,
+                stop_event=stop_event,
+                snapshots=self.snapshots,
+                tracker=FaceTracker(
+                    iou_threshold=settings.tracker_iou_threshold,
+                    max_missed=settings.tracker_max_missed,
+                    reclassify_every=settings.tracker_reclassify_every,
+                    appearance_threshold=settings.tracker_appearance_threshold
+                ) if settings.tracker_enabled else None,
+                target_fps=settings.video_fps,
+                detection_stride=settings.detection_stride,
+                max_detection_stride=settings.max_detection_stride,
+                adaptive_stride=settings.adaptive_detection_stride,
+                frame_ring_slots=settings.frame_ring_slots,
+                preprocess_profile=self.preprocess_profile,
+                detection_max_width=settings.detection_max_width
+            )
+            with self._lock:
+                if self.stop_event is not stop_event:
+                    return
+                self.cap = cap
+                self.pipeline = pipeline
+            pipeline.run()
+
+        except Exception as e:
+            logger.error(f"Error en worker de cámara {self.camera_id}: {e}")
+        finally:
+            if cap is not None:
+                cap.release()
+            with self._lock:
+                current = self.stop_event is stop_event
+                if current:
+                    self.cap = None
+                    self.active = False
+            if current:
+                # Despertar a los streams que esperan frames para que terminen
+                self.broadcaster.clear()
+                self.publish_status()
+            logger.info(f"Cámara {self.camera_id} detenida")
+
+    def start(self, source: Union[str, int, None] = None, preprocess_profile: Optional[str] = None) -> bool:
+        """
+        Inicia el worker de la cámara
+        
+        Args:
+            source: Nueva fuente (None = la actual)
+            preprocess_profile: Perfil de preprocesado para esta cámara (None = el actual)
+
+        Returns:
+            False si ya estaba activa (o si otra petición la inició a la vez)
+        """
+        with self._lock:
+            if self.active:
+                return False
+            previous = self.thread
+
+        # Esperar a que termine la ejecución anterior (ya detenida) sin el
+        # lock: su worker lo necesita para terminar
+        if previous is not None and previous.is_alive():
+            previous.join(timeout=2)
+
+        with self._lock:
+            if self.active:
+                return False
+
+            if source is not None:
+                self.source = parse_camera_source(source)
+            if preprocess_profile is not None:
+                self.preprocess_profile = preprocess_profile
+
+            # Limpiar frame anterior; la nueva ejecución tiene su propio evento
+            self.broadcaster.clear()
+            self.stop_event = threading.Event()
+            self.active = True
+
+            # Iniciar nuevo thread de cámara
+            self.thread = threading.Thread(
+                target=self._worker, args=(self.stop_event,), name=f"camera-{self.camera_id}", daemon=True
+            )
+            self.thread.start()
+        self.publish_status()
+        return True
+
+    def stop(self) -> bool:
+        """
+        Detiene el worker de la cámara
+
+        Returns:
+            False si ya estaba detenida (o si otra petición la detuvo a la vez)
+        """
+        with self._lock:
+            if not self.active:
+                return False
+            self.active = False
+            self.stop_event.set()
+            thread = self.thread
+
+        # Limpiar frame actual
+        self.broadcaster.clear()
+        self.snapshots.clear()
+
+        # Esperar a que el thread termine (sin el lock: el worker lo necesita)
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=3)
+        with self._lock:
+            # Si no terminó a tiempo se conserva: el próximo start lo espera
+            if self.thread is thread and not self.active and not thread.is_alive():
+                self.thread = None
+        self.publish_status()
+        return True
+
+    def read_latest_raw(self):
+        """
+        Último frame capturado (sin anotar) como (seq, vista del anillo)
+
+        Returns:
+            (0, None) si la cámara no está activa o no usa anillo de frames
+        """
+        pipeline = self.pipeline
+        if not self.active or pipeline is None or pipeline.frame_ring is None:
+            return 0, None
+        return pipeline.frame_ring.read_latest()
+
+    def is_raw_frame_valid(self, seq: int) -> bool:
+        """True si el frame ``seq`` de ``read_latest_raw`` sigue intacto en el anillo"""
+        pipeline = self.pipeline
+        return pipeline is not None and pipeline.frame_ring is not None and pipeline.frame_ring.is_valid(seq)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado actual de la cámara"""
+        return {
+            "camera_id": self.camera_id,
+            "source": str(self.source),
+            "session_id": self.session_id,
+            "active": self.active,
+            "thread_alive": self.thread.is_alive() if self.thread else False,
+            "status": "active" if self.active else "stopped",
+            "pipeline": self.pipeline.get_stats() if self.active and self.pipeline else None,
+            "stream": self.broadcaster.get_stats()
+        }
+
+
+class CameraRegistry:
+    """Cámaras del servidor indexadas por aula o sesión"""
+
+    def __init__(self):
+        self._cameras: Dict[str, CameraEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, camera_id: str) -> Optional[CameraEntry]:
+        """Obtiene una cámara registrada (o None)"""
+        return self._cameras.get(camera_id)
+
+    def get_or_create(self, camera_id: str, source: Union[str, int, None] = None) -> CameraEntry:
+        """Obtiene una cámara, registrándola si no existe"""
+        with self._lock:
+            entry = self._cameras.get(camera_id)
+            if entry is None:
+                entry = CameraEntry(camera_id, source)
+                self._cameras[camera_id] = entry
+                logger.info(f"📷 Cámara registrada: {camera_id} ({entry.source})")
+            return entry
+
+    def remove(self, camera_id: str) -> bool:
+        """Detiene y elimina una cámara del registro"""
+        with self._lock:
+            entry = self._cameras.pop(camera_id, None)
+        if entry is None:
+            return False
+        entry.stop()
+        return True
+
+    def stop_all(self):
+        """Detiene todas las cámaras (al cerrar la API)"""
+        for entry in list(self._cameras.values()):
+            entry.stop()
+
+    def list_status(self) -> list:
+        """Estado de todas las cámaras"""
+        return [entry.get_status() for entry in list(self._cameras.values())]
+
+
+# Instancia global del registro
+camera_registry = CameraRegistry()
@@ -0,0 +1,243 @@
+"""
+Gestor de conexiones WebSocket con colas de salida por conexión
+
+Cada conexión tiene su propia cola acotada y una tarea que envía los
+mensajes; difundir a N clientes sólo encola y no espera a ninguno, de modo
+que un cliente lento no retrasa a los demás. Los mensajes con clave (un
+tópico, un feed de video) se agrupan con el que ya estaba en cola; si un
+cliente acumula demasiado retraso se le desconecta.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+import logging
+
+from fastapi import WebSocket
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Código de cierre "Try Again Later" para clientes expulsados por lentitud
+EVICTION_CLOSE_CODE = 1013
+
+
+class _Outgoing:
+    """Mensaje en cola de una conexión"""
+
+    __slots__ = ("key", "payload", "enqueued_at")
+
+    def __init__(self, key: Optional[str], payload: Any, enqueued_at: float):
+        self.key = key
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+
+
+class ClientConnection:
+    """Cola de salida, tarea de envío y métricas de un cliente"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.client = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else "desconocido"
+        self.queue: Deque[_Outgoing] = deque()
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+
+        # Métricas
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.send_time = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def lag(self) -> float:
+        """Segundos que lleva en cola el mensaje más antiguo"""
+        return time.monotonic() - self.queue[0].enqueued_at if self.queue else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "client": self.client,
+            "connected_at": self.connected_at,
+            "queued": len(self.queue),
+            "lag_ms": round(self.lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "average_send_ms": round(self.send_time * 1000 / self.sent, 2) if self.sent else 0.0
+        }
+
+
+class ConnectionManager:
+    """
+    Conexiones WebSocket activas con envío concurrente y control de presión
+
+    Args:
+        queue_size: Mensajes en cola por conexión
+        max_lag: Segundos de retraso tolerados antes de expulsar a un cliente
+    """
+
+    def __init__(self, queue_size: int = 32, max_lag: float = 5.0):
+        self.queue_size = max(1, queue_size)
+        self.max_lag = max_lag
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self._disconnect_handlers: List[Callable[[WebSocket], None]] = []
+        self.evicted = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
+
+    def add_disconnect_handler(self, handler: Callable[[WebSocket], None]):
+        """Registra una función a llamar cuando se cierra una conexión"""
+        self._disconnect_handlers.append(handler)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        connection = ClientConnection(websocket)
+        connection.task = asyncio.create_task(self._sender(connection))
+        self.connections[websocket] = connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return
+        if connection.task is not None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+        for handler in self._disconnect_handlers:
+            try:
+                handler(websocket)
+            except Exception as e:
+                logger.error(f"Error en manejador de desconexión: {e}")
+
+    def send(
+        self,
+        websocket: WebSocket,
+        message: Any,
+        key: Optional[str] = None,
+        merge: Optional[Callable[[Any, Any], Any]] = None
+    ) -> bool:
+        """
+        Encola un mensaje sin esperar al envío
+
+        Args:
+            websocket: Conexión destino
+            message: Texto, bytes o diccionario (se serializa a JSON al enviar)
+            key: Clave de agrupación: reemplaza al mensaje en cola con la misma clave
+            merge: ``merge(en_cola, nuevo)`` para combinar en lugar de reemplazar
+
+        Returns:
+            False si la conexión no existe o fue expulsada
+        """
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return False
+
+        queue = connection.queue
+        # Antes de agrupar: un cliente atascado que sólo recibe mensajes con
+        # clave nunca haría crecer la cola, pero su retraso sí crece
+        if queue and connection.lag > self.max_lag:
+            self._evict(connection, f"retraso de {connection.lag:.1f}s")
+            return False
+
+        if key is not None:
+            for item in queue:
+                if item.key == key:
+                    # Conserva su ``enqueued_at``: el retraso cuenta desde el primer mensaje sin enviar
+                    item.payload = merge(item.payload, message) if merge else message
+                    connection.coalesced += 1
+                    return True
+
+        if len(queue) >= self.queue_size:
+            # Se descarta el mensaje sin clave más antiguo; los mensajes con
+            # clave ya están agrupados y no se pueden perder sin desincronizar
+            oldest = next((item for item in queue if item.key is None), None)
+            if oldest is not None:
+                queue.remove(oldest)
+                connection.dropped += 1
+            elif key is None:
+                connection.dropped += 1
+                return True
+            else:
+                self._evict(connection, "cola llena de mensajes con clave")
+                return False
+
+        queue.append(_Outgoing(key, message, time.monotonic()))
+        connection.ready.set()
+        return True
+
+    def is_pending(self, websocket: WebSocket, key: str) -> bool:
+        """True si hay un mensaje con esa clave aún sin enviar a la conexión"""
+        connection = self.connections.get(websocket)
+        return connection is not None and any(item.key == key for item in connection.queue)
+
+    def _evict(self, connection: ClientConnection, reason: str):
+        logger.warning(f"🔌 Cliente WebSocket {connection.client} expulsado: {reason}")
+        self.evicted += 1
+        websocket = connection.websocket
+        self.disconnect(websocket)
+
+        async def close():
+            try:
+                await websocket.close(code=EVICTION_CLOSE_CODE)
+            except Exception:
+                pass
+
+        asyncio.ensure_future(close())
+
+    async def _sender(self, connection: ClientConnection):
+        """Envía en orden los mensajes de la cola de una conexión"""
+        websocket = connection.websocket
+        try:
+            while True:
+                if not connection.queue:
+                    connection.ready.clear()
+                    await connection.ready.wait()
+                    continue
+
+                item = connection.queue.popleft()
+                connection.max_lag = max(connection.max_lag, time.monotonic() - item.enqueued_at)
+                payload = item.payload
+
+                started = time.perf_counter()
+                if isinstance(payload, bytes):
+                    await websocket.send_bytes(payload)
+                elif isinstance(payload, str):
+                    await websocket.send_text(payload)
+                else:
+                    await websocket.send_text(json.dumps(payload, default=str))
+                connection.send_time += time.perf_counter() - started
+                connection.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Conexión WebSocket {connection.client} cerrada al enviar: {e}")
+            self.disconnect(websocket)
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        self.send(websocket, message)
+
+    async def broadcast(self, message: str):
+        """Encola el mensaje para todas las conexiones (no espera a ninguna)"""
+        for websocket in list(self.connections):
+            self.send(websocket, message)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de las conexiones (retraso, mensajes en cola, descartes)"""
+        connections = [connection.get_stats() for connection in list(self.connections.values())]
+        return {
+            "connections": len(connections),
+            "queue_size": self.queue_size,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "evicted": self.evicted,
+            "clients": connections
+        }
+
+
+# Instancia global del gestor
+manager = ConnectionManager(queue_size=settings.ws_queue_size, max_lag=settings.ws_max_lag_seconds)
@@ -0,0 +1,139 @@
+"""
+Detecciones de un frame en formato columnar
+
+En lugar de un diccionario (con su ``datetime``) por rostro, cada frame se
+representa con un objeto con un array por campo y un único timestamp. El
+agregador, el servicio de almacenamiento y los serializadores de la API lo
+consumen directamente, y viaja entre procesos como unos pocos arrays.
+"""
+
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.emotion_labels import EMOTION_LABELS, label_counts, label_id
+
+# Identificador de los rostros detectados pero aún sin clasificar
+UNCLASSIFIED = -1
+
+
+class DetectionBatch:
+    """
+    Rostros detectados en un frame y sus emociones
+
+    Args:
+        timestamp: Momento de captura del frame (epoch)
+        boxes: (N, 4) int32 con x, y, ancho, alto
+        detection_confidences: (N,) float32, confianza del detector
+        label_ids: (N,) int16, identificador de emoción (``UNCLASSIFIED`` si no hay)
+        confidences: (N,) float32, confianza de la emoción (0-1)
+    """
+
+    __slots__ = ("timestamp", "boxes", "detection_confidences", "label_ids", "confidences")
+
+    def __init__(
+        self,
+        timestamp: float,
+        boxes: np.ndarray,
+        detection_confidences: np.ndarray,
+        label_ids: np.ndarray,
+        confidences: np.ndarray
+    ):
+        self.timestamp = timestamp
+        self.boxes = boxes
+        self.detection_confidences = detection_confidences
+        self.label_ids = label_ids
+        self.confidences = confidences
+
+    @classmethod
+    def from_results(
+        cls,
+        faces: Sequence[tuple],
+        emotions: Sequence[Tuple[int, Tuple[str, float]]],
+        timestamp: Optional[float] = None
+    ) -> "DetectionBatch":
+        """
+        Crea el lote a partir de las detecciones y clasificaciones de un frame
+
+        Args:
+            faces: Detecciones (x, y, w, h, confianza)
+            emotions: Pares (índice del rostro, (emoción, confianza))
+            timestamp: Momento de captura (None = ahora)
+        """
+        count = len(faces)
+        boxes = np.zeros((count, 4), dtype=np.int32)
+        detection_confidences = np.zeros(count, dtype=np.float32)
+        if count:
+            columns = np.asarray(faces, dtype=np.float64).reshape(count, -1)
+            boxes[:] = columns[:, :4]
+            detection_confidences[:] = columns[:, 4]
+
+        label_ids = np.full(count, UNCLASSIFIED, dtype=np.int16)
+        confidences = np.zeros(count, dtype=np.float32)
+        for i, (emotion, emotion_confidence) in emotions:
+            label_ids[i] = label_id(emotion)
+            confidences[i] = emotion_confidence
+
+        return cls(
+            time.time() if timestamp is None else timestamp,
+            boxes, detection_confidences, label_ids, confidences
+        )
+
+    def __len__(self) -> int:
+        return len(self.label_ids)
+
+    @property
+    def classified(self) -> np.ndarray:
+        """Máscara de los rostros con emoción"""
+        return self.label_ids != UNCLASSIFIED
+
+    def classified_emotions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Identificadores y confianzas de los rostros clasificados"""
+        mask = self.classified
+        return self.label_ids[mask].astype(np.intp), self.confidences[mask]
+
+    def label_counts(self) -> np.ndarray:
+        """Rostros clasificados por identificador de etiqueta"""
+        label_ids, _ = self.classified_emotions()
+        return label_counts(label_ids)
+
+    def labels(self) -> List[Optional[str]]:
+        """Nombre de la emoción de cada rostro (None si no se clasificó)"""
+        return [EMOTION_LABELS[i] if i != UNCLASSIFIED else None for i in self.label_ids.tolist()]
+
+    def faces(self) -> List[tuple]:
+        """Detecciones como tuplas (x, y, w, h, confianza)"""
+        return [
+            (*box, confidence)
+            for box, confidence in zip(self.boxes.tolist(), self.detection_confidences.tolist())
+        ]
+
+    def emotions(self) -> List[Tuple[int, Tuple[str, float]]]:
+        """Pares (índice del rostro, (emoción, confianza)) de los rostros clasificados"""
+        return [
+            (i, (EMOTION_LABELS[label], confidence))
+            for i, (label, confidence) in enumerate(zip(self.label_ids.tolist(), self.confidences.tolist()))
+            if label != UNCLASSIFIED
+        ]
+
+    def average_detection_confidence(self) -> float:
+        return float(self.detection_confidences.mean()) if len(self) else 0.0
+
+    def to_rows(self, precision: Optional[int] = None) -> List[List[Any]]:
+        """
+        Filas ``[x, y, w, h, emoción, confianza, confianza del detector]``
+
+        Se construyen columna a columna (``tolist``) sin pasar por un objeto por rostro.
+        """
+        confidences = self.confidences
+        detection_confidences = self.detection_confidences
+        if precision is not None:
+            confidences = confidences.astype(np.float64).round(precision)
+            detection_confidences = detection_confidences.astype(np.float64).round(precision)
+        return [
+            [*box, label, confidence, detection_confidence]
+            for box, label, confidence, detection_confidence in zip(
+                self.boxes.tolist(), self.labels(), confidences.tolist(), detection_confidences.tolist()
+            )
+        ]
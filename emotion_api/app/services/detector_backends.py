@@ -0,0 +1,397 @@
+"""
+Backends intercambiables para el detector de rostros
+
+- ``torch``: ``YOLODetector`` (ultralytics / PyTorch), el comportamiento original
+- ``onnx``: modelo exportado a ONNX ejecutado con ONNX Runtime
+- ``openvino``: el mismo modelo ONNX compilado con OpenVINO (si está instalado)
+
+Los backends ONNX/OpenVINO usan una forma de entrada fija y pueden usar el
+modelo cuantizado a int8. Todos exponen la misma interfaz que ``YOLODetector``
+(``preprocess_frame``, ``detect_faces``, ``extract_face_roi``, ``is_model_loaded``).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from app.config.settings import settings
+from app.utils.buffer_pool import buffer_pool
+from app.utils.image_processing import preprocess_for_detection
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_BACKENDS = ("torch", "onnx", "openvino")
+
+
+def letterbox(image: np.ndarray, size: int, reuse: bool = False) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Redimensiona manteniendo proporción sobre un lienzo cuadrado gris (estilo YOLO)
+
+    Args:
+        image: Imagen BGR
+        size: Lado del lienzo
+        reuse: Usar el lienzo del pool de buffers (válido hasta el siguiente
+            letterbox con ``reuse`` desde el mismo hilo)
+
+    Returns:
+        Lienzo, escala aplicada y desplazamiento (x, y)
+    """
+    height, width = image.shape[:2]
+    scale = min(size / width, size / height)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+
+    if reuse:
+        canvas = buffer_pool.get("letterbox", (size, size, 3))
+        canvas.fill(114)
+        resized = cv2.resize(
+            image, (new_width, new_height),
+            dst=buffer_pool.get("letterbox_resized", (new_height, new_width, 3)),
+            interpolation=cv2.INTER_LINEAR
+        )
+    else:
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    x_offset = (size - new_width) // 2
+    y_offset = (size - new_height) // 2
+    canvas[y_offset:y_offset+new_height, x_offset:x_offset+new_width] = resized
+
+    return canvas, scale, (x_offset, y_offset)
+
+
+def export_onnx(
+    model_path: str = None,
+    output_path: str = None,
+    input_size: int = None,
+    int8: bool = False,
+    dynamic_batch: bool = False
+) -> str:
+    """
+    Exporta el modelo YOLO de rostros a ONNX con forma de entrada fija
+
+    Args:
+        model_path: Modelo ``.pt`` de ultralytics
+        output_path: Ruta del ``.onnx`` resultante
+        input_size: Lado de la entrada (fijo)
+        int8: Generar además una versión cuantizada a 8 bits (pesos uint8)
+        dynamic_batch: Eje de lote dinámico (para detección por lotes)
+
+    Returns:
+        Ruta del modelo ONNX (cuantizado si ``int8``)
+    """
+    from ultralytics import YOLO
+
+    model_path = model_path or settings.yolo_model_path
+    output_path = output_path or settings.detector_onnx_path
+    input_size = input_size or settings.detector_input_size
+
+    exported = YOLO(model_path).export(format="onnx", imgsz=input_size, dynamic=dynamic_batch, simplify=True)
+    if str(exported) != output_path:
+        os.replace(exported, output_path)
+    logger.info(f"Modelo exportado a ONNX: {output_path}")
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized_path = int8_model_path(output_path)
+        # Pesos uint8: el ``ConvInteger`` que genera la cuantización dinámica de
+        # un grafo convolucional sólo está implementado en CPU para uint8
+        quantize_dynamic(output_path, quantized_path, weight_type=QuantType.QUInt8)
+        logger.info(f"Modelo cuantizado a int8: {quantized_path}")
+        return quantized_path
+
+    return output_path
+
+
+def int8_model_path(onnx_path: str) -> str:
+    """Ruta del modelo int8 correspondiente a un modelo ONNX"""
+    path = Path(onnx_path)
+    return str(path.with_name(f"{path.stem}.int8{path.suffix}"))
+
+
+def decode_yolov8(
+    output: np.ndarray,
+    scale: float,
+    offset: Tuple[int, int],
+    image_shape: Tuple[int, int],
+    confidence_threshold: float,
+    iou_threshold: float
+) -> List[Tuple[int, int, int, int, float]]:
+    """
+    Decodifica la salida YOLOv8 (1, 4 + clases [+ keypoints], anclas) con NMS
+
+    Args:
+        output: Salida del modelo para una imagen
+        scale: Escala aplicada por ``letterbox``
+        offset: Desplazamiento (x, y) aplicado por ``letterbox``
+        image_shape: (alto, ancho) de la imagen original
+        confidence_threshold: Confianza mínima de una detección
+        iou_threshold: Umbral de NMS
+
+    Returns:
+        Detecciones (x, y, w, h, confianza) en coordenadas de la imagen original
+    """
+    predictions = output[0]
+    scores = predictions[4]
+    keep = scores >= confidence_threshold
+    if not np.any(keep):
+        return []
+
+    cx, cy, w, h = predictions[:4, keep]
+    scores = scores[keep]
+
+    # Deshacer letterbox
+    x = (cx - w / 2 - offset[0]) / scale
+    y = (cy - h / 2 - offset[1]) / scale
+    w = w / scale
+    h = h / scale
+
+    boxes = np.stack([x, y, w, h], axis=1)
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), confidence_threshold, iou_threshold)
+
+    height, width = image_shape
+    faces = []
+    for i in np.array(indices).reshape(-1):
+        bx, by, bw, bh = boxes[i]
+        x1 = int(max(0, bx))
+        y1 = int(max(0, by))
+        x2 = int(min(width, bx + bw))
+        y2 = int(min(height, by + bh))
+        if x2 > x1 and y2 > y1:
+            faces.append((x1, y1, x2 - x1, y2 - y1, float(scores[i])))
+
+    return faces
+
+
+class OnnxFaceDetector:
+    """
+    Detector de rostros YOLO sobre ONNX Runtime u OpenVINO
+
+    Args:
+        model_path: Modelo ONNX exportado
+        runtime: ``onnx`` u ``openvino``
+        input_size: Lado de la entrada fija del modelo
+        int8: Usar el modelo cuantizado a int8
+        confidence_threshold: Confianza mínima de una detección
+        iou_threshold: Umbral de NMS
+    """
+
+    def __init__(
+        self,
+        model_path: str = None,
+        runtime: str = "onnx",
+        input_size: int = None,
+        int8: bool = None,
+        confidence_threshold: float = None,
+        iou_threshold: float = 0.45
+    ):
+        self.model_path = model_path or settings.detector_onnx_path
+        self.runtime = runtime
+        self.input_size = input_size or settings.detector_input_size
+        self.int8 = settings.detector_int8 if int8 is None else int8
+        self.confidence_threshold = confidence_threshold or settings.confidence_threshold
+        self.iou_threshold = iou_threshold
+        self._infer = None
+        # Tamaño de lote del modelo: None si el eje de lote es dinámico
+        self.batch_size: Optional[int] = 1
+
+        path = int8_model_path(self.model_path) if self.int8 else self.model_path
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Modelo ONNX no encontrado: {path} (exportar con benchmarks/detector_backends.py --export)")
+
+        if runtime == "openvino":
+            self._load_openvino(path)
+        else:
+            self._load_onnxruntime(path)
+
+        logger.info(f"Detector {runtime} cargado: {path} ({self.input_size}x{self.input_size})")
+
+    def _load_onnxruntime(self, path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = session.get_inputs()[0]
+        input_name = model_input.name
+        batch_dim = model_input.shape[0]
+        self.batch_size = batch_dim if isinstance(batch_dim, int) else None
+
+        self._infer = lambda blob: session.run(None, {input_name: blob})[0]
+
+    def _load_openvino(self, path: str):
+        import openvino as ov
+
+        core = ov.Core()
+        model = core.read_model(path)
+        batch_dim = model.input(0).get_partial_shape()[0]
+        self.batch_size = None if batch_dim.is_dynamic else batch_dim.get_length()
+        compiled = core.compile_model(model, "CPU")
+        output = compiled.output(0)
+
+        self._infer = lambda blob: compiled([blob])[output]
+
+    def is_model_loaded(self) -> bool:
+        return self._infer is not None
+
+    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
+        return preprocess_for_detection(frame)
+
+    def _input_tensor(self, count: int) -> np.ndarray:
+        """Tensor de entrada (N, 3, lado, lado) reutilizado entre frames"""
+        size = self.input_size
+        return buffer_pool.get("detector_input", (count, 3, size, size), np.float32)
+
+    def _to_blob(self, image: np.ndarray, out: np.ndarray) -> Tuple[float, Tuple[int, int]]:
+        """
+        Escribe la imagen en ``out`` (3, lado, lado) como RGB normalizado
+
+        Equivale a ``cv2.dnn.blobFromImage(lienzo, 1/255, swapRB=True)`` sin
+        asignar el blob ni el lienzo en cada frame.
+        """
+        canvas, scale, offset = letterbox(image, self.input_size, reuse=True)
+        np.multiply(canvas.transpose(2, 0, 1)[::-1], np.float32(1.0 / 255.0), out=out)
+        return scale, offset
+
+    def _postprocess(self, output: np.ndarray, scale: float, offset: Tuple[int, int],
+                     image_shape: Tuple[int, int]) -> List[Tuple[int, int, int, int, float]]:
+        """Ver ``decode_yolov8``"""
+        return decode_yolov8(output, scale, offset, image_shape, self.confidence_threshold, self.iou_threshold)
+
+    def detect_faces(self, image: np.ndarray) -> List[Tuple[int, int, int, int, float]]:
+        """
+        Detecta rostros en la imagen
+
+        Args:
+            image: Imagen BGR
+
+        Returns:
+            Lista de (x, y, width, height, confianza)
+        """
+        try:
+            blob = self._input_tensor(1)
+            scale, offset = self._to_blob(image, blob[0])
+            output = np.asarray(self._infer(blob))
+            return self._postprocess(output, scale, offset, image.shape[:2])
+        except Exception as e:
+            logger.error(f"Error detectando rostros ({self.runtime}): {e}")
+            return []
+
+    def detect_faces_batch(self, images: List[np.ndarray]) -> List[List[Tuple[int, int, int, int, float]]]:
+        """
+        Detecta rostros en varias imágenes con una sola inferencia
+
+        Requiere un modelo exportado con lote dinámico (o del mismo tamaño);
+        en otro caso se ejecuta imagen por imagen.
+        """
+        if len(images) <= 1 or self.batch_size not in (None, len(images)):
+            return [self.detect_faces(image) for image in images]
+
+        try:
+            # Cada imagen se escribe directamente en su posición del lote
+            batch = self._input_tensor(len(images))
+            transforms = [self._to_blob(image, batch[i]) for i, image in enumerate(images)]
+            output = np.asarray(self._infer(batch))
+            return [
+                self._postprocess(output[i:i+1], scale, offset, image.shape[:2])
+                for i, ((scale, offset), image) in enumerate(zip(transforms, images))
+            ]
+        except Exception as e:
+            logger.error(f"Error en detección por lotes ({self.runtime}): {e}")
+            return [self.detect_faces(image) for image in images]
+
+    def extract_face_roi(self, image: np.ndarray, face_coords: Tuple[int, int, int, int]) -> Optional[np.ndarray]:
+        """Extrae la región del rostro recortada a los límites de la imagen"""
+        x, y, width, height = face_coords
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(image.shape[1], x + width), min(image.shape[0], y + height)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return image[y1:y2, x1:x2]
+
+
+def create_face_detector(backend: str = None):
+    """
+    Crea el detector de rostros del backend configurado
+
+    Un backend ONNX/OpenVINO que no se puede cargar es un error: no se
+    sustituye en silencio por PyTorch, que tiene otro rendimiento y otra
+    precisión que la configurada.
+
+    Args:
+        backend: ``torch``, ``onnx`` u ``openvino`` (por defecto ``settings.detector_backend``)
+
+    Raises:
+        ValueError: Backend desconocido
+        RuntimeError: El backend ONNX/OpenVINO configurado no se pudo cargar
+    """
+    backend = (backend or settings.detector_backend).lower()
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Backend de detector desconocido: {backend}")
+
+    if backend in ("onnx", "openvino"):
+        try:
+            return OnnxFaceDetector(runtime=backend)
+        except Exception as e:
+            raise RuntimeError(f"No se pudo cargar el backend de detector {backend}: {e}") from e
+
+    from app.models.yolo_detector import YOLODetector
+    return YOLODetector()
+
+
+def detect_faces_batch(detector, images: List[np.ndarray]) -> List[List[tuple]]:
+    """
+    Detecta rostros en varias imágenes usando el camino por lotes del detector si existe
+
+    Args:
+        detector: Detector de cualquier backend
+        images: Imágenes BGR
+
+    Returns:
+        Detecciones de cada imagen, en el mismo orden
+    """
+    if hasattr(detector, "detect_faces_batch"):
+        return detector.detect_faces_batch(images)
+    return [detector.detect_faces(image) for image in images]
+
+
+def compare_detections(reference: List[tuple], candidate: List[tuple], iou_threshold: float = 0.5) -> Dict[str, float]:
+    """
+    Compara las detecciones de dos backends sobre el mismo frame
+
+    Args:
+        reference: Detecciones del backend de referencia (torch)
+        candidate: Detecciones del backend a validar
+        iou_threshold: IoU mínima para considerar dos cajas la misma cara
+
+    Returns:
+        Caras emparejadas, no emparejadas, IoU media y diferencia media de confianza
+    """
+    from app.services.face_tracker import iou_matrix
+
+    ref_boxes = np.array([face[:4] for face in reference], dtype=np.float32).reshape(-1, 4)
+    cand_boxes = np.array([face[:4] for face in candidate], dtype=np.float32).reshape(-1, 4)
+    ious = iou_matrix(ref_boxes, cand_boxes)
+
+    matched_ious = []
+    confidence_diffs = []
+    used = set()
+    for r in range(len(reference)):
+        if ious.shape[1] == 0:
+            break
+        c = int(np.argmax(ious[r]))
+        if ious[r, c] >= iou_threshold and c not in used:
+            used.add(c)
+            matched_ious.append(float(ious[r, c]))
+            confidence_diffs.append(abs(float(reference[r][4]) - float(candidate[c][4])))
+
+    return {
+        "matched": len(matched_ious),
+        "missed": len(reference) - len(matched_ious),
+        "extra": len(candidate) - len(matched_ious),
+        "mean_iou": float(np.mean(matched_ious)) if matched_ious else 0.0,
+        "mean_confidence_diff": float(np.mean(confidence_diffs)) if confidence_diffs else 0.0
+    }
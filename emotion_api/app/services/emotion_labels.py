@@ -0,0 +1,99 @@
+"""
+Registro de etiquetas de emoción con identificadores enteros
+
+Cada emoción tiene un identificador pequeño y fijo; las detecciones se
+manejan como arrays de identificadores (con sus confianzas) y se agregan con
+``np.bincount``. Las salidas en español de cada vista (distribución agregada,
+categorías del dashboard) se obtienen multiplicando los conteos por matrices
+de mapeo precalculadas, en lugar de recorrer cadenas if/elif en cada llamada.
+"""
+
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Salida del clasificador, en el orden del modelo de DeepFace
+# (angry, disgust, fear, happy, sad, surprise, neutral)
+CLASSIFIER_LABELS: Tuple[str, ...] = ("enojo", "asco", "miedo", "felicidad", "tristeza", "sorpresa", "neutral")
+
+# Todas las etiquetas conocidas: las del clasificador, las de la distribución
+# agregada y los sinónimos que acepta el dashboard. La última recoge cualquier
+# nombre desconocido.
+EMOTION_LABELS: Tuple[str, ...] = CLASSIFIER_LABELS + (
+    "frustracion", "desmotivacion", "atencion_baja",
+    "alegria", "satisfaccion", "depresion", "ira",
+    "desconocida"
+)
+
+LABEL_IDS: Dict[str, int] = {label: i for i, label in enumerate(EMOTION_LABELS)}
+NUM_LABELS = len(EMOTION_LABELS)
+UNKNOWN_LABEL_ID = LABEL_IDS["desconocida"]
+
+# Emociones que guarda la ventana de agregación (en el orden de los documentos)
+STORED_EMOTIONS: Tuple[str, ...] = ("felicidad", "tristeza", "enojo", "asco", "miedo", "sorpresa", "neutral")
+
+# Campos de ``EmotionDistribution``
+METRIC_CATEGORIES: Tuple[str, ...] = ("frustracion", "tristeza", "enojo", "desmotivacion", "atencion_baja")
+
+# Categorías que muestra el dashboard en tiempo real
+REALTIME_CATEGORIES: Tuple[str, ...] = ("felicidad", "tristeza", "enojo", "neutral")
+
+
+def mapping_matrix(
+    categories: Sequence[str],
+    mapping: Dict[str, str],
+    default: Optional[str] = None
+) -> np.ndarray:
+    """
+    Matriz (etiquetas x categorías) que reparte cada etiqueta en su categoría
+
+    Args:
+        categories: Categorías de salida (columnas)
+        mapping: Etiqueta -> categoría
+        default: Categoría de las etiquetas sin mapeo (None = no cuentan)
+    """
+    matrix = np.zeros((NUM_LABELS, len(categories)), dtype=np.float64)
+    columns = {category: i for i, category in enumerate(categories)}
+    for label_id, label in enumerate(EMOTION_LABELS):
+        category = mapping.get(label, default)
+        if category is not None:
+            matrix[label_id, columns[category]] = 1.0
+    return matrix
+
+
+def label_id(label: str) -> int:
+    """Identificador de una etiqueta (``UNKNOWN_LABEL_ID`` si no está registrada)"""
+    return LABEL_IDS.get(label, UNKNOWN_LABEL_ID)
+
+
+def encode_labels(labels: Iterable[str]) -> np.ndarray:
+    """Convierte nombres de emoción en un array de identificadores"""
+    return np.fromiter((LABEL_IDS.get(label, UNKNOWN_LABEL_ID) for label in labels), dtype=np.intp)
+
+
+def label_counts(label_ids: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Conteo (o suma de ``weights``) por etiqueta
+
+    Returns:
+        Array de ``NUM_LABELS`` posiciones
+    """
+    return np.bincount(label_ids, weights=weights, minlength=NUM_LABELS).astype(np.float64, copy=False)
+
+
+# Identificadores de las emociones guardadas, en su orden
+STORED_LABEL_IDS = np.array([LABEL_IDS[label] for label in STORED_EMOTIONS], dtype=np.intp)
+
+# Detecciones -> campos de ``EmotionDistribution`` (las demás emociones cuentan
+# en el total pero en ninguna categoría)
+METRIC_MATRIX = mapping_matrix(METRIC_CATEGORIES, {category: category for category in METRIC_CATEGORIES})
+
+# Emociones -> categorías del dashboard (lo que no encaja es neutral)
+REALTIME_MATRIX = mapping_matrix(REALTIME_CATEGORIES, {
+    "felicidad": "felicidad", "alegria": "felicidad", "satisfaccion": "felicidad",
+    "tristeza": "tristeza", "desmotivacion": "tristeza", "depresion": "tristeza",
+    "enojo": "enojo", "frustracion": "enojo", "ira": "enojo"
+}, default="neutral")
+
+# Categoría del dashboard de cada etiqueta (consulta directa por identificador)
+REALTIME_CATEGORY_OF = REALTIME_MATRIX.argmax(axis=1)
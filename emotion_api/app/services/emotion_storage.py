@@ -5,26 +5,52 @@ Servicio para almacenar datos de emociones en tiempo real
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
+import threading
+import time
 from app.database.mongodb import get_database
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_labels import STORED_EMOTIONS, STORED_LABEL_IDS
+from app.services.emotion_window import WindowTotals, session_windows
 
 logger = logging.getLogger(__name__)
 
 class EmotionStorageService:
-    def __init__(self):
+    """
+    Agregación de emociones de una cámara y su guardado periódico
+    
+    Las detecciones se acumulan en el anillo de buckets por segundo de la
+    cámara, asociado a su sesión en ``session_windows``; la ventana de 30
+    segundos que se guarda y la distribución en vivo se calculan sumando
+    esos buckets.
+    
+    La ruta que inicia o termina la sesión y el hilo de persistencia del
+    pipeline usan el servicio a la vez: la sesión y la ventana se cambian
+    siempre bajo ``_lock``.
+    
+    Args:
+        source_id: Identificador de la cámara (un anillo por cámara y sesión)
+    """
+    
+    def __init__(self, source_id: str):
         self.db = None
         self.emotion_buffer = []  # Buffer para acumular emociones
         self.buffer_size = 10  # Guardar cada 10 detecciones
         self.buffer_timeout = 30  # O guardar cada 30 segundos
         
-        # Sistema de agregación cada 30 segundos (modo prueba)
-        self.emotion_counts = {
-            "felicidad": 0, "tristeza": 0, "enojo": 0,
-            "asco": 0, "miedo": 0, "sorpresa": 0, "neutral": 0
-        }
-        self.total_detections = 0
+        # Buckets por segundo de esta cámara y sesión a la que están asociados
+        self.source_id = source_id
+        self.session_id: Optional[str] = None
+        self.window = session_windows.create_ring()
+        
+        # Sistema de agregación cada 30 segundos (modo prueba): la ventana
+        # abarca los buckets desde window_start_second
         self.window_start = None
+        self.window_start_second: Optional[int] = None
         self.window_minutes = 0.5  # 30 segundos para pruebas
         
+        # Reentrante: set_session guarda la ventana pendiente con el lock tomado
+        self._lock = threading.RLock()
+        
     def initialize(self):
         """Inicializa la conexión a la base de datos"""
         try:
@@ -41,34 +67,94 @@ class EmotionStorageService:
             logger.error(f"Error inicializando base de datos: {e}")
             self.db = None
     
-    def start_aggregation_window(self):
-        """Inicia una nueva ventana de agregación de 30 segundos (modo prueba)"""
-        old_detections = self.total_detections
-        self.window_start = datetime.utcnow()
-        self.emotion_counts = {
-            "felicidad": 0, "tristeza": 0, "enojo": 0,
-            "asco": 0, "miedo": 0, "sorpresa": 0, "neutral": 0
-        }
-        self.total_detections = 0
-        logger.info(f"🔄 Nueva ventana iniciada - Anterior: {old_detections} detecciones - Nueva: {self.total_detections}")
+    def set_session(self, session_id: Optional[str]):
+        """
+        Asocia los buckets de la cámara a una sesión (o a ninguna)
+        
+        La ventana pendiente de la sesión anterior (incluido el segundo en
+        curso) se guarda antes de soltar sus buckets; después empieza una
+        ventana nueva. Puede hacer I/O a la base de datos: no llamarlo desde
+        el event loop.
+        """
+        with self._lock:
+            if session_id == self.session_id:
+                return
+            if self.session_id is not None:
+                self._save_window(self.session_id, final=True)
+                session_windows.detach(self.session_id, self.source_id)
+            self.window.clear()
+            self.session_id = session_id
+            if session_id is not None:
+                session_windows.attach(session_id, self.source_id, self.window)
+            self.start_aggregation_window()
     
-    def add_emotion_to_aggregation(self, emotion: str, confidence: float):
+    def start_aggregation_window(self, start_second: Optional[int] = None):
         """
-        Agrega una emoción a la ventana de agregación actual
+        Inicia una nueva ventana de agregación de 30 segundos (modo prueba)
         
         Args:
-            emotion: Emoción detectada
-            confidence: Nivel de confianza (0-1)
+            start_second: Primer segundo (epoch) de la ventana (None = el actual)
+        """
+        with self._lock:
+            old_detections = self.total_detections if self.window_start_second is not None else 0
+            self.window_start_second = int(time.time()) if start_second is None else start_second
+            self.window_start = datetime.utcfromtimestamp(self.window_start_second)
+        logger.info(f"🔄 Nueva ventana iniciada - Anterior: {old_detections} detecciones - Nueva: {self.total_detections}")
+    
+    def _window_totals(self, until: Optional[int] = None) -> WindowTotals:
+        """Suma de los buckets de la ventana actual (``until`` excluido)"""
+        if self.window_start_second is None:
+            return WindowTotals.zeros()
+        return self.window.totals(since=self.window_start_second, until=until)
+    
+    @property
+    def total_detections(self) -> int:
+        """Rostros clasificados en la ventana actual"""
+        return self._window_totals().classified
+    
+    def add_batch(self, detections: DetectionBatch, session_id: Optional[str] = None):
         """
-        # Las emociones ya vienen en español del emotion_classifier
-        # Inicializar contador si no existe
-        if emotion not in self.emotion_counts:
-            self.emotion_counts[emotion] = 0
+        Agrega un lote de detecciones en el bucket de su segundo
         
-        self.emotion_counts[emotion] += confidence
-        self.total_detections += 1
+        Args:
+            detections: Detecciones del frame
+            session_id: Sesión con la que se leyó el lote; si ya no es la
+                asociada (la sesión cambió mientras se persistía) se descarta
+        
+        Returns:
+            True si el lote se agregó a la ventana
+        """
+        with self._lock:
+            if session_id is not None and session_id != self.session_id:
+                logger.debug(f"Lote de la sesión {session_id} descartado: la cámara está en {self.session_id}")
+                return False
+            self.window.add_batch(detections)
+            return True
+    
+    @staticmethod
+    def _averages(totals: WindowTotals) -> Dict[str, float]:
+        """Promedio de confianza por emoción guardada (0-100)"""
+        total = totals.classified
+        if not total:
+            return {emotion: 0.0 for emotion in STORED_EMOTIONS}
+        averages = totals.confidence_sums[STORED_LABEL_IDS] * (100.0 / total)
+        return dict(zip(STORED_EMOTIONS, averages.tolist()))
+    
+    def get_window_distribution(self) -> Dict:
+        """
+        Distribución de la ventana de agregación actual (sin guardarla)
         
-        logger.debug(f"Emoción agregada: {emotion} ({confidence:.2f}) - Total: {self.total_detections}")
+        Returns:
+            Promedio de confianza por emoción (0-100), detecciones e inicio de la ventana
+        """
+        totals = self._window_totals()
+        return {
+            "emotion_distribution": {
+                emotion: round(average, 2) for emotion, average in self._averages(totals).items()
+            },
+            "total_faces_detected": totals.classified,
+            "window_start": self.window_start.isoformat() if self.window_start else None
+        }
     
     def should_save_aggregation(self) -> bool:
         """Verifica si debe guardar la agregación (cada 30 segundos para pruebas)"""
@@ -92,43 +178,59 @@ class EmotionStorageService:
         """
         Guarda la agregación de emociones de 30 segundos en la base de datos (modo prueba)
         
+        Args:
+            session_id: ID de la sesión (si ya no es la asociada, su ventana
+                la guardó set_session y no se hace nada)
+        """
+        with self._lock:
+            if session_id != self.session_id:
+                logger.info(f"Sesión {session_id} ya cerrada - su ventana se guardó al cambiar de sesión")
+                return
+            self._save_window(session_id)
+    
+    def _save_window(self, session_id: str, final: bool = False):
+        """
+        Guarda la ventana actual y empieza la siguiente (con ``_lock`` tomado)
+        
         Args:
             session_id: ID de la sesión
+            final: Incluir el segundo en curso (la sesión termina y no habrá
+                ventana siguiente que lo recoja)
         """
-        logger.info(f"Iniciando guardado de agregación - Detecciones: {self.total_detections}, DB: {self.db is not None}")
+        # La ventana guardada son los buckets completos hasta el segundo actual
+        # (excluido); el segundo en curso pasa a la ventana siguiente
+        end_second = int(time.time())
+        totals = self._window_totals(until=None if final else end_second)
+        
+        logger.info(f"Iniciando guardado de agregación - Detecciones: {totals.classified}, DB: {self.db is not None}")
         
         if self.db is None:
             logger.info("Inicializando conexión a base de datos...")
             self.initialize()
         
-        if self.total_detections == 0:
+        if totals.classified == 0:
             logger.info("No hay detecciones para guardar en esta ventana")
             return
         
         try:
-            # Calcular promedios y convertir a float de Python
-            emotion_averages = {}
-            for emotion, total_confidence in self.emotion_counts.items():
-                # Convertir numpy.float32 a float de Python para MongoDB
-                average = (total_confidence / self.total_detections) * 100
-                emotion_averages[emotion] = float(average)
+            # Calcular promedios (floats de Python para MongoDB)
+            emotion_averages = self._averages(totals)
             
             # Crear documento de agregación simplificado
             from bson import ObjectId
             aggregation_doc = {
                 "classroomSessions_id": ObjectId(session_id),
+                "window_start": self.window_start,
+                "timestamp": datetime.utcnow() if final else datetime.utcfromtimestamp(end_second),
                 "emotion_distribution": emotion_averages,
-                "total_faces_detected": int(self.total_detections)
+                "total_faces_detected": totals.classified
             }
             
             # Guardar en base de datos
             if self.db is not None:
                 logger.info(f"Guardando en MongoDB: {aggregation_doc}")
                 result = self.db.emotion_metrics.insert_one(aggregation_doc)
-                logger.info(f"✅ Guardada agregación de 30 segundos: {self.total_detections} detecciones - ID: {result.inserted_id}")
-                
-                # Reiniciar ventana
-                self.start_aggregation_window()
+                logger.info(f"✅ Guardada agregación de 30 segundos: {totals.classified} detecciones - ID: {result.inserted_id}")
             else:
                 logger.error("❌ Base de datos no inicializada - no se puede guardar")
             
@@ -139,7 +241,7 @@ class EmotionStorageService:
         finally:
             # SIEMPRE reiniciar ventana, incluso si hay error
             logger.info("🔄 Reiniciando ventana de agregación...")
-            self.start_aggregation_window()
+            self.start_aggregation_window(end_second)
         
     async def save_emotion_detection(
         self, 
@@ -331,7 +433,3 @@ class EmotionStorageService:
                 "most_common_emotion": "neutral",
                 "session_duration_minutes": 0
             }
-    
-
-# Instancia global del servicio
-emotion_storage = EmotionStorageService()
@@ -0,0 +1,212 @@
+"""
+Ventanas deslizantes de emociones en memoria
+
+Cada cámara con sesión acumula sus detecciones en un anillo de buckets de un
+segundo (rostros, conteo y suma de confianzas por etiqueta). Las
+distribuciones de los últimos 10 s, 30 s o 5 min se responden sumando los
+buckets de ese intervalo, sin consultar la base de datos, y los agregados
+periódicos que se guardan en ``emotion_metrics`` salen de los mismos buckets.
+"""
+
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_labels import NUM_LABELS, label_counts
+from app.services.realtime_snapshot import realtime_distribution
+
+
+class WindowTotals(NamedTuple):
+    """Suma de los buckets de un intervalo"""
+    # Rostros clasificados por identificador de etiqueta
+    counts: np.ndarray
+    # Suma de confianzas por identificador de etiqueta
+    confidence_sums: np.ndarray
+    # Rostros detectados (clasificados o no)
+    faces: int
+
+    @classmethod
+    def zeros(cls) -> "WindowTotals":
+        return cls(np.zeros(NUM_LABELS), np.zeros(NUM_LABELS), 0)
+
+    def __add__(self, other: "WindowTotals") -> "WindowTotals":
+        return WindowTotals(
+            self.counts + other.counts,
+            self.confidence_sums + other.confidence_sums,
+            self.faces + other.faces
+        )
+
+    @property
+    def classified(self) -> int:
+        return int(self.counts.sum())
+
+
+class EmotionBucketRing:
+    """
+    Anillo de buckets de un segundo
+
+    Args:
+        horizon_seconds: Segundos que se conservan (ventana máxima consultable)
+    """
+
+    def __init__(self, horizon_seconds: int = 300):
+        self.horizon = max(1, int(horizon_seconds))
+        self._lock = threading.Lock()
+        # Segundo (epoch) al que corresponde cada slot; -1 = vacío
+        self._seconds = np.full(self.horizon, -1, dtype=np.int64)
+        self._counts = np.zeros((self.horizon, NUM_LABELS), dtype=np.float64)
+        self._confidence_sums = np.zeros((self.horizon, NUM_LABELS), dtype=np.float64)
+        self._faces = np.zeros(self.horizon, dtype=np.int64)
+
+    def clear(self):
+        with self._lock:
+            self._seconds.fill(-1)
+            self._counts.fill(0)
+            self._confidence_sums.fill(0)
+            self._faces.fill(0)
+
+    def add(
+        self,
+        label_ids: np.ndarray,
+        confidences: np.ndarray,
+        timestamp: Optional[float] = None,
+        faces: Optional[int] = None
+    ):
+        """
+        Acumula las emociones de un frame en el bucket de su segundo
+
+        Args:
+            label_ids: Identificadores de etiqueta de los rostros clasificados
+            confidences: Confianza de cada uno (0-1)
+            timestamp: Momento de captura (None = ahora)
+            faces: Rostros detectados en el frame (None = los clasificados)
+        """
+        second = int(time.time() if timestamp is None else timestamp)
+        slot = second % self.horizon
+        counts = label_counts(label_ids)
+        confidence_sums = label_counts(label_ids, weights=confidences)
+        with self._lock:
+            current = self._seconds[slot]
+            if current > second:
+                # Más antiguo que el horizonte: su bucket ya se reutilizó
+                return
+            if current != second:
+                self._seconds[slot] = second
+                self._counts[slot] = 0
+                self._confidence_sums[slot] = 0
+                self._faces[slot] = 0
+            self._counts[slot] += counts
+            self._confidence_sums[slot] += confidence_sums
+            self._faces[slot] += len(label_ids) if faces is None else faces
+
+    def add_batch(self, detections: DetectionBatch):
+        """Acumula un lote de detecciones en el bucket de su timestamp"""
+        label_ids, confidences = detections.classified_emotions()
+        self.add(label_ids, confidences, detections.timestamp, len(detections))
+
+    def totals(
+        self,
+        seconds: Optional[int] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        now: Optional[float] = None
+    ) -> WindowTotals:
+        """
+        Suma de los buckets de un intervalo, en O(buckets del intervalo)
+
+        Args:
+            seconds: Últimos N segundos (incluido el actual)
+            since: Primer segundo (epoch) del intervalo, si no se da ``seconds``
+            until: Segundo (epoch) final, excluido (None = hasta el actual incluido)
+            now: Momento de referencia (None = ahora)
+        """
+        if until is None:
+            end = int(time.time() if now is None else now) + 1
+        else:
+            end = int(until)
+        if seconds is not None:
+            start = end - int(seconds)
+        elif since is not None:
+            start = int(since)
+        else:
+            start = end - self.horizon
+        start = max(start, end - self.horizon)
+        if start >= end:
+            return WindowTotals.zeros()
+
+        wanted = np.arange(start, end, dtype=np.int64)
+        slots = wanted % self.horizon
+        with self._lock:
+            slots = slots[self._seconds[slots] == wanted]
+            return WindowTotals(
+                self._counts[slots].sum(axis=0),
+                self._confidence_sums[slots].sum(axis=0),
+                int(self._faces[slots].sum())
+            )
+
+
+class SessionWindowRegistry:
+    """
+    Anillos de buckets de cada sesión (uno por cámara de la sesión)
+
+    Args:
+        horizon_seconds: Segundos que conserva cada anillo
+    """
+
+    def __init__(self, horizon_seconds: int = 300):
+        self.horizon_seconds = horizon_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, EmotionBucketRing]] = {}
+
+    def create_ring(self) -> EmotionBucketRing:
+        return EmotionBucketRing(self.horizon_seconds)
+
+    def attach(self, session_id: str, source_id: str, ring: EmotionBucketRing):
+        """Asocia el anillo de una cámara a una sesión"""
+        with self._lock:
+            self._sessions.setdefault(session_id, {})[source_id] = ring
+
+    def detach(self, session_id: str, source_id: str):
+        """Quita el anillo de una cámara de una sesión"""
+        with self._lock:
+            rings = self._sessions.get(session_id)
+            if rings is None:
+                return
+            rings.pop(source_id, None)
+            if not rings:
+                del self._sessions[session_id]
+
+    def totals(self, session_id: Optional[str], seconds: int) -> WindowTotals:
+        """Suma de los últimos ``seconds`` segundos de todas las cámaras de la sesión"""
+        with self._lock:
+            rings = list(self._sessions.get(session_id, {}).values()) if session_id else []
+        totals = WindowTotals.zeros()
+        for ring in rings:
+            totals = totals + ring.totals(seconds=seconds)
+        return totals
+
+    def distribution(self, session_id: Optional[str], seconds: int) -> Dict[str, Any]:
+        """
+        Distribución del dashboard de los últimos ``seconds`` segundos (vacía sin sesión)
+
+        Returns:
+            Porcentaje y conteo por categoría (sobre los rostros detectados) y ``total_detections``
+        """
+        seconds = min(max(1, int(seconds)), self.horizon_seconds)
+        totals = self.totals(session_id, seconds)
+        return {**realtime_distribution(totals.counts, totals.faces), "window_seconds": seconds}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "horizon_seconds": self.horizon_seconds,
+                "sessions": {session_id: sorted(rings) for session_id, rings in self._sessions.items()}
+            }
+
+
+# Instancia global del registro
+session_windows = SessionWindowRegistry(horizon_seconds=settings.emotion_window_horizon_seconds)
@@ -0,0 +1,328 @@
+"""
+Seguimiento de rostros entre frames para no reclasificar rostros estables
+
+Asocia las detecciones de cada frame con pistas existentes por IoU. Cada
+pista se reclasifica sólo cada N frames o cuando su apariencia cambia; entre
+medias se reutiliza la última etiqueta. Con velocidad constante por pista
+(en píxeles por segundo), el tracker también puede predecir las cajas de los
+frames en los que no se ejecuta el detector, según el tiempo transcurrido
+desde la última posición conocida. Esas cajas predichas nunca actualizan las
+pistas: sólo las detecciones reales mueven las cajas y las hacen caducar.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Lado de la miniatura usada como firma de apariencia
+SIGNATURE_SIZE = 16
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Calcula la IoU entre dos conjuntos de cajas (x, y, w, h)
+
+    Args:
+        boxes_a: Array (N, 4)
+        boxes_b: Array (M, 4)
+
+    Returns:
+        Matriz (N, M) de IoU
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a.astype(np.float32)
+    b = boxes_b.astype(np.float32)
+
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    y2 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = a[:, 2] * a[:, 3]
+    area_b = b[:, 2] * b[:, 3]
+    union = area_a[:, None] + area_b[None, :] - intersection
+
+    return np.where(union > 0, intersection / np.maximum(union, 1e-6), 0.0)
+
+
+def appearance_signature(face_roi: np.ndarray) -> np.ndarray:
+    """Miniatura en grises del rostro, usada para detectar cambios de apariencia"""
+    gray = face_roi if face_roi.ndim == 2 else cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class Track:
+    """Estado de un rostro seguido entre frames"""
+
+    __slots__ = ("track_id", "box", "updated_at", "velocity", "detection_confidence", "label", "confidence",
+                 "signature", "frames_since_classified", "missed")
+
+    def __init__(
+        self,
+        track_id: int,
+        box: Tuple[int, int, int, int],
+        detection_confidence: float = 0.0,
+        updated_at: float = 0.0
+    ):
+        self.track_id = track_id
+        self.box = box
+        # Instante del frame al que corresponde ``box``
+        self.updated_at = updated_at
+        # Píxeles por segundo en x, y
+        self.velocity = np.zeros(2, dtype=np.float32)
+        self.detection_confidence = detection_confidence
+        self.label: Optional[str] = None
+        self.confidence = 0.0
+        self.signature: Optional[np.ndarray] = None
+        self.frames_since_classified = 0
+        self.missed = 0
+
+
+class FaceTracker:
+    """
+    Tracker multi-rostro por asociación IoU con IDs estables
+
+    Args:
+        iou_threshold: IoU mínima para asociar una detección a una pista
+        max_missed: Frames sin detección antes de descartar una pista
+        reclassify_every: Frames entre reclasificaciones de una misma pista
+        appearance_threshold: Diferencia media de la firma (0-255) que fuerza reclasificar
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = 0.3,
+        max_missed: int = 10,
+        reclassify_every: int = 15,
+        appearance_threshold: float = 12.0
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reclassify_every = max(1, reclassify_every)
+        self.appearance_threshold = appearance_threshold
+
+        self.tracks: Dict[int, Track] = {}
+        self._next_id = 1
+        # Detección y clasificación corren en hilos distintos
+        self._lock = threading.RLock()
+
+        # Métricas
+        self.classified = 0
+        self.carried_forward = 0
+
+    def reset(self):
+        """Descarta todas las pistas"""
+        with self._lock:
+            self.tracks.clear()
+            self._next_id = 1
+
+    def has_tracks(self) -> bool:
+        """Indica si hay pistas vistas en el último frame"""
+        with self._lock:
+            return any(track.missed == 0 for track in self.tracks.values())
+
+    def predict(self, timestamp: Optional[float] = None) -> List[tuple]:
+        """
+        Predice las cajas de un frame sin ejecutar el detector
+
+        La clasificación (que actualiza las pistas) puede ir varios frames por
+        detrás de la detección, así que el desplazamiento se escala por el
+        tiempo transcurrido desde la última posición de cada pista.
+
+        Args:
+            timestamp: Instante de captura del frame (None = ahora)
+
+        Returns:
+            Detecciones (x, y, w, h, confianza) extrapoladas con la velocidad de cada pista
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            faces = []
+            for track in self.tracks.values():
+                if track.missed > 0:
+                    continue
+                x, y, w, h = track.box
+                elapsed = max(0.0, timestamp - track.updated_at)
+                dx, dy = track.velocity * elapsed
+                faces.append((max(0, int(round(x + dx))), max(0, int(round(y + dy))), w, h, track.detection_confidence))
+            return faces
+
+    def update(self, faces: List[tuple], timestamp: Optional[float] = None) -> List[Track]:
+        """
+        Asocia las detecciones del frame con las pistas existentes
+
+        Args:
+            faces: Detecciones (x, y, w, h[, confianza]) del frame
+            timestamp: Instante de captura del frame (None = ahora)
+
+        Returns:
+            La pista asignada a cada detección, en el mismo orden
+        """
+        with self._lock:
+            return self._update(faces, time.time() if timestamp is None else timestamp)
+
+    def _associate(self, track_ids: List[int], boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int]]:
+        """Asociación voraz por IoU descendente como pares (índice de pista, índice de caja)"""
+        track_boxes = np.array([self.tracks[tid].box for tid in track_ids], dtype=np.float32).reshape(-1, 4)
+        det_boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+        ious = iou_matrix(track_boxes, det_boxes)
+
+        matches = []
+        matched_tracks = set()
+        matched_boxes = set()
+        if ious.size:
+            order = np.argsort(ious, axis=None)[::-1]
+            for flat_index in order:
+                t, d = np.unravel_index(flat_index, ious.shape)
+                if ious[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_boxes:
+                    continue
+                matches.append((int(t), int(d)))
+                matched_tracks.add(t)
+                matched_boxes.add(d)
+        return matches
+
+    def _update(self, faces: List[tuple], timestamp: float) -> List[Track]:
+        boxes = [tuple(int(v) for v in face[:4]) for face in faces]
+        track_ids = list(self.tracks.keys())
+        assigned: List[Optional[Track]] = [None] * len(boxes)
+        matched_tracks = set()
+
+        for t, d in self._associate(track_ids, boxes):
+            track = self.tracks[track_ids[t]]
+            # Velocidad suavizada de la posición de la caja (píxeles/s)
+            elapsed = timestamp - track.updated_at
+            if elapsed > 0:
+                displacement = np.array(boxes[d][:2], dtype=np.float32) - np.array(track.box[:2], dtype=np.float32)
+                track.velocity = 0.5 * track.velocity + 0.5 * displacement / elapsed
+                track.updated_at = timestamp
+            track.box = boxes[d]
+            if len(faces[d]) > 4:
+                track.detection_confidence = float(faces[d][4])
+            track.missed = 0
+            assigned[d] = track
+            matched_tracks.add(t)
+
+        # Pistas sin detección en este frame
+        for t, tid in enumerate(track_ids):
+            if t not in matched_tracks:
+                track = self.tracks[tid]
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    del self.tracks[tid]
+
+        # Nuevas pistas para detecciones sin asociar
+        for d, track in enumerate(assigned):
+            if track is None:
+                confidence = float(faces[d][4]) if len(faces[d]) > 4 else 0.0
+                track = Track(self._next_id, boxes[d], confidence, timestamp)
+                self.tracks[track.track_id] = track
+                self._next_id += 1
+                assigned[d] = track
+
+        return assigned
+
+    def _needs_classification(self, track: Track, signature: np.ndarray) -> bool:
+        if track.label is None or track.signature is None:
+            return True
+        if track.frames_since_classified >= self.reclassify_every:
+            return True
+        difference = float(np.mean(np.abs(signature - track.signature)))
+        return difference > self.appearance_threshold
+
+    def classify(
+        self,
+        faces: List[tuple],
+        face_rois: List[np.ndarray],
+        classifier,
+        timestamp: Optional[float] = None,
+        detected: bool = True
+    ) -> Tuple[List[Optional[Track]], List[Tuple[str, float]]]:
+        """
+        Clasifica sólo los rostros cuyas pistas lo necesitan
+
+        Args:
+            faces: Detecciones (x, y, w, h, confianza) de los rostros válidos del frame
+            face_rois: Regiones de rostro en el mismo orden
+            classifier: Clasificador por lotes (``classify_batch``)
+            timestamp: Instante de captura del frame (None = ahora)
+            detected: False si las cajas vienen de ``predict`` (frame sin detector)
+
+        Returns:
+            Pistas (None si una caja predicha no corresponde a ninguna) y
+            (emoción, confianza) de cada rostro, en el orden de entrada
+        """
+        with self._lock:
+            if not detected:
+                return self._carry_forward(faces, face_rois, classifier)
+            return self._classify(faces, face_rois, classifier, time.time() if timestamp is None else timestamp)
+
+    def _carry_forward(self, faces, face_rois, classifier):
+        """
+        Frame sin detector: reutiliza las etiquetas de las pistas sin tocarlas
+
+        Las cajas son extrapolaciones del propio tracker; tratarlas como
+        medidas congelaría la velocidad y evitaría que las pistas perdidas
+        acumulen frames sin detección. Sólo se clasifican las cajas que ya no
+        corresponden a ninguna pista clasificada (sin crear pistas nuevas).
+        """
+        boxes = [tuple(int(v) for v in face[:4]) for face in faces]
+        track_ids = [tid for tid, track in self.tracks.items() if track.missed == 0 and track.label is not None]
+        tracks: List[Optional[Track]] = [None] * len(boxes)
+        for t, d in self._associate(track_ids, boxes):
+            tracks[d] = self.tracks[track_ids[t]]
+
+        results = [(track.label, track.confidence) if track else None for track in tracks]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if pending:
+            for i, result in zip(pending, classifier.classify_batch([face_rois[i] for i in pending])):
+                results[i] = result
+
+        self.classified += len(pending)
+        self.carried_forward += len(boxes) - len(pending)
+        return tracks, results
+
+    def _classify(self, faces, face_rois, classifier, timestamp):
+        tracks = self._update(faces, timestamp)
+        signatures = [appearance_signature(roi) for roi in face_rois]
+
+        pending = [i for i, track in enumerate(tracks) if self._needs_classification(track, signatures[i])]
+
+        if pending:
+            results = classifier.classify_batch([face_rois[i] for i in pending])
+            for i, (emotion, emotion_confidence) in zip(pending, results):
+                track = tracks[i]
+                track.label = emotion
+                track.confidence = emotion_confidence
+                track.signature = signatures[i]
+                track.frames_since_classified = 0
+
+        pending_set = set(pending)
+        for i, track in enumerate(tracks):
+            if i not in pending_set:
+                track.frames_since_classified += 1
+
+        self.classified += len(pending)
+        self.carried_forward += len(tracks) - len(pending)
+
+        return tracks, [(track.label, track.confidence) for track in tracks]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Métricas del tracker"""
+        total = self.classified + self.carried_forward
+        return {
+            "active_tracks": len(self.tracks),
+            "classified": self.classified,
+            "carried_forward": self.carried_forward,
+            "classification_ratio": round(self.classified / total, 3) if total else 0.0
+        }
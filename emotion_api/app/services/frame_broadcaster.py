@@ -0,0 +1,355 @@
+"""
+Difusión MJPEG con codificación única por frame
+
+El pipeline publica frames sin codificar; la codificación JPEG se hace
+bajo demanda la primera vez que un cliente pide una versión nueva y el
+resultado se comparte con todos los clientes. Sin clientes no se codifica.
+
+Cada perfil de stream distinto (ancho máximo, calidad, anotado) tiene su
+propia variante reducida y codificada, compartida por los clientes que usan
+el mismo perfil; la variante se descarta cuando su último cliente se va.
+
+Los frames llegan limpios junto con sus metadatos (cajas, etiquetas); las
+anotaciones sólo se dibujan en las variantes que las piden.
+
+Los clientes async esperan la notificación de una versión nueva en lugar
+de sondear: el hilo del pipeline despierta al event loop sólo si hay
+alguien esperando.
+"""
+
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from app.utils.buffer_pool import buffer_pool
+
+logger = logging.getLogger(__name__)
+
+
+class EncodedFrame(NamedTuple):
+    """JPEG servido a un cliente"""
+    version: int
+    # Secuencia del frame en el pipeline (enlaza con los metadatos de overlay)
+    seq: int
+    data: Optional[bytes]
+
+
+@dataclass(frozen=True)
+class StreamProfile:
+    """
+    Perfil negociado por un cliente del stream
+
+    Args:
+        max_width: Ancho máximo del frame (0 = resolución original)
+        fps: FPS máximos que recibe el cliente (0 = todos los frames)
+        quality: Calidad JPEG (0-100)
+        annotated: Dibujar cajas y etiquetas en el servidor
+    """
+    max_width: int = 0
+    fps: float = 0.0
+    quality: int = 85
+    annotated: bool = False
+
+    @classmethod
+    def from_params(
+        cls,
+        max_width: Optional[int] = None,
+        fps: Optional[float] = None,
+        quality: Optional[int] = None,
+        annotated: Optional[bool] = None,
+        default_quality: int = 85,
+        default_annotated: bool = False
+    ) -> "StreamProfile":
+        """Normaliza los parámetros de la petición a rangos válidos"""
+        return cls(
+            max_width=max(64, int(max_width)) if max_width else 0,
+            fps=min(max(0.5, float(fps)), 60.0) if fps else 0.0,
+            quality=min(max(10, int(quality)), 95) if quality else default_quality,
+            annotated=default_annotated if annotated is None else bool(annotated)
+        )
+
+    @property
+    def variant_key(self) -> Tuple[int, int, bool]:
+        """Clave de la variante codificada (los FPS se aplican por cliente)"""
+        return self.max_width, self.quality, self.annotated
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"max_width": self.max_width, "fps": self.fps, "quality": self.quality, "annotated": self.annotated}
+
+
+class _Variant:
+    """JPEG en caché de una combinación (ancho máximo, calidad, anotado)"""
+
+    __slots__ = ("max_width", "quality", "annotated", "version", "seq", "data", "subscribers", "encoded", "lock")
+
+    def __init__(self, max_width: int, quality: int, annotated: bool):
+        self.max_width = max_width
+        self.quality = quality
+        self.annotated = annotated
+        self.version = 0
+        self.seq = 0
+        self.data: Optional[bytes] = None
+        self.subscribers = 0
+        self.encoded = 0
+        # Serializa las codificaciones de esta variante (una por versión)
+        self.lock = threading.Lock()
+
+    def encode(self, frame: np.ndarray, metadata: Any = None, render: Optional[Callable] = None) -> Optional[bytes]:
+        if self.annotated and render is not None and metadata is not None:
+            # Etapa de render opcional: se dibuja sobre una copia (del pool), nunca sobre el frame compartido
+            canvas = buffer_pool.get("render", frame.shape, frame.dtype)
+            np.copyto(canvas, frame)
+            frame = render(canvas, metadata)
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            new_height = max(1, round(height * self.max_width / width))
+            frame = cv2.resize(
+                frame, (self.max_width, new_height),
+                dst=buffer_pool.get("encode_resized", (new_height, self.max_width) + frame.shape[2:], frame.dtype),
+                interpolation=cv2.INTER_AREA
+            )
+        ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes() if ret else None
+
+
+class FrameBroadcaster:
+    """
+    Último frame de una cámara y sus JPEG compartidos entre clientes
+
+    Args:
+        quality: Calidad JPEG del perfil por defecto (0-100)
+        annotated: Si el perfil por defecto lleva las anotaciones dibujadas
+        render: ``render(frame, metadata)`` que dibuja las anotaciones sobre el frame
+    """
+
+    def __init__(
+        self,
+        quality: int = 85,
+        annotated: bool = False,
+        render: Optional[Callable[[np.ndarray, Any], np.ndarray]] = None
+    ):
+        self.quality = quality
+        self.annotated = annotated
+        self.render = render
+        self.default_profile = StreamProfile(quality=quality, annotated=annotated)
+        self._lock = threading.Lock()
+        self._frame: Optional[np.ndarray] = None
+        self._metadata: Any = None
+        self._version = 0
+        self._variants: Dict[Tuple[int, int, bool], _Variant] = {}
+        self.subscribers = 0
+
+        # Notificación al event loop de los clientes async
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._frame_event: Optional[asyncio.Event] = None
+        self._waiters = 0
+
+        # Métricas
+        self.frames_published = 0
+        self.frames_encoded = 0
+        self.frames_served = 0
+
+    def profile(
+        self,
+        max_width: Optional[int] = None,
+        fps: Optional[float] = None,
+        quality: Optional[int] = None,
+        annotated: Optional[bool] = None
+    ) -> StreamProfile:
+        """Perfil normalizado con los valores por defecto de este broadcaster"""
+        return StreamProfile.from_params(
+            max_width, fps, quality, annotated,
+            default_quality=self.quality, default_annotated=self.annotated
+        )
+
+    def publish(self, frame: np.ndarray, metadata: Any = None):
+        """
+        Publica un frame nuevo (no se codifica hasta que alguien lo pida)
+
+        Args:
+            frame: Frame limpio, sin anotaciones
+            metadata: Resultados del frame (``FrameSnapshot``) para el overlay
+        """
+        with self._lock:
+            self._frame = frame
+            self._metadata = metadata
+            self._version += 1
+            self.frames_published += 1
+        self._signal()
+
+    def clear(self):
+        """Olvida el último frame (al detener la cámara)"""
+        with self._lock:
+            self._frame = None
+            self._metadata = None
+            self._version += 1
+            for variant in self._variants.values():
+                variant.data = None
+        self._signal()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def latest_metadata(self) -> Tuple[int, Any, Optional[Tuple[int, int]]]:
+        """Metadatos del último frame como (versión, metadatos, (ancho, alto))"""
+        with self._lock:
+            frame = self._frame
+            size = (frame.shape[1], frame.shape[0]) if frame is not None else None
+            return self._version, self._metadata, size
+
+    def _seq(self) -> int:
+        return getattr(self._metadata, "seq", 0) if self._metadata is not None else 0
+
+    def subscribe(self, profile: Optional[StreamProfile] = None):
+        """Registra un cliente del stream con su perfil"""
+        key = (profile or self.default_profile).variant_key
+        with self._lock:
+            self.subscribers += 1
+            variant = self._variants.get(key)
+            if variant is None:
+                variant = self._variants[key] = _Variant(*key)
+            variant.subscribers += 1
+
+    def unsubscribe(self, profile: Optional[StreamProfile] = None):
+        """Da de baja un cliente; la variante sin clientes se descarta"""
+        key = (profile or self.default_profile).variant_key
+        with self._lock:
+            self.subscribers = max(0, self.subscribers - 1)
+            variant = self._variants.get(key)
+            if variant is not None:
+                variant.subscribers -= 1
+                if variant.subscribers <= 0:
+                    del self._variants[key]
+
+    def _signal(self):
+        """Despierta a los clientes async (desde cualquier hilo)"""
+        loop = self._loop
+        if loop is None or not self._waiters:
+            return
+        try:
+            loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:
+            # El event loop ya se cerró
+            self._loop = None
+
+    def _notify(self):
+        if self._frame_event is not None:
+            self._frame_event.set()
+            self._frame_event = None
+
+    async def wait_for_version(self, after: int, timeout: Optional[float] = None) -> int:
+        """
+        Espera a que haya una versión posterior a ``after``
+
+        Returns:
+            La versión actual (igual a ``after`` si se agotó el tiempo)
+        """
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        # Registrarse antes de comprobar la versión: un publish concurrente
+        # o bien ya es visible, o bien verá al esperador y notificará
+        self._waiters += 1
+        try:
+            while self._version <= after:
+                if self._frame_event is None:
+                    self._frame_event = asyncio.Event()
+                event = self._frame_event
+                remaining = deadline - loop.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            self._waiters -= 1
+        return self._version
+
+    def _cached(self, key: Tuple[int, int, bool]) -> Optional[_Variant]:
+        variant = self._variants.get(key)
+        if variant is not None and variant.data is not None and variant.version == self._version:
+            return variant
+        return None
+
+    def get_jpeg(self, profile: Optional[StreamProfile] = None) -> EncodedFrame:
+        """
+        JPEG del último frame para un perfil
+
+        Codifica sólo si la versión cambió desde la última codificación de
+        la variante; los demás clientes del mismo perfil reciben los mismos bytes.
+        La codificación se hace fuera del lock del broadcaster (que también
+        toma ``publish`` desde el pipeline); el lock de cada variante basta
+        para codificar una sola vez por versión.
+        """
+        key = (profile or self.default_profile).variant_key
+        with self._lock:
+            if self._frame is None:
+                return EncodedFrame(self._version, 0, None)
+            variant = self._variants.get(key)
+            if variant is None:
+                frame, metadata, version, seq = self._frame, self._metadata, self._version, self._seq()
+
+        if variant is None:
+            # Petición puntual sin suscripción: no se guarda en caché
+            return EncodedFrame(version, seq, _Variant(*key).encode(frame, metadata, self.render))
+
+        with variant.lock:
+            with self._lock:
+                frame, metadata, version, seq = self._frame, self._metadata, self._version, self._seq()
+                if frame is None:
+                    return EncodedFrame(version, 0, None)
+                if variant.version == version and variant.data is not None:
+                    # Otro cliente codificó esta versión mientras se esperaba
+                    self.frames_served += 1
+                    return EncodedFrame(variant.version, variant.seq, variant.data)
+
+            data = variant.encode(frame, metadata, self.render)
+
+            with self._lock:
+                if data is None:
+                    return EncodedFrame(version, seq, None)
+                # ``clear`` pudo invalidar la caché mientras se codificaba
+                if variant.version < version and self._frame is not None:
+                    variant.data = data
+                    variant.version = version
+                    variant.seq = seq
+                variant.encoded += 1
+                self.frames_encoded += 1
+                self.frames_served += 1
+            return EncodedFrame(version, seq, data)
+
+    async def get_jpeg_async(self, profile: Optional[StreamProfile] = None) -> EncodedFrame:
+        """``get_jpeg`` sin bloquear el event loop: la codificación va a un hilo"""
+        variant = self._cached((profile or self.default_profile).variant_key)
+        if variant is not None:
+            self.frames_served += 1
+            return EncodedFrame(variant.version, variant.seq, variant.data)
+        return await asyncio.to_thread(self.get_jpeg, profile)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de difusión"""
+        return {
+            "subscribers": self.subscribers,
+            "quality": self.quality,
+            "frames_published": self.frames_published,
+            "frames_encoded": self.frames_encoded,
+            "frames_served": self.frames_served,
+            "variants": [
+                {
+                    "max_width": variant.max_width,
+                    "quality": variant.quality,
+                    "annotated": variant.annotated,
+                    "subscribers": variant.subscribers,
+                    "frames_encoded": variant.encoded
+                }
+                for variant in list(self._variants.values())
+            ]
+        }
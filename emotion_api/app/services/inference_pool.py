@@ -0,0 +1,294 @@
+"""
+Servicio de inferencia sobre un pool de procesos
+
+Las rutas async no deben ejecutar YOLO/DeepFace en el event loop: cada
+análisis se envía a un proceso worker (con su propia instancia de los
+modelos) y se espera como un future. La concurrencia está acotada; si el
+servicio está saturado se falla de inmediato en lugar de encolar sin límite.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Union
+import logging
+
+import numpy as np
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Imagen codificada: bytes o un array uint8 sobre el buffer recibido (sin copiar)
+EncodedImage = Union[bytes, np.ndarray]
+
+
+class InferenceSaturatedError(Exception):
+    """Hay demasiadas inferencias en curso (HTTP 429)"""
+
+
+class InferenceUnavailableError(Exception):
+    """El servicio de inferencia no está disponible o tardó demasiado (HTTP 503)"""
+
+
+def _init_worker():
+    """Inicializador de cada proceso: carga y calienta sus propios modelos"""
+    from app.services.model_registry import model_registry
+    model_registry.load_and_warm()
+
+
+def _ping() -> bool:
+    """Tarea vacía usada para arrancar los workers al iniciar el pool"""
+    return True
+
+
+def analyze_encoded_frame(image_data: EncodedImage) -> Dict[str, Any]:
+    """
+    Decodifica un frame, detecta rostros y clasifica sus emociones
+
+    Se ejecuta dentro de un worker (o en un hilo si no hay pool). Recibe la
+    imagen codificada para no serializar el frame decodificado entre procesos.
+
+    Args:
+        image_data: Imagen codificada (JPEG/PNG)
+
+    Returns:
+        ``status`` (ok | decode_error | invalid_image) y, si es ok, las
+        detecciones del frame como ``DetectionBatch``
+    """
+    return analyze_encoded_frames([image_data])[0]
+
+
+def analyze_encoded_frames(images_data: List[EncodedImage]) -> List[Dict[str, Any]]:
+    """
+    Analiza varios frames con una detección por lotes y una clasificación por lotes
+
+    Con ``decode_reduction`` o ``detection_max_width`` la detección se hace
+    sobre una versión reducida; las cajas devueltas y los recortes que se
+    clasifican están siempre en la resolución completa.
+
+    Args:
+        images_data: Imágenes codificadas (JPEG/PNG)
+
+    Returns:
+        Un resultado por frame, en el mismo orden (ver ``analyze_encoded_frame``)
+    """
+    from app.services.batch_classifier import extract_face_rois
+    from app.services.detection_batch import DetectionBatch
+    from app.services.detector_backends import detect_faces_batch
+    from app.services.model_registry import model_registry
+    from app.utils.image_processing import (
+        bytes_to_image, downscale_to_width, scale_detections, validate_image
+    )
+
+    reduction = settings.decode_reduction if settings.decode_reduction in (2, 4, 8) else 1
+    # Por debajo de este lado la versión reducida pierde detalle frente a lo
+    # que el detector vería de la imagen completa
+    min_detection_side = settings.detector_input_size
+    if settings.detection_max_width > 0:
+        min_detection_side = min(min_detection_side, settings.detection_max_width)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(images_data)
+    valid_indices = []
+    # Imagen sobre la que se detecta (reducida) e imagen completa (None = aún sin decodificar)
+    detection_images = []
+    full_images = []
+
+    for i, image_data in enumerate(images_data):
+        full_image = None
+        image = bytes_to_image(image_data, reduction) if reduction > 1 else None
+        if image is None or max(image.shape[:2]) < min_detection_side:
+            # Sin reducción, o la versión reducida es más pequeña que la entrada
+            # del detector: decodificación completa
+            image = full_image = bytes_to_image(image_data)
+        if image is None:
+            results[i] = {"status": "decode_error"}
+        elif not validate_image(image):
+            results[i] = {"status": "invalid_image"}
+        else:
+            # El ancho máximo de detección se aplica también a la versión reducida
+            image, _ = downscale_to_width(image, settings.detection_max_width)
+            valid_indices.append(i)
+            detection_images.append(image)
+            full_images.append(full_image)
+
+    if not detection_images:
+        return results
+
+    yolo = model_registry.get_yolo_detector()
+    if yolo is None:
+        raise RuntimeError("YOLO detector no disponible")
+    classifier = model_registry.get_batch_classifier()
+
+    # Una detección para todos los frames
+    faces_per_image = detect_faces_batch(yolo, detection_images)
+
+    # Las cajas vuelven a resolución completa: los rostros se recortan del
+    # frame original (sólo se decodifica completo si hay rostros)
+    for j, (i, faces) in enumerate(zip(valid_indices, faces_per_image)):
+        if full_images[j] is None:
+            if faces:
+                full_images[j] = bytes_to_image(images_data[i])
+            if full_images[j] is None:
+                # Sin rostros no hace falta el frame completo
+                full_images[j] = detection_images[j]
+        faces_per_image[j] = scale_detections(faces, detection_images[j].shape, full_images[j].shape)
+
+    # Una clasificación para todos los rostros de todos los frames
+    all_rois = []
+    roi_indices = []
+    for image, faces in zip(full_images, faces_per_image):
+        face_indices, face_rois = extract_face_rois(yolo, image, faces)
+        all_rois.extend(face_rois)
+        roi_indices.append(face_indices)
+
+    all_emotions = classifier.classify_batch(all_rois)
+
+    # Un lote columnar por frame: viaja al proceso principal como unos pocos arrays
+    timestamp = time.time()
+    offset = 0
+    for i, faces, face_indices in zip(valid_indices, faces_per_image, roi_indices):
+        emotions = all_emotions[offset:offset + len(face_indices)]
+        results[i] = {
+            "status": "ok",
+            "detections": DetectionBatch.from_results(faces, list(zip(face_indices, emotions)), timestamp)
+        }
+        offset += len(face_indices)
+
+    return results
+
+
+class InferenceService:
+    """
+    Ejecuta inferencias en un pool de procesos con concurrencia acotada
+
+    Args:
+        workers: Procesos del pool (0 = hilo del proceso principal, útil en desarrollo)
+        max_pending: Inferencias en curso o en espera antes de rechazar con 429
+        timeout: Segundos máximos por inferencia antes de responder 503
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 8, timeout: float = 10.0):
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.restarts = 0
+        self._restart_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Arranca los procesos worker (cada uno carga sus modelos)"""
+        if self.workers <= 0 or self.executor is not None:
+            return
+        # spawn: los workers no heredan hilos ni estado de CUDA/TensorFlow del proceso principal
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+        # Forzar el arranque (y la carga de modelos) de todos los workers ahora,
+        # no en la primera petición
+        for _ in range(self.workers):
+            executor.submit(_ping)
+        self.executor = executor
+        logger.info(f"🧠 Pool de inferencia iniciado con {self.workers} procesos")
+
+    def shutdown(self):
+        """Detiene los procesos worker"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            logger.info("Pool de inferencia detenido")
+
+    def _restart(self):
+        self.shutdown()
+        self.start()
+
+    def _schedule_restart(self, broken: ProcessPoolExecutor):
+        """
+        Reinicia el pool roto en un hilo (arrancar procesos bloquea)
+
+        Varias peticiones pueden fallar a la vez con el mismo pool roto: sólo
+        la primera lanza el reinicio.
+        """
+        if self.executor is not broken or (self._restart_task is not None and not self._restart_task.done()):
+            return
+        logger.error("El pool de inferencia se rompió; se reinicia")
+        self.restarts += 1
+        self._restart_task = asyncio.create_task(asyncio.to_thread(self._restart))
+
+    def _release(self, future: asyncio.Future):
+        """Libera el hueco cuando la tarea termina de verdad en el worker"""
+        self.pending -= 1
+        if not future.cancelled() and future.exception() is None:
+            self.completed += 1
+
+    async def run(self, fn, *args):
+        """
+        Ejecuta ``fn(*args)`` en el pool respetando el límite de concurrencia
+
+        Una inferencia que excede ``timeout`` sigue ocupando su hueco hasta que
+        el worker la termina: ``max_pending`` acota el trabajo real, no sólo
+        las peticiones que siguen esperando.
+
+        Raises:
+            InferenceSaturatedError: Si se alcanzó ``max_pending``
+            InferenceUnavailableError: Si el pool no está disponible o se agotó el tiempo
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise InferenceSaturatedError(f"{self.pending} inferencias en curso")
+
+        executor = self.executor
+        if self.workers > 0 and executor is None:
+            raise InferenceUnavailableError("Pool de inferencia no iniciado")
+
+        loop = asyncio.get_running_loop()
+        try:
+            # Sin pool se usa el threadpool por defecto: no bloquea el event loop
+            future = loop.run_in_executor(executor, fn, *args)
+            self.pending += 1
+            future.add_done_callback(self._release)
+            # shield: al agotar el tiempo no se cancela el future (la tarea en
+            # el worker no se puede interrumpir y el hueco debe seguir ocupado)
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError as e:
+            self.timed_out += 1
+            raise InferenceUnavailableError(f"Inferencia excedió {self.timeout}s") from e
+        except BrokenProcessPool as e:
+            self._schedule_restart(executor)
+            raise InferenceUnavailableError("Pool de inferencia reiniciándose") from e
+
+    async def analyze(self, image_data: EncodedImage) -> Dict[str, Any]:
+        """Analiza un frame codificado en el pool"""
+        return await self.run(analyze_encoded_frame, image_data)
+
+    async def analyze_batch(self, images_data: List[EncodedImage]) -> List[Dict[str, Any]]:
+        """Analiza varios frames codificados en una sola tarea del pool"""
+        return await self.run(analyze_encoded_frames, images_data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del servicio"""
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "restarts": self.restarts
+        }
+
+
+# Instancia global del servicio
+inference_service = InferenceService(
+    workers=settings.inference_workers,
+    max_pending=settings.inference_max_pending,
+    timeout=settings.inference_timeout
+)
@@ -0,0 +1,245 @@
+"""
+Publicación/suscripción de actualizaciones en vivo por WebSocket
+
+Cada cámara y cada sesión tienen un tópico (``camera:<id>``, ``session:<id>``)
+con varios canales: ``distribution`` (emociones del último frame),
+``camera_status`` y ``window`` (agregado de la ventana actual). El pipeline
+publica desde su hilo; las actualizaciones de un tópico se agrupan para no
+superar ``max_rate`` mensajes por segundo y se envían como deltas respecto
+al último estado enviado: ``data`` con los valores que cambiaron y ``removed``
+con las rutas de las claves eliminadas. Al suscribirse, el cliente recibe el
+estado completo.
+
+El envío pasa por las colas por conexión de ``ConnectionManager``: un delta
+que aún no salió hacia un cliente lento se combina con el siguiente.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+import logging
+
+from fastapi import WebSocket
+
+from app.config.settings import settings
+from app.services.connection_manager import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+def camera_topic(camera_id: str) -> str:
+    return f"camera:{camera_id}"
+
+
+def session_topic(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def compute_delta(old: Any, new: Any, path: Tuple[str, ...] = ()) -> Tuple[Any, List[List[str]]]:
+    """
+    Diferencia entre dos estados
+
+    Para diccionarios devuelve sólo las claves que cambiaron (recursivamente);
+    cualquier otro valor se reemplaza entero. Las claves eliminadas no van en
+    los cambios (``None`` es un valor válido) sino en la lista ``removed``,
+    como rutas desde ``path``.
+
+    Returns:
+        Tupla (cambios, rutas eliminadas)
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new, []
+    delta = {}
+    removed = []
+    for key, value in new.items():
+        if key not in old:
+            delta[key] = value
+        elif old[key] != value:
+            delta[key], nested_removed = compute_delta(old[key], value, path + (key,))
+            removed.extend(nested_removed)
+    for key in old:
+        if key not in new:
+            removed.append(list(path + (key,)))
+    return delta, removed
+
+
+def merge_delta(old: Any, new: Any) -> Any:
+    """Combina los cambios de dos deltas consecutivos en uno equivalente"""
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+    merged = dict(old)
+    for key, value in new.items():
+        merged[key] = merge_delta(old.get(key), value) if key in old else value
+    return merged
+
+
+def without_path(data: Any, path: List[str]) -> Any:
+    """Copia de ``data`` sin la clave de ``path`` (copia sólo los dict de la ruta)"""
+    if not path or not isinstance(data, dict) or path[0] not in data:
+        return data
+    copy = dict(data)
+    if len(path) == 1:
+        del copy[path[0]]
+    else:
+        copy[path[0]] = without_path(data[path[0]], path[1:])
+    return copy
+
+
+def merge_messages(queued: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Combina un mensaje de tópico aún en cola con el siguiente
+
+    El cliente aplica primero ``removed`` y después ``data``: las rutas que el
+    segundo delta elimina salen de los cambios combinados y las que eliminó el
+    primero se mantienen aunque el segundo las vuelva a crear.
+    """
+    if new["type"] == "snapshot":
+        return new
+    data = merge_delta(queued["data"], new["data"])
+    for path in new["removed"]:
+        data = without_path(data, path)
+    if queued["type"] == "snapshot":
+        # El estado completo ya no tiene las claves eliminadas
+        return {**queued, "seq": new["seq"], "data": data}
+    removed = queued["removed"] + [path for path in new["removed"] if path not in queued["removed"]]
+    return {**queued, "seq": new["seq"], "data": data, "removed": removed}
+
+
+class LiveUpdateHub:
+    """
+    Tópicos con suscriptores WebSocket, agrupación de mensajes y deltas
+
+    Args:
+        connections: Gestor de conexiones por el que se envían los mensajes
+        max_rate: Mensajes por segundo como máximo por tópico
+    """
+
+    def __init__(self, connections: ConnectionManager, max_rate: float = 4.0):
+        self.connections = connections
+        connections.add_disconnect_handler(self.unsubscribe)
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        # Último estado enviado por tópico (canal -> payload)
+        self._state: Dict[str, Dict[str, Any]] = {}
+        # Cambios aún no enviados por tópico (canal -> payload)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._scheduled: Set[str] = set()
+        self._last_flush: Dict[str, float] = {}
+        self._seq: Dict[str, int] = {}
+
+        # Métricas
+        self.published = 0
+        self.messages_sent = 0
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subscribers.get(topic))
+
+    # Publicación (desde cualquier hilo)
+
+    def publish(self, topic: str, channel: str, payload: Any):
+        """
+        Publica el nuevo valor de un canal de un tópico
+
+        Sin suscriptores sólo se actualiza el estado (lo recibirá el próximo
+        que se suscriba); con suscriptores se programa un envío agrupado.
+        """
+        self.published += 1
+        with self._lock:
+            if not self._subscribers.get(topic) or self._loop is None:
+                self._state.setdefault(topic, {})[channel] = payload
+                return
+            self._pending.setdefault(topic, {})[channel] = payload
+            if topic in self._scheduled:
+                return
+            self._scheduled.add(topic)
+        try:
+            self._loop.call_soon_threadsafe(self._schedule_flush, topic)
+        except RuntimeError:
+            # El event loop ya se cerró
+            self._scheduled.discard(topic)
+
+    def _schedule_flush(self, topic: str):
+        """Programa el envío respetando el intervalo mínimo del tópico"""
+        delay = self._last_flush.get(topic, 0.0) + self.min_interval - time.monotonic()
+        if delay > 0:
+            self._loop.call_later(delay, self._flush, topic)
+        else:
+            self._flush(topic)
+
+    def _flush(self, topic: str):
+        with self._lock:
+            pending = self._pending.pop(topic, {})
+            self._scheduled.discard(topic)
+            state = self._state.setdefault(topic, {})
+            delta = {}
+            removed = []
+            for channel, payload in pending.items():
+                if state.get(channel) == payload:
+                    continue
+                if channel in state:
+                    delta[channel], channel_removed = compute_delta(state[channel], payload, (channel,))
+                    removed.extend(channel_removed)
+                else:
+                    delta[channel] = payload
+            state.update(pending)
+        self._last_flush[topic] = time.monotonic()
+
+        if not delta:
+            return
+        self._seq[topic] = self._seq.get(topic, 0) + 1
+        message = {
+            "type": "delta",
+            "topic": topic,
+            "seq": self._seq[topic],
+            "data": delta,
+            "removed": removed
+        }
+        # Sólo se encola: cada conexión envía a su ritmo
+        for websocket in list(self._subscribers.get(topic, ())):
+            if self.connections.send(websocket, message, key=topic, merge=merge_messages):
+                self.messages_sent += 1
+
+    # Suscripción (desde el event loop)
+
+    async def subscribe(self, websocket: WebSocket, topic: str):
+        """Suscribe un WebSocket a un tópico y le envía el estado completo"""
+        self._loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(websocket)
+            # Los cambios pendientes forman parte del estado inicial
+            state = {**self._state.get(topic, {}), **self._pending.get(topic, {})}
+        self.connections.send(websocket, {
+            "type": "snapshot",
+            "topic": topic,
+            "seq": self._seq.get(topic, 0),
+            "data": state
+        }, key=topic, merge=merge_messages)
+
+    def unsubscribe(self, websocket: WebSocket, topic: Optional[str] = None):
+        """Da de baja un WebSocket de un tópico (o de todos)"""
+        with self._lock:
+            topics = [topic] if topic else list(self._subscribers)
+            for name in topics:
+                subscribers = self._subscribers.get(name)
+                if subscribers is None:
+                    continue
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self._subscribers[name]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de los tópicos"""
+        return {
+            "max_rate": round(1.0 / self.min_interval, 2) if self.min_interval else None,
+            "topics": {topic: len(subscribers) for topic, subscribers in list(self._subscribers.items())},
+            "published": self.published,
+            "messages_sent": self.messages_sent
+        }
+
+
+# Instancia global del hub
+live_updates = LiveUpdateHub(manager, max_rate=settings.ws_max_update_rate)
@@ -0,0 +1,138 @@
+"""
+Planificador de micro-lotes para /api/emotion/analyze
+
+Agrupa las peticiones que llegan casi a la vez (hasta ``max_batch_size``
+frames o ``max_wait_ms`` de espera) y las procesa con una detección y una
+clasificación por lotes, repartiendo después los resultados.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+from app.config.settings import settings
+from app.services.inference_pool import InferenceSaturatedError, inference_service
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesce peticiones individuales en lotes
+
+    Args:
+        run_batch: Corrutina que procesa una lista de elementos y devuelve un resultado por elemento
+        max_batch_size: Tamaño máximo de lote
+        max_wait_ms: Espera máxima del primer elemento antes de lanzar el lote
+        max_queued: Elementos en espera o en lotes en curso antes de rechazar
+            (``InferenceSaturatedError``)
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 15.0,
+        max_queued: int = 64
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queued = max(self.max_batch_size, max_queued)
+
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Elementos de lotes lanzados que aún no tienen resultado
+        self._in_flight = 0
+        # Referencias a los lotes en curso (evita que el GC los cancele)
+        self._tasks = set()
+
+        # Métricas
+        self.batch_sizes: Counter = Counter()
+        self.total_items = 0
+        self.total_wait = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Encola un elemento y espera su resultado
+
+        Raises:
+            InferenceSaturatedError: Si hay demasiados elementos en espera
+        """
+        queued = len(self._pending) + self._in_flight
+        if queued >= self.max_queued:
+            raise InferenceSaturatedError(f"{queued} frames en espera o en proceso")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Lanza un lote con los elementos pendientes"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            self._in_flight += len(batch)
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            # Un resto incompleto espera a más peticiones
+            if 0 < len(self._pending) < self.max_batch_size:
+                self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+                break
+
+    async def _run(self, batch: List[tuple]):
+        started = time.perf_counter()
+        self.batch_sizes[len(batch)] += 1
+        self.total_items += len(batch)
+        self.total_wait += sum(started - queued_at for _, _, queued_at in batch)
+
+        try:
+            results = await self.run_batch([item for item, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= len(batch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de los lotes conseguidos"""
+        batches = sum(self.batch_sizes.values())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "queued": len(self._pending),
+            "in_flight": self._in_flight,
+            "batches": batches,
+            "frames": self.total_items,
+            "average_batch_size": round(self.total_items / batches, 2) if batches else 0.0,
+            "average_wait_ms": round(self.total_wait * 1000 / self.total_items, 2) if self.total_items else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())}
+        }
+
+
+# Instancia global: los frames de /analyze se agrupan y se procesan en el pool
+analyze_batcher = MicroBatcher(
+    run_batch=inference_service.analyze_batch,
+    max_batch_size=settings.microbatch_max_size,
+    max_wait_ms=settings.microbatch_max_wait_ms,
+    max_queued=settings.microbatch_max_size * settings.inference_max_pending
+)
@@ -0,0 +1,132 @@
+"""
+Registro compartido de modelos de IA con carga anticipada y calentamiento
+
+Los modelos se cargan en segundo plano al arrancar la API (en paralelo) y se
+calientan con una inferencia de prueba, de modo que la primera petición no
+paga la carga. Si alguien los pide antes, se cargan bajo demanda sin duplicar.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+import logging
+
+import numpy as np
+
+from app.config.settings import settings
+from app.models.emotion_classifier import EmotionClassifier
+from app.services.batch_classifier import BatchEmotionClassifier
+from app.services.detector_backends import create_face_detector
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Mantiene una única instancia de cada modelo y su estado de preparación"""
+
+    def __init__(self):
+        self.yolo_detector = None
+        self.emotion_classifier = None
+        self.batch_classifier = None
+
+        self.state = "pending"  # pending | loading | ready | failed
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+        self._yolo_lock = threading.Lock()
+        self._classifier_lock = threading.Lock()
+        self._batch_lock = threading.Lock()
+
+    def get_yolo_detector(self):
+        """Detector de rostros del backend configurado (None si no se pudo inicializar)"""
+        if self.yolo_detector is None:
+            with self._yolo_lock:
+                if self.yolo_detector is None:
+                    try:
+                        self.yolo_detector = create_face_detector(settings.detector_backend)
+                    except Exception as e:
+                        logger.error(f"Error inicializando YOLO detector: {e}")
+                        # Retornar None para manejar el error en camera_worker
+                        return None
+                self._mark_loaded()
+        return self.yolo_detector
+
+    def get_emotion_classifier(self):
+        """Clasificador de emociones individual"""
+        if self.emotion_classifier is None:
+            with self._classifier_lock:
+                if self.emotion_classifier is None:
+                    self.emotion_classifier = EmotionClassifier()
+        return self.emotion_classifier
+
+    def get_batch_classifier(self):
+        """Clasificador por lotes (envuelve al clasificador individual)"""
+        if self.batch_classifier is None:
+            with self._batch_lock:
+                if self.batch_classifier is None:
+                    self.batch_classifier = BatchEmotionClassifier(self.get_emotion_classifier())
+                self._mark_loaded()
+        return self.batch_classifier
+
+    def _mark_loaded(self):
+        """Sin carga anticipada, los modelos quedan listos al cargarse bajo demanda"""
+        if self.state == "pending" and self.yolo_detector is not None and self.batch_classifier is not None:
+            self.state = "ready"
+            logger.info("✅ Modelos cargados bajo demanda")
+
+    def _warm_detector(self):
+        yolo = self.get_yolo_detector()
+        if yolo is None:
+            raise RuntimeError("YOLO detector no disponible")
+        dummy_frame = np.zeros((settings.frame_height, settings.frame_width, 3), dtype=np.uint8)
+        yolo.detect_faces(yolo.preprocess_frame(dummy_frame))
+
+    def _warm_classifier(self):
+        classifier = self.get_batch_classifier()
+        dummy_face = np.zeros((96, 96, 3), dtype=np.uint8)
+        classifier.classify_batch([dummy_face])
+
+    def load_and_warm(self):
+        """
+        Carga y calienta detector y clasificador en paralelo
+
+        Pensado para ejecutarse en un hilo durante el arranque de la API.
+        """
+        if self.state in ("loading", "ready"):
+            return
+
+        self.state = "loading"
+        started = time.perf_counter()
+        logger.info("🔥 Cargando y calentando modelos en segundo plano...")
+
+        try:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-warmup") as executor:
+                futures = [executor.submit(self._warm_detector), executor.submit(self._warm_classifier)]
+                for future in futures:
+                    future.result()
+
+            self.load_seconds = time.perf_counter() - started
+            self.state = "ready"
+            logger.info(f"✅ Modelos listos en {self.load_seconds:.1f}s")
+
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"❌ Error cargando modelos: {e}")
+
+    def is_ready(self) -> bool:
+        """Indica si los modelos están cargados y calentados"""
+        return self.state == "ready"
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado de la carga de modelos"""
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None
+        }
+
+
+# Instancia global compartida por rutas, cámaras y workers
+model_registry = ModelRegistry()
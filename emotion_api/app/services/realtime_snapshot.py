@@ -0,0 +1,139 @@
+"""
+Instantánea versionada de los resultados del worker de cámara
+
+El worker publica una instantánea por frame procesado y los endpoints la leen
+sin volver a ejecutar inferencia, de modo que los números coinciden con lo
+que muestra el stream.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_labels import (
+    REALTIME_CATEGORIES, REALTIME_CATEGORY_OF, REALTIME_MATRIX, label_id
+)
+
+
+def map_realtime_emotion(emotion: str) -> str:
+    """Mapea una emoción del clasificador a las categorías del dashboard"""
+    return REALTIME_CATEGORIES[REALTIME_CATEGORY_OF[label_id(emotion)]]
+
+
+def realtime_distribution(counts: np.ndarray, total_faces: int) -> Dict[str, Any]:
+    """
+    Construye la distribución del dashboard a partir de las emociones de un frame
+
+    Args:
+        counts: Rostros clasificados por identificador de etiqueta
+        total_faces: Rostros detectados (base de los porcentajes)
+
+    Returns:
+        Diccionario con porcentaje y conteo por categoría
+    """
+    emotion_counts = counts @ REALTIME_MATRIX
+
+    distribution = {}
+    for category, count in zip(REALTIME_CATEGORIES, emotion_counts.tolist()):
+        count = int(count)
+        percentage = round((count / total_faces) * 100, 1) if total_faces > 0 else 0
+        distribution[category] = {"percentage": percentage, "count": count}
+
+    distribution["total_detections"] = total_faces
+    return distribution
+
+
+@dataclass(frozen=True)
+class FrameSnapshot:
+    """Resultados de un frame procesado por el worker de cámara"""
+    seq: int
+    timestamp: float
+    detections: DetectionBatch
+    distribution: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_results(cls, seq: int, timestamp: float, faces: List[tuple],
+                     emotions: List[Tuple[int, Tuple[str, float]]]) -> "FrameSnapshot":
+        """
+        Crea la instantánea a partir de las detecciones y clasificaciones de un frame
+
+        Args:
+            seq: Número de secuencia del frame
+            timestamp: Momento de captura (epoch)
+            faces: Detecciones (x, y, w, h, confianza)
+            emotions: Pares (índice del rostro, (emoción, confianza))
+        """
+        return cls.from_batch(seq, DetectionBatch.from_results(faces, emotions, timestamp))
+
+    @classmethod
+    def from_batch(cls, seq: int, detections: DetectionBatch) -> "FrameSnapshot":
+        """Crea la instantánea a partir del lote de detecciones del frame"""
+        return cls(
+            seq=seq,
+            timestamp=detections.timestamp,
+            detections=detections,
+            distribution=realtime_distribution(detections.label_counts(), len(detections))
+        )
+
+    def to_response(self) -> Dict[str, Any]:
+        """Payload del endpoint /realtime-emotions"""
+        return {
+            **self.distribution,
+            "frame_seq": self.seq,
+            "timestamp": self.timestamp,
+            "faces": [
+                {
+                    "box": [x, y, w, h],
+                    "emotion": label,
+                    "confidence": confidence,
+                    "detection_confidence": detection_confidence
+                }
+                for x, y, w, h, label, confidence, detection_confidence in self.detections.to_rows()
+            ]
+        }
+
+    def to_overlay(self, frame_size: Optional[Tuple[int, int]] = None) -> Dict[str, Any]:
+        """
+        Metadatos compactos para que el cliente dibuje las anotaciones
+
+        Cada rostro es ``[x, y, w, h, emoción, confianza, confianza YOLO]`` en
+        coordenadas del frame original (``frame_size`` = ancho, alto).
+        """
+        return {
+            "frame_seq": self.seq,
+            "timestamp": self.timestamp,
+            "frame_size": list(frame_size) if frame_size else None,
+            "faces": self.detections.to_rows(precision=3)
+        }
+
+
+class SnapshotStore:
+    """Guarda la última instantánea publicada; lectura O(1) sin bloquear al worker"""
+
+    def __init__(self):
+        self._latest: Optional[FrameSnapshot] = None
+        self._lock = threading.Lock()
+
+    def publish(self, snapshot: FrameSnapshot):
+        """Publica una instantánea si es más reciente que la actual"""
+        with self._lock:
+            if self._latest is None or snapshot.seq > self._latest.seq:
+                self._latest = snapshot
+
+    def latest(self) -> Optional[FrameSnapshot]:
+        """Última instantánea publicada (o None)"""
+        return self._latest
+
+    def age(self) -> Optional[float]:
+        """Segundos desde la captura del frame de la última instantánea"""
+        snapshot = self._latest
+        return None if snapshot is None else time.time() - snapshot.timestamp
+
+    def clear(self):
+        """Descarta la instantánea actual (p. ej. al detener la cámara)"""
+        with self._lock:
+            self._latest = None
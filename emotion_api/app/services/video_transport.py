@@ -0,0 +1,171 @@
+"""
+Transporte binario de video por WebSocket
+
+Alternativa a ``multipart/x-mixed-replace``: cada frame JPEG viaja como un
+mensaje binario con la cámara y el número de secuencia del frame, varias
+cámaras comparten una conexión y, gracias a la cola por conexión de
+``ConnectionManager``, un cliente que no ha terminado de recibir un frame
+sólo recibe el más nuevo. Con ``adaptive`` la calidad baja mientras el
+cliente va atrasado y se recupera cuando se pone al día.
+
+Formato de cada mensaje (big endian)::
+
+    uint16  longitud del identificador de cámara
+    uint32  secuencia del frame en el pipeline
+    bytes   identificador de cámara (UTF-8)
+    bytes   JPEG
+"""
+
+import asyncio
+import struct
+from typing import Any, Dict, Optional
+import logging
+
+from fastapi import WebSocket
+
+from app.services.connection_manager import ConnectionManager
+from app.services.frame_broadcaster import StreamProfile
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!HI")
+
+# Ajuste de calidad en modo adaptativo
+MIN_ADAPTIVE_QUALITY = 30
+QUALITY_STEP = 10
+# Frames enviados sin atraso antes de subir la calidad
+RECOVERY_FRAMES = 30
+
+
+def encode_video_message(camera_id: str, seq: int, jpeg: bytes) -> bytes:
+    """Empaqueta un frame con su cabecera binaria"""
+    camera = camera_id.encode("utf-8")
+    return _HEADER.pack(len(camera), seq & 0xFFFFFFFF) + camera + jpeg
+
+
+def video_key(camera_id: str) -> str:
+    """Clave de agrupación en la cola de la conexión: un frame en cola por cámara"""
+    return f"video:{camera_id}"
+
+
+class VideoSubscription:
+    """
+    Envío de los frames de una cámara a una conexión WebSocket
+
+    Args:
+        connections: Gestor con la cola de salida de la conexión
+        websocket: Conexión destino
+        camera_id: Cámara transmitida
+        entry: Entrada del registro de cámaras
+        profile: Perfil negociado (ancho máximo, FPS, calidad, anotado)
+        adaptive: Bajar la calidad cuando el cliente va atrasado
+    """
+
+    def __init__(
+        self,
+        connections: ConnectionManager,
+        websocket: WebSocket,
+        camera_id: str,
+        entry,
+        profile: StreamProfile,
+        adaptive: bool = False
+    ):
+        self.connections = connections
+        self.websocket = websocket
+        self.camera_id = camera_id
+        self.entry = entry
+        self.base_profile = profile
+        self.profile = profile
+        self.adaptive = adaptive
+        self.key = video_key(camera_id)
+        self.task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self._clean_frames = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    def _set_quality(self, quality: int):
+        """Cambia la variante del broadcaster a otra calidad"""
+        broadcaster = self.entry.broadcaster
+        profile = StreamProfile(
+            max_width=self.profile.max_width,
+            fps=self.profile.fps,
+            quality=quality,
+            annotated=self.profile.annotated
+        )
+        broadcaster.subscribe(profile)
+        broadcaster.unsubscribe(self.profile)
+        self.profile = profile
+
+    def _adapt(self, lagging: bool):
+        if not self.adaptive:
+            return
+        if lagging:
+            self._clean_frames = 0
+            quality = max(MIN_ADAPTIVE_QUALITY, self.profile.quality - QUALITY_STEP)
+            if quality != self.profile.quality:
+                self._set_quality(quality)
+            return
+        self._clean_frames += 1
+        if self._clean_frames >= RECOVERY_FRAMES and self.profile.quality < self.base_profile.quality:
+            self._clean_frames = 0
+            self._set_quality(min(self.base_profile.quality, self.profile.quality + QUALITY_STEP))
+
+    async def _run(self):
+        broadcaster = self.entry.broadcaster
+        loop = asyncio.get_running_loop()
+        broadcaster.subscribe(self.profile)
+        try:
+            last_version = 0
+            next_due = 0.0
+            while True:
+                delay = next_due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                version = await broadcaster.wait_for_version(last_version, timeout=1.0)
+                if version == last_version:
+                    continue
+
+                encoded = await broadcaster.get_jpeg_async(self.profile)
+                last_version = encoded.version
+                if encoded.data is None:
+                    continue
+
+                # Si el frame anterior sigue en cola, el cliente va atrasado:
+                # el nuevo lo reemplaza (sólo se envía el más reciente)
+                lagging = self.connections.is_pending(self.websocket, self.key)
+                if lagging:
+                    self.frames_skipped += 1
+                if not self.connections.send(
+                    self.websocket,
+                    encode_video_message(self.camera_id, encoded.seq, encoded.data),
+                    key=self.key
+                ):
+                    break
+                self.frames_sent += 1
+                self._adapt(lagging)
+
+                if self.profile.fps > 0:
+                    next_due = loop.time() + 1.0 / self.profile.fps
+        except asyncio.CancelledError:
+            pass
+        finally:
+            broadcaster.unsubscribe(self.profile)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "camera_id": self.camera_id,
+            "profile": self.profile.to_dict(),
+            "adaptive": self.adaptive,
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped
+        }
@@ -0,0 +1,107 @@
+"""
+Pool de buffers reutilizables para el camino por frame
+
+Los lienzos de letterbox, los frames reducidos, el tensor de rostros del
+clasificador y las copias que se anotan antes de codificar tienen casi
+siempre la misma forma de un frame al siguiente; en lugar de pedir un array
+nuevo cada vez se reutiliza el del frame anterior.
+
+Cada hilo tiene sus propios buffers (las etapas del pipeline corren en
+hilos distintos), así que un buffer sólo es válido hasta la siguiente
+petición con la misma etiqueta desde el mismo hilo: quien necesite
+conservar el resultado debe copiarlo. Los buffers de cada hilo están
+acotados para que formas cambiantes no hagan crecer la memoria.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+
+class BufferPool:
+    """
+    Arrays reutilizables por hilo, indexados por (etiqueta, forma, tipo)
+
+    Args:
+        max_buffers: Buffers que conserva cada hilo (se descartan los menos usados)
+    """
+
+    def __init__(self, max_buffers: int = 16):
+        self.max_buffers = max(1, max_buffers)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.hits = 0
+        self.allocations = 0
+        self.bytes_allocated = 0
+
+    def _buffers(self) -> "OrderedDict[Tuple, np.ndarray]":
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = self._local.buffers = OrderedDict()
+        return buffers
+
+    def get(self, tag: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Buffer sin inicializar de la forma pedida
+
+        Args:
+            tag: Uso del buffer (dos usos simultáneos necesitan etiquetas distintas)
+            shape: Forma del array
+            dtype: Tipo de los elementos
+
+        Returns:
+            Array del pool; su contenido es el que dejó el uso anterior
+        """
+        key = (tag, tuple(shape), np.dtype(dtype).str)
+        buffers = self._buffers()
+        buffer = buffers.get(key)
+        if buffer is not None:
+            buffers.move_to_end(key)
+            self.hits += 1
+            return buffer
+
+        buffer = np.empty(shape, dtype=dtype)
+        buffers[key] = buffer
+        if len(buffers) > self.max_buffers:
+            buffers.popitem(last=False)
+        with self._lock:
+            self.allocations += 1
+            self.bytes_allocated += buffer.nbytes
+        return buffer
+
+    def get_batch(self, tag: str, count: int, item_shape: Tuple[int, ...], dtype=np.float32) -> np.ndarray:
+        """
+        Tensor de lote con al menos ``count`` elementos
+
+        La capacidad crece en potencias de dos, de modo que un número de
+        rostros que varía de un frame a otro reutiliza el mismo tensor.
+
+        Returns:
+            Vista de los primeros ``count`` elementos
+        """
+        capacity = 1
+        while capacity < count:
+            capacity *= 2
+        return self.get(tag, (capacity, *item_shape), dtype)[:count]
+
+    def clear(self):
+        """Libera los buffers del hilo actual"""
+        self._buffers().clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del pool (aciertos, asignaciones y bytes asignados)"""
+        requests = self.hits + self.allocations
+        return {
+            "hits": self.hits,
+            "allocations": self.allocations,
+            "bytes_allocated": self.bytes_allocated,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0
+        }
+
+
+# Instancia global del pool
+buffer_pool = BufferPool()
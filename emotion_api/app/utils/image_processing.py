@@ -1,30 +1,56 @@
 import cv2
 import numpy as np
 import base64
-from typing import Optional, Tuple
+import threading
+from typing import List, Optional, Tuple
 import logging
 
+from app.config.settings import settings
+from app.utils.buffer_pool import buffer_pool
+
 logger = logging.getLogger(__name__)
 
-def base64_to_image(base64_string: str) -> Optional[np.ndarray]:
+# Perfiles de preprocesado para detección
+#   off: sin mejora; fast: CLAHE sobre luminancia (YCrCb), sin filtro bilateral;
+#   quality: LAB + CLAHE + filtro bilateral; auto: fast sólo si la iluminación lo pide
+PREPROCESS_PROFILES = ("off", "fast", "quality", "auto")
+
+# Objetos CLAHE reutilizables, uno por hilo (no se comparten entre hilos)
+_clahe_local = threading.local()
+
+def _get_clahe() -> "cv2.CLAHE":
+    clahe = getattr(_clahe_local, "clahe", None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        _clahe_local.clahe = clahe
+    return clahe
+
+# Flags de decodificación reducida (el JPEG se decodifica directamente a 1/2, 1/4 o 1/8)
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+def bytes_to_image(image_data, reduction: int = 1) -> Optional[np.ndarray]:
     """
-    Convierte string base64 a imagen OpenCV
+    Decodifica una imagen codificada (JPEG/PNG) a imagen OpenCV
     
     Args:
-        base64_string: String base64 de la imagen
+        image_data: Bytes de la imagen (o cualquier objeto con protocolo buffer,
+            p. ej. un memoryview del cuerpo de la petición; no se copia)
+        reduction: Factor de reducción al decodificar (1, 2, 4 u 8)
         
     Returns:
         Imagen como array numpy o None si hay error
     """
     try:
-        # Decodificar base64
-        image_data = base64.b64decode(base64_string)
-        
-        # Convertir a array numpy
+        # Convertir a array numpy sin copiar
         nparr = np.frombuffer(image_data, np.uint8)
         
         # Decodificar imagen
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = cv2.imdecode(nparr, REDUCED_DECODE_FLAGS.get(reduction, cv2.IMREAD_COLOR))
         
         if image is None:
             logger.error("No se pudo decodificar la imagen")
@@ -32,6 +58,26 @@ def base64_to_image(base64_string: str) -> Optional[np.ndarray]:
         
         return image
         
+    except Exception as e:
+        logger.error(f"Error decodificando imagen: {e}")
+        return None
+
+def base64_to_image(base64_string: str) -> Optional[np.ndarray]:
+    """
+    Convierte string base64 a imagen OpenCV
+    
+    Args:
+        base64_string: String base64 de la imagen
+        
+    Returns:
+        Imagen como array numpy o None si hay error
+    """
+    try:
+        # Decodificar base64
+        image_data = base64.b64decode(base64_string)
+        
+        return bytes_to_image(image_data)
+        
     except Exception as e:
         logger.error(f"Error convirtiendo base64 a imagen: {e}")
         return None
@@ -59,13 +105,15 @@ def image_to_base64(image: np.ndarray) -> Optional[str]:
         logger.error(f"Error convirtiendo imagen a base64: {e}")
         return None
 
-def resize_image(image: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
+def resize_image(image: np.ndarray, target_size: Tuple[int, int], reuse: bool = False) -> np.ndarray:
     """
     Redimensiona imagen manteniendo proporción
     
     Args:
         image: Imagen original
         target_size: Tamaño objetivo (width, height)
+        reuse: Usar lienzos del pool de buffers (el resultado sólo es válido
+            hasta la siguiente llamada con ``reuse`` desde el mismo hilo)
         
     Returns:
         Imagen redimensionada
@@ -81,10 +129,18 @@ def resize_image(image: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
         new_height = int(height * scale)
         
         # Redimensionar
-        resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+        resized = cv2.resize(
+            image, (new_width, new_height),
+            dst=buffer_pool.get("resize", (new_height, new_width, 3)) if reuse else None,
+            interpolation=cv2.INTER_AREA
+        )
         
         # Crear imagen con tamaño objetivo y centrar
-        result = np.zeros((target_height, target_width, 3), dtype=np.uint8)
+        if reuse:
+            result = buffer_pool.get("resize_canvas", (target_height, target_width, 3))
+            result.fill(0)
+        else:
+            result = np.zeros((target_height, target_width, 3), dtype=np.uint8)
         
         y_offset = (target_height - new_height) // 2
         x_offset = (target_width - new_width) // 2
@@ -97,24 +153,113 @@ def resize_image(image: np.ndarray, target_size: Tuple[int, int]) -> np.ndarray:
         logger.error(f"Error redimensionando imagen: {e}")
         return image
 
-def enhance_image_quality(image: np.ndarray) -> np.ndarray:
+def image_lighting_stats(image: np.ndarray, step: int = 8) -> Tuple[float, float]:
+    """
+    Brillo y contraste aproximados de la imagen
+    
+    Se calculan sobre una submuestra (un píxel de cada ``step`` por eje), por
+    lo que el coste es despreciable frente al de la mejora.
+    
+    Returns:
+        (brillo medio, desviación estándar) de la luminancia, en 0-255
+    """
+    sample = np.ascontiguousarray(image[::step, ::step])
+    gray = cv2.cvtColor(sample, cv2.COLOR_BGR2GRAY) if sample.ndim == 3 else sample
+    mean, std = cv2.meanStdDev(gray)
+    return float(mean[0][0]), float(std[0][0])
+
+def needs_enhancement(image: np.ndarray) -> bool:
+    """True si la imagen es oscura o de bajo contraste (modo ``auto``)"""
+    brightness, contrast = image_lighting_stats(image)
+    return (brightness < settings.preprocess_auto_min_brightness
+            or contrast < settings.preprocess_auto_min_contrast)
+
+def downscale_to_width(image: np.ndarray, max_width: int, reuse: bool = False) -> Tuple[np.ndarray, float]:
+    """
+    Reduce la imagen a ``max_width`` de ancho si es más ancha
+    
+    Args:
+        image: Imagen original
+        max_width: Ancho máximo
+        reuse: Reducir sobre un buffer del pool (válido hasta la siguiente
+            llamada con ``reuse`` desde el mismo hilo)
+    
+    Returns:
+        (imagen, escala aplicada); la misma imagen y 1.0 si no hace falta reducir
+    """
+    height, width = image.shape[:2]
+    if max_width <= 0 or width <= max_width:
+        return image, 1.0
+    scale = max_width / width
+    new_height = max(1, round(height * scale))
+    dst = buffer_pool.get("downscale", (new_height, max_width) + image.shape[2:], image.dtype) if reuse else None
+    resized = cv2.resize(image, (max_width, new_height), dst=dst, interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+def scale_detections(
+    faces: List[tuple],
+    from_shape: Tuple[int, ...],
+    to_shape: Tuple[int, ...]
+) -> List[Tuple[int, int, int, int, float]]:
+    """
+    Lleva detecciones (x, y, w, h, confianza) de una resolución a otra
+    
+    Args:
+        faces: Detecciones en coordenadas de la imagen ``from_shape``
+        from_shape: Forma de la imagen donde se detectó
+        to_shape: Forma de la imagen destino (p. ej. el frame a resolución completa)
+        
+    Returns:
+        Detecciones en coordenadas de ``to_shape``, recortadas a sus límites
+    """
+    if from_shape[:2] == to_shape[:2]:
+        return list(faces)
+    
+    factor_y = to_shape[0] / from_shape[0]
+    factor_x = to_shape[1] / from_shape[1]
+    max_y, max_x = to_shape[0], to_shape[1]
+    
+    scaled = []
+    for x, y, w, h, confidence in faces:
+        x1 = min(max(0, int(round(x * factor_x))), max_x - 1)
+        y1 = min(max(0, int(round(y * factor_y))), max_y - 1)
+        x2 = min(max_x, int(round((x + w) * factor_x)))
+        y2 = min(max_y, int(round((y + h) * factor_y)))
+        if x2 > x1 and y2 > y1:
+            scaled.append((x1, y1, x2 - x1, y2 - y1, confidence))
+    return scaled
+
+def enhance_image_quality(image: np.ndarray, profile: str = "quality") -> np.ndarray:
     """
     Mejora la calidad de la imagen para mejor detección
     
     Args:
         image: Imagen original
+        profile: off | fast | quality | auto (ver ``PREPROCESS_PROFILES``)
         
     Returns:
-        Imagen mejorada
+        Imagen mejorada (la misma imagen si no se aplica mejora)
     """
     try:
+        if profile == "auto":
+            profile = "fast" if needs_enhancement(image) else "off"
+        
+        if profile == "off":
+            return image
+        
+        if profile == "fast":
+            # CLAHE sólo sobre la luminancia; YCrCb es más barato que LAB
+            ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)
+            y = ycrcb[:, :, 0].copy()
+            ycrcb[:, :, 0] = _get_clahe().apply(y)
+            return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+        
         # Convertir a LAB para mejor procesamiento
         lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
         l, a, b = cv2.split(lab)
         
         # Aplicar CLAHE (Contrast Limited Adaptive Histogram Equalization)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
+        l = _get_clahe().apply(l)
         
         # Recombinar canales
         enhanced_lab = cv2.merge([l, a, b])
@@ -192,29 +337,28 @@ def validate_image(image: np.ndarray) -> bool:
         logger.error(f"Error validando imagen: {e}")
         return False
 
-def preprocess_for_detection(image: np.ndarray) -> np.ndarray:
+def preprocess_for_detection(image: np.ndarray, profile: Optional[str] = None) -> np.ndarray:
     """
     Preprocesa imagen para detección de rostros
     
     Args:
         image: Imagen original
+        profile: Perfil de mejora (None = ``settings.preprocess_profile``)
         
     Returns:
         Imagen preprocesada
     """
     try:
-        # Mejorar calidad
-        enhanced = enhance_image_quality(image)
-        
-        # Redimensionar si es muy grande
-        height, width = enhanced.shape[:2]
+        # Redimensionar si es muy grande (antes de mejorar: menos píxeles que procesar)
+        height, width = image.shape[:2]
         if width > 1280:
             scale = 1280 / width
             new_width = int(width * scale)
             new_height = int(height * scale)
-            enhanced = cv2.resize(enhanced, (new_width, new_height))
+            image = cv2.resize(image, (new_width, new_height))
         
-        return enhanced
+        # Mejorar calidad
+        return enhance_image_quality(image, profile or settings.preprocess_profile)
         
     except Exception as e:
         logger.error(f"Error preprocesando imagen: {e}")
@@ -0,0 +1,312 @@
+"""
+Anillo de frames en memoria compartida
+
+Un escritor (la captura) copia cada frame una sola vez en un slot
+preasignado de un bloque ``multiprocessing.shared_memory``; los lectores
+(detección, codificadores, endpoint de instantánea) obtienen vistas numpy
+del slot sin copiar, tanto en el mismo proceso como en otro que se adjunte
+por nombre. Cada consumidor lleva su propio índice de lectura
+(``FrameRingReader``) con su retraso y los frames que se saltó.
+
+Disposición del bloque::
+
+    cabecera  int64[8]          (seq escrito, slots, alto, ancho, canales)
+    slot_seq  int64[slots]      secuencia guardada en cada slot (-1 = escribiéndose)
+    slot_ts   float64[slots]    instante de captura de cada slot
+    frames    uint8[slots, alto, ancho, canales]
+
+Cada slot lleva su número de secuencia (esquema tipo seqlock): un lector
+comprueba antes y después de usar la vista que el slot no se reescribió.
+El escritor no espera a nadie, así que un lector que se retrasa más de
+``slots`` frames encuentra su slot sobrescrito y debe descartar lo que leyó.
+
+Los procesos lectores deben arrancarse desde el proceso propietario
+(``multiprocessing``/``ProcessPoolExecutor``) para compartir su
+``resource_tracker``: sólo el propietario elimina el bloque.
+"""
+
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_HEADER_FIELDS = 8
+_WRITE_SEQ, _SLOTS, _HEIGHT, _WIDTH, _CHANNELS = range(5)
+_ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedFrameRing:
+    """
+    Anillo de tamaño fijo de frames BGR uint8 en memoria compartida
+
+    Usar ``SharedFrameRing.create`` en el proceso que captura y
+    ``SharedFrameRing.attach`` en los procesos lectores.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self.owner = owner
+        # Protege las vistas frente a ``close`` mientras otros hilos leen
+        self._lock = threading.Lock()
+
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.slots = int(self._header[_SLOTS])
+        self.shape = (int(self._header[_HEIGHT]), int(self._header[_WIDTH]), int(self._header[_CHANNELS]))
+
+        offset = _align(self._header.nbytes)
+        self._slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset = _align(offset + self._slot_seq.nbytes)
+        self._slot_ts = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset = _align(offset + self._slot_ts.nbytes)
+        self._frames = np.ndarray((self.slots, *self.shape), dtype=np.uint8, buffer=shm.buf, offset=offset)
+
+        self.frames_written = 0
+        self.frames_resized = 0
+        self._readers: List["FrameRingReader"] = []
+
+    @staticmethod
+    def _size(slots: int, shape: Tuple[int, int, int]) -> int:
+        size = _align(_HEADER_FIELDS * 8)
+        size = _align(size + slots * 8)
+        size = _align(size + slots * 8)
+        return size + slots * int(np.prod(shape))
+
+    @classmethod
+    def create(cls, slots: int, shape: Tuple[int, ...], name: Optional[str] = None) -> "SharedFrameRing":
+        """
+        Reserva un anillo nuevo
+
+        Args:
+            slots: Número de frames que conserva el anillo
+            shape: Forma de cada frame (alto, ancho[, canales])
+            name: Nombre del bloque compartido (None = generado)
+        """
+        if len(shape) == 2:
+            shape = (*shape, 1)
+        slots = max(2, slots)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls._size(slots, shape))
+
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0
+        header[_SLOTS] = slots
+        header[_HEIGHT], header[_WIDTH], header[_CHANNELS] = shape
+        del header
+
+        ring = cls(shm, owner=True)
+        ring._slot_seq[:] = 0
+        logger.info(f"🧊 Anillo de frames '{shm.name}' creado: {slots} slots de {shape}")
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        """Se adjunta a un anillo existente (por ejemplo, desde otro proceso)"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def write_seq(self) -> int:
+        """Secuencia del último frame escrito (0 = ninguno o anillo cerrado)"""
+        header = self._header
+        if header is None:
+            return 0
+        return int(header[_WRITE_SEQ])
+
+    # Escritura
+
+    def write(self, frame: np.ndarray, captured_at: Optional[float] = None) -> int:
+        """
+        Copia un frame en el siguiente slot
+
+        Si la forma no coincide con la del anillo, el frame se redimensiona
+        directamente dentro del slot.
+
+        Returns:
+            Número de secuencia asignado al frame
+        """
+        seq = self.write_seq + 1
+        index = seq % self.slots
+        slot = self._frames[index]
+
+        # Marcar el slot como en escritura para que los lectores lo descarten
+        self._slot_seq[index] = -1
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        if frame.shape == slot.shape:
+            np.copyto(slot, frame)
+        else:
+            resized = cv2.resize(frame, (self.shape[1], self.shape[0]), dst=slot if self.shape[2] > 1 else None)
+            if resized is not slot:
+                np.copyto(slot, resized.reshape(slot.shape))
+            self.frames_resized += 1
+        self._slot_ts[index] = captured_at if captured_at is not None else time.time()
+        self._slot_seq[index] = seq
+        self._header[_WRITE_SEQ] = seq
+
+        self.frames_written += 1
+        return seq
+
+    # Lectura
+
+    def _is_valid(self, seq: int) -> bool:
+        if seq <= 0 or self._slot_seq is None:
+            return False
+        return int(self._slot_seq[seq % self.slots]) == seq
+
+    def is_valid(self, seq: int) -> bool:
+        """True si el frame ``seq`` sigue en su slot (no se ha sobrescrito ni se cerró el anillo)"""
+        with self._lock:
+            return self._is_valid(seq)
+
+    def read(self, seq: int, copy: bool = False) -> Optional[np.ndarray]:
+        """
+        Obtiene el frame ``seq``
+
+        Sin ``copy`` devuelve una vista del slot: el llamador debe comprobar
+        ``is_valid(seq)`` después de usarla si el escritor puede haber dado
+        la vuelta al anillo mientras tanto.
+
+        Returns:
+            El frame, o None si ya no está disponible
+        """
+        with self._lock:
+            if not self._is_valid(seq):
+                return None
+            # La vista mantiene vivo el bloque aunque se cierre el anillo
+            frame = self._frames[seq % self.slots]
+        if not copy:
+            return frame
+        frame = frame.copy()
+        return frame if self.is_valid(seq) else None
+
+    def read_latest(self, copy: bool = False) -> Tuple[int, Optional[np.ndarray]]:
+        """Último frame escrito como (seq, frame); (0, None) si no hay ninguno"""
+        seq = self.write_seq
+        return seq, self.read(seq, copy=copy) if seq else None
+
+    def timestamp(self, seq: int) -> Optional[float]:
+        """Instante de captura del frame ``seq`` (o None si ya no está)"""
+        with self._lock:
+            if not self._is_valid(seq):
+                return None
+            return float(self._slot_ts[seq % self.slots])
+
+    def owns(self, frame: np.ndarray) -> bool:
+        """True si ``frame`` es una vista de algún slot del anillo"""
+        with self._lock:
+            return self._frames is not None and np.may_share_memory(frame, self._frames)
+
+    def reader(self, name: str = "") -> "FrameRingReader":
+        """Crea un lector con su propio índice de lectura (a partir del frame actual)"""
+        reader = FrameRingReader(self, name)
+        with self._lock:
+            self._readers.append(reader)
+        return reader
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado del anillo y de sus lectores en este proceso"""
+        with self._lock:
+            readers = list(self._readers)
+        return {
+            "name": self.name,
+            "owner": self.owner,
+            "slots": self.slots,
+            "shape": list(self.shape),
+            "write_seq": self.write_seq,
+            "frames_written": self.frames_written,
+            "frames_resized": self.frames_resized,
+            "readers": [reader.get_stats() for reader in readers]
+        }
+
+    def close(self):
+        """Libera las vistas locales; el propietario además elimina el bloque"""
+        with self._lock:
+            self._header = self._slot_seq = self._slot_ts = self._frames = None
+            self._readers.clear()
+        try:
+            self._shm.close()
+        except BufferError:
+            # Algún lector conserva una vista; el bloque se libera con ella
+            logger.warning(f"Anillo de frames '{self._shm.name}' con vistas activas al cerrar")
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FrameRingReader:
+    """
+    Cursor de lectura de un consumidor sobre un ``SharedFrameRing``
+
+    Cada consumidor mantiene su propio índice; si se queda atrás más de lo
+    que cabe en el anillo, salta al frame más antiguo disponible y cuenta
+    los frames perdidos. Las vistas que devuelve siguen la regla del
+    anillo: validar con ``ring.is_valid(seq)`` después de usarlas.
+    """
+
+    def __init__(self, ring: SharedFrameRing, name: str = ""):
+        self.ring = ring
+        self.name = name
+        # Empieza en el frame actual: sólo lee lo que se escriba a partir de ahora
+        self.last_seq = ring.write_seq
+        self.frames_read = 0
+        self.skipped = 0
+
+    def _read(self, seq: int, copy: bool) -> Tuple[int, Optional[np.ndarray]]:
+        frame = self.ring.read(seq, copy=copy)
+        self.last_seq = seq
+        if frame is None:
+            # Se sobrescribió entre la consulta de ``write_seq`` y la lectura
+            self.skipped += 1
+            return 0, None
+        self.frames_read += 1
+        return seq, frame
+
+    def read_next(self, copy: bool = False) -> Tuple[int, Optional[np.ndarray]]:
+        """Siguiente frame no leído como (seq, frame); (0, None) si no hay"""
+        write_seq = self.ring.write_seq
+        if write_seq <= self.last_seq:
+            return 0, None
+
+        seq = self.last_seq + 1
+        oldest = write_seq - self.ring.slots + 1
+        if seq < oldest:
+            self.skipped += oldest - seq
+            seq = oldest
+        return self._read(seq, copy)
+
+    def read_latest(self, copy: bool = False) -> Tuple[int, Optional[np.ndarray]]:
+        """Frame más reciente no leído, descartando los intermedios"""
+        write_seq = self.ring.write_seq
+        if write_seq <= self.last_seq:
+            return 0, None
+        self.skipped += write_seq - self.last_seq - 1
+        return self._read(write_seq, copy)
+
+    @property
+    def lag(self) -> int:
+        """Frames escritos que este lector aún no ha leído"""
+        return max(0, self.ring.write_seq - self.last_seq)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "last_seq": self.last_seq,
+            "lag": self.lag,
+            "frames_read": self.frames_read,
+            "skipped": self.skipped
+        }
+
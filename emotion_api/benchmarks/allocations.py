@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark de asignaciones por frame antes y después del pool de buffers
+
+Ejecuta el trabajo por frame que más memoria pide (letterbox + tensor del
+detector, lienzo de ``resize_image``, tensor de rostros del clasificador y
+copia anotada + reducción antes de codificar) con arrays nuevos en cada
+frame ("antes") y con el pool de buffers ("después"). Para cada modo mide,
+con ``tracemalloc``, los KB asignados de más durante cada frame (pico sobre
+lo que ya estaba asignado) y el crecimiento del RSS máximo del proceso.
+
+Uso:
+    python benchmarks/allocations.py --images ruta/a/frames --frames 300 --faces 25
+"""
+
+import argparse
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Agregar el directorio del proyecto al path para importar los módulos
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.batch_classifier import BatchEmotionClassifier  # noqa: E402
+from app.services.detector_backends import OnnxFaceDetector, letterbox  # noqa: E402
+from app.utils.buffer_pool import buffer_pool  # noqa: E402
+from app.utils.image_processing import resize_image  # noqa: E402
+
+DETECTOR_INPUT_SIZE = 640
+STREAM_MAX_WIDTH = 480
+
+
+def load_frames(images_dir: str, count: int):
+    """Carga frames de un directorio o, si no hay, genera frames sintéticos 1280x720"""
+    frames = []
+    if images_dir:
+        for path in sorted(Path(images_dir).glob("*"))[:count]:
+            image = cv2.imread(str(path))
+            if image is not None:
+                frames.append(image)
+
+    if not frames:
+        print("⚠️ Sin imágenes de entrada: se usan frames sintéticos")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(min(count, 10))]
+
+    return frames
+
+
+def face_crops(frame: np.ndarray, faces: int):
+    """Recortes de rostro de tamaños variados, como los de un aula llena"""
+    height, width = frame.shape[:2]
+    rng = np.random.default_rng(1)
+    crops = []
+    for _ in range(faces):
+        size = int(rng.integers(40, 120))
+        x = int(rng.integers(0, width - size))
+        y = int(rng.integers(0, height - size))
+        crops.append(frame[y:y+size, x:x+size])
+    return crops
+
+
+def render(frame: np.ndarray) -> np.ndarray:
+    cv2.rectangle(frame, (10, 10), (200, 200), (0, 255, 0), 2)
+    return frame
+
+
+def process_before(frame: np.ndarray, crops) -> None:
+    """Camino por frame con arrays nuevos en cada paso (comportamiento anterior)"""
+    canvas, _, _ = letterbox(frame, DETECTOR_INPUT_SIZE)
+    cv2.dnn.blobFromImage(canvas, 1.0 / 255.0, swapRB=True)
+
+    resize_image(frame, (640, 480))
+
+    size = BatchEmotionClassifier.INPUT_SIZE
+    batch = np.empty((len(crops), size, size, 1), dtype=np.float32)
+    for i, roi in enumerate(crops):
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        batch[i, :, :, 0] = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA)
+    batch *= 1.0 / 255.0
+
+    annotated = render(frame.copy())
+    height, width = annotated.shape[:2]
+    small = cv2.resize(annotated, (STREAM_MAX_WIDTH, round(height * STREAM_MAX_WIDTH / width)), interpolation=cv2.INTER_AREA)
+    cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+
+def process_after(frame: np.ndarray, crops, detector, classifier) -> None:
+    """El mismo camino con los buffers del pool"""
+    blob = detector._input_tensor(1)
+    detector._to_blob(frame, blob[0])
+
+    resize_image(frame, (640, 480), reuse=True)
+
+    classifier._prepare_batch(crops)
+
+    canvas = buffer_pool.get("render", frame.shape, frame.dtype)
+    np.copyto(canvas, frame)
+    annotated = render(canvas)
+    height, width = annotated.shape[:2]
+    new_height = round(height * STREAM_MAX_WIDTH / width)
+    small = cv2.resize(
+        annotated, (STREAM_MAX_WIDTH, new_height),
+        dst=buffer_pool.get("encode_resized", (new_height, STREAM_MAX_WIDTH, 3)),
+        interpolation=cv2.INTER_AREA
+    )
+    cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+
+def measure(name: str, step, frames, crops_per_frame, iterations: int):
+    """KB asignados por frame, ms/frame y crecimiento del RSS máximo"""
+    # Calentamiento (llena el pool en el modo "después")
+    for frame, crops in zip(frames[:3], crops_per_frame[:3]):
+        step(frame, crops)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    allocated = 0
+    started = time.perf_counter()
+    for i in range(iterations):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        step(frames[i % len(frames)], crops_per_frame[i % len(frames)])
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - baseline
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    print(f"{name:<10}{allocated / iterations / 1024:>16.1f}{elapsed * 1000 / iterations:>12.2f}{rss_growth:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de asignaciones por frame")
+    parser.add_argument("--images", default=None, help="Directorio con frames de prueba")
+    parser.add_argument("--frames", type=int, default=200, help="Frames a procesar por modo")
+    parser.add_argument("--faces", type=int, default=25, help="Rostros por frame")
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.frames)
+    crops_per_frame = [face_crops(frame, args.faces) for frame in frames]
+
+    # Instancias sin modelo: sólo se usa su preparación de entradas
+    detector = OnnxFaceDetector.__new__(OnnxFaceDetector)
+    detector.input_size = DETECTOR_INPUT_SIZE
+    classifier = BatchEmotionClassifier.__new__(BatchEmotionClassifier)
+
+    print("=" * 54)
+    print(f"{'Modo':<10}{'KB pico/frame':>16}{'ms/frame':>12}{'RSS máx +KB':>16}")
+    print("=" * 54)
+    measure("antes", process_before, frames, crops_per_frame, args.frames)
+    measure(
+        "después",
+        lambda frame, crops: process_after(frame, crops, detector, classifier),
+        frames, crops_per_frame, args.frames
+    )
+
+    stats = buffer_pool.get_stats()
+    print(f"\nPool: {stats['allocations']} asignaciones ({stats['bytes_allocated'] / 1024:.0f} KB), "
+          f"tasa de acierto {stats['hit_rate']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
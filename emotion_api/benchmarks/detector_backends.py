@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark y verificación de paridad de los backends del detector de rostros
+
+Uso:
+    python benchmarks/detector_backends.py --export [--int8] [--dynamic-batch]
+    python benchmarks/detector_backends.py --images ruta/a/frames --frames 100
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Agregar el directorio del proyecto al path para importar los módulos
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.detector_backends import (  # noqa: E402
+    DETECTOR_BACKENDS, compare_detections, create_face_detector, export_onnx
+)
+
+
+def load_frames(images_dir: str, count: int):
+    """Carga frames de un directorio o, si no hay, genera frames sintéticos 640x480"""
+    frames = []
+    if images_dir:
+        for path in sorted(Path(images_dir).glob("*"))[:count]:
+            image = cv2.imread(str(path))
+            if image is not None:
+                frames.append(image)
+
+    if not frames:
+        print("⚠️ Sin imágenes de entrada: se usan frames sintéticos (la paridad no será representativa)")
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+    return frames
+
+
+def benchmark(detector, frames, warmup: int = 3):
+    """Mide ms/frame de detect_faces y devuelve también las detecciones"""
+    for frame in frames[:warmup]:
+        detector.detect_faces(frame)
+
+    detections = []
+    started = time.perf_counter()
+    for frame in frames:
+        detections.append(detector.detect_faces(frame))
+    elapsed = time.perf_counter() - started
+
+    return elapsed * 1000 / len(frames), detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends del detector de rostros")
+    parser.add_argument("--export", action="store_true", help="Exportar el modelo a ONNX antes de medir")
+    parser.add_argument("--int8", action="store_true", help="Generar también el modelo int8")
+    parser.add_argument("--dynamic-batch", action="store_true", help="Exportar con eje de lote dinámico")
+    parser.add_argument("--images", default=None, help="Directorio con frames de prueba")
+    parser.add_argument("--frames", type=int, default=50, help="Número de frames a medir")
+    parser.add_argument("--backends", nargs="+", default=list(DETECTOR_BACKENDS), help="Backends a comparar")
+    args = parser.parse_args()
+
+    if args.export:
+        print(f"📦 Exportado: {export_onnx(int8=args.int8, dynamic_batch=args.dynamic_batch)}")
+
+    frames = load_frames(args.images, args.frames)
+
+    print("=" * 70)
+    print(f"{'Backend':<16}{'ms/frame':>10}{'emparejadas':>14}{'perdidas':>10}{'extra':>8}{'IoU':>8}")
+    print("=" * 70)
+
+    reference = None
+    for backend in args.backends:
+        try:
+            detector = create_face_detector(backend)
+        except Exception as e:
+            print(f"{backend:<16}no disponible: {e}")
+            continue
+
+        # create_face_detector recurre a otro backend si el pedido no está disponible
+        actual = getattr(detector, "runtime", "torch")
+        if actual != backend:
+            print(f"{backend:<16}no disponible (se cargó {actual})")
+            continue
+
+        ms_per_frame, detections = benchmark(detector, frames)
+
+        if reference is None:
+            reference = detections
+            print(f"{backend:<16}{ms_per_frame:>10.2f}{'(referencia)':>40}")
+            continue
+
+        totals = {"matched": 0, "missed": 0, "extra": 0}
+        ious = []
+        for ref, cand in zip(reference, detections):
+            parity = compare_detections(ref, cand)
+            for key in totals:
+                totals[key] += parity[key]
+            if parity["matched"]:
+                ious.append(parity["mean_iou"])
+
+        mean_iou = float(np.mean(ious)) if ious else 0.0
+        print(f"{backend:<16}{ms_per_frame:>10.2f}{totals['matched']:>14}{totals['missed']:>10}"
+              f"{totals['extra']:>8}{mean_iou:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Sustitutos de ``app/models`` para los tests
+
+Los modelos Pydantic y de IA viven en ``app/models``, fuera del control de
+versiones. Si no están, se registran módulos mínimos con los mismos nombres
+para poder importar las rutas y los servicios que dependen de ellos; los
+tests nunca cargan modelos de IA reales.
+"""
+
+import importlib.util
+import sys
+import types
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class EmotionDistribution(BaseModel):
+    frustracion: float = 0.0
+    tristeza: float = 0.0
+    enojo: float = 0.0
+    desmotivacion: float = 0.0
+    atencion_baja: float = 0.0
+
+
+class EmotionMetric(BaseModel):
+    id: Optional[str] = None
+    session_id: str
+    timestamp: datetime
+    emotion_distribution: EmotionDistribution
+    total_faces_detected: int
+    average_confidence: float
+
+
+class _Schema(BaseModel):
+    model_config = {"extra": "allow"}
+
+
+class EmotionClassifier:
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("EmotionClassifier no está disponible en los tests")
+
+
+def _install_model_stubs():
+    if importlib.util.find_spec("app.models") is not None:
+        return
+    package = types.ModuleType("app.models")
+    package.__path__ = []
+
+    schemas = types.ModuleType("app.models.schemas")
+    schemas.EmotionDistribution = EmotionDistribution
+    schemas.EmotionMetric = EmotionMetric
+    for name in ("EmotionAnalysisRequest", "HealthCheck", "SessionSummary"):
+        setattr(schemas, name, type(name, (_Schema,), {}))
+
+    emotion_classifier = types.ModuleType("app.models.emotion_classifier")
+    emotion_classifier.EmotionClassifier = EmotionClassifier
+
+    sys.modules["app.models"] = package
+    sys.modules["app.models.schemas"] = schemas
+    sys.modules["app.models.emotion_classifier"] = emotion_classifier
+
+
+_install_model_stubs()
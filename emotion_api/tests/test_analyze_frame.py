@@ -0,0 +1,127 @@
+"""Tests HTTP de /api/emotion/analyze-frame (cuerpo crudo y multipart)"""
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+
+from app.routes import emotion_routes
+from app.services.detection_batch import DetectionBatch
+from app.services.inference_pool import InferenceSaturatedError
+
+JPEG = b"\xff\xd8\xff\xe0 frame de prueba \xff\xd9"
+
+
+@pytest.fixture
+def received(monkeypatch):
+    """Sustituye la inferencia por una que guarda los bytes recibidos"""
+    frames = []
+
+    async def analyze(image_data):
+        frames.append(image_data)
+        return {"status": "ok", "detections": DetectionBatch.from_results([], [])}
+
+    monkeypatch.setattr(emotion_routes.settings, "microbatch_enabled", False)
+    monkeypatch.setattr(emotion_routes.inference_service, "analyze", analyze)
+    return frames
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(emotion_routes.router)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_raw_jpeg_body(client, received):
+    async with client:
+        response = await client.post(
+            "/api/emotion/analyze-frame",
+            params={"session_id": "sesion-1"},
+            content=JPEG,
+            headers={"Content-Type": "image/jpeg"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["session_id"] == "sesion-1"
+    assert response.json()["total_faces_detected"] == 0
+    (frame,) = received
+    # Vista uint8 sobre el cuerpo recibido, sin copiarlo
+    assert isinstance(frame, np.ndarray) and not frame.flags.owndata
+    assert frame.tobytes() == JPEG
+
+
+@pytest.mark.asyncio
+async def test_multipart_upload(client, received):
+    async with client:
+        response = await client.post(
+            "/api/emotion/analyze-frame",
+            files={"frame": ("frame.jpg", JPEG, "image/jpeg")},
+            data={"session_id": "sesion-2"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["session_id"] == "sesion-2"
+    (frame,) = received
+    assert frame.dtype == np.uint8
+    assert frame.tobytes() == JPEG
+
+
+@pytest.mark.asyncio
+async def test_large_multipart_upload_read_off_the_event_loop(client, received):
+    # Por encima del tamaño en memoria el archivo temporal pasa a disco
+    large = JPEG + bytes(emotion_routes.UPLOAD_INLINE_READ_BYTES * 2)
+    async with client:
+        response = await client.post(
+            "/api/emotion/analyze-frame",
+            files={"frame": ("frame.jpg", large, "image/jpeg")},
+            data={"session_id": "sesion-3"}
+        )
+
+    assert response.status_code == 200
+    (frame,) = received
+    assert frame.tobytes() == large
+
+
+@pytest.mark.asyncio
+async def test_multipart_without_frame(client, received):
+    async with client:
+        # Multipart con sólo el campo de texto
+        response = await client.post("/api/emotion/analyze-frame", files={"session_id": (None, "sesion-2")})
+
+    assert response.status_code == 400
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_missing_session_and_unsupported_type(client, received):
+    async with client:
+        missing_session = await client.post(
+            "/api/emotion/analyze-frame", content=JPEG, headers={"Content-Type": "image/jpeg"}
+        )
+        unsupported = await client.post(
+            "/api/emotion/analyze-frame", params={"session_id": "s"}, json={"frame": "base64"}
+        )
+
+    assert missing_session.status_code == 400
+    assert unsupported.status_code == 415
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_saturated_inference_returns_429(client, monkeypatch):
+    async def saturated(image_data):
+        raise InferenceSaturatedError("pool lleno")
+
+    monkeypatch.setattr(emotion_routes.settings, "microbatch_enabled", False)
+    monkeypatch.setattr(emotion_routes.inference_service, "analyze", saturated)
+    async with client:
+        response = await client.post(
+            "/api/emotion/analyze-frame",
+            params={"session_id": "s"},
+            content=JPEG,
+            headers={"Content-Type": "image/jpeg"}
+        )
+
+    assert response.status_code == 429
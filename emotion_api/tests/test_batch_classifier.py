@@ -0,0 +1,113 @@
+"""Tests del clasificador de emociones por lotes frente a la clasificación rostro por rostro"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.batch_classifier import BatchEmotionClassifier, is_valid_roi
+from app.services.emotion_labels import CLASSIFIER_LABELS
+
+
+class LinearEmotionModel:
+    """Modelo Keras falso: puntuaciones positivas lineales sobre los píxeles"""
+
+    def __init__(self, seed=0):
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(size=(48 * 48, len(CLASSIFIER_LABELS)))
+        self.calls = 0
+
+    def predict_on_batch(self, batch):
+        self.calls += 1
+        return np.exp(batch.reshape(len(batch), -1) @ self.weights / 48)
+
+
+class PerFaceClassifier:
+    """
+    ``EmotionClassifier.classify_emotion`` de referencia: el camino de un solo
+    rostro del modelo Emotion de DeepFace (gris, 48x48, escala 0-1)
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def classify_emotion(self, roi):
+        self.calls += 1
+        face = roi.astype(np.float32) / 255.0
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if face.ndim == 3 else face
+        gray = cv2.resize(gray, (48, 48))
+        scores = np.asarray(self.model.predict_on_batch(gray[None, :, :, None]))[0]
+        probabilities = scores / scores.sum()
+        best = int(probabilities.argmax())
+        return CLASSIFIER_LABELS[best], float(probabilities[best])
+
+
+def make_classifier(model=None, classifier=None):
+    batch_classifier = BatchEmotionClassifier(classifier)
+    # Sin DeepFace instalado queda sin modelo; se usa el falso
+    batch_classifier.model = model
+    return batch_classifier
+
+
+def face_rois(count=6, seed=1):
+    rng = np.random.default_rng(seed)
+    rois = []
+    for _ in range(count):
+        height, width = rng.integers(40, 160, size=2)
+        roi = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        rois.append(cv2.GaussianBlur(roi, (7, 7), 3))
+    return rois
+
+
+def test_batch_matches_per_face_classification():
+    model = LinearEmotionModel()
+    reference = PerFaceClassifier(model)
+    rois = face_rois() + [cv2.cvtColor(face_rois(1, seed=2)[0], cv2.COLOR_BGR2GRAY)]
+
+    batch_results = make_classifier(model).classify_batch(rois)
+    per_face = [reference.classify_emotion(roi) for roi in rois]
+
+    assert [label for label, _ in batch_results] == [label for label, _ in per_face]
+    for (_, batch_confidence), (_, face_confidence) in zip(batch_results, per_face):
+        assert batch_confidence == pytest.approx(face_confidence, abs=1e-3)
+
+
+def test_empty_input_skips_the_model():
+    model = LinearEmotionModel()
+    assert make_classifier(model).classify_batch([]) == []
+    assert model.calls == 0
+
+
+def test_invalid_rois_are_neutral_and_do_not_break_the_batch():
+    model = LinearEmotionModel()
+    rois = face_rois(2)
+    invalid = [None, np.zeros((0, 10, 3), dtype=np.uint8), np.zeros((10, 10, 4), dtype=np.uint8)]
+
+    results = make_classifier(model).classify_batch([rois[0], *invalid, rois[1]])
+    expected = make_classifier(model).classify_batch(rois)
+
+    assert results[1:4] == [("neutral", 0.0)] * 3
+    assert [results[0], results[4]] == expected
+    assert not any(is_valid_roi(roi) for roi in invalid)
+
+
+class FailingModel:
+    def predict_on_batch(self, batch):
+        raise RuntimeError("sin memoria")
+
+
+def test_falls_back_to_per_face_classifier():
+    reference = PerFaceClassifier(LinearEmotionModel())
+    rois = face_rois(3)
+
+    # Sin modelo por lotes y con un modelo que falla: mismo resultado rostro por rostro
+    expected = [PerFaceClassifier(reference.model).classify_emotion(roi) for roi in rois]
+    assert make_classifier(None, reference).classify_batch(rois) == expected
+    assert make_classifier(FailingModel(), reference).classify_batch(rois) == expected
+    assert reference.calls == 6
+
+
+def test_without_any_classifier_everything_is_neutral():
+    batch_classifier = make_classifier(None, None)
+    assert not batch_classifier.is_model_loaded()
+    assert batch_classifier.classify_batch(face_rois(2)) == [("neutral", 0.0)] * 2
@@ -0,0 +1,64 @@
+"""Tests del pool de buffers reutilizables"""
+
+import threading
+
+import numpy as np
+
+from app.utils.buffer_pool import BufferPool
+
+
+def test_same_request_reuses_buffer():
+    pool = BufferPool()
+    first = pool.get("canvas", (4, 4, 3))
+    assert pool.get("canvas", (4, 4, 3)) is first
+    assert pool.get("canvas", (4, 4, 3), np.float32) is not first
+    assert pool.get("otro", (4, 4, 3)) is not first
+
+    stats = pool.get_stats()
+    assert stats["hits"] == 1
+    assert stats["allocations"] == 3
+    assert stats["bytes_allocated"] == 48 + 192 + 48
+    assert stats["hit_rate"] == 0.25
+
+
+def test_buffers_are_per_thread():
+    pool = BufferPool()
+    main = pool.get("canvas", (2, 2))
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.get("canvas", (2, 2))))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not main
+    assert pool.get("canvas", (2, 2)) is main
+
+
+def test_least_recently_used_buffer_is_evicted():
+    pool = BufferPool(max_buffers=2)
+    a = pool.get("a", (2,))
+    b = pool.get("b", (2,))
+    assert pool.get("a", (2,)) is a
+    pool.get("c", (2,))
+
+    # "b" era el menos usado
+    assert pool.get("a", (2,)) is a
+    assert pool.get("b", (2,)) is not b
+
+
+def test_get_batch_grows_in_powers_of_two():
+    pool = BufferPool()
+    three = pool.get_batch("faces", 3, (8, 8, 3))
+    assert three.shape == (3, 8, 8, 3)
+    assert three.base.shape == (4, 8, 8, 3)
+    assert three.dtype == np.float32
+
+    four = pool.get_batch("faces", 4, (8, 8, 3))
+    assert four.base is three.base
+    assert pool.get_batch("faces", 5, (8, 8, 3)).base.shape[0] == 8
+
+
+def test_clear_releases_thread_buffers():
+    pool = BufferPool()
+    first = pool.get("canvas", (2, 2))
+    pool.clear()
+    assert pool.get("canvas", (2, 2)) is not first
@@ -0,0 +1,188 @@
+"""Tests de las colas entre etapas, el stride adaptativo y el anillo de frames del pipeline de cámara"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.camera_pipeline import AdaptiveStride, CameraPipeline, FramePacket, FrameQueue, PersistRecord
+from app.services.detection_batch import DetectionBatch
+from app.utils.shared_frame_ring import SharedFrameRing
+
+
+def test_frame_queue_drop_oldest_keeps_newest():
+    queue = FrameQueue(maxsize=2, drop_oldest=True)
+    for item in (1, 2, 3):
+        assert queue.put(item)
+
+    assert queue.dropped == 1
+    assert len(queue) == 2
+    assert queue.get(timeout=0) == 2
+    assert queue.get(timeout=0) == 3
+
+
+def test_frame_queue_get_times_out_when_empty():
+    queue = FrameQueue(maxsize=1)
+    assert queue.get(timeout=0.01) is None
+
+
+def test_frame_queue_without_drop_waits_for_room():
+    queue = FrameQueue(maxsize=1, drop_oldest=False)
+    assert queue.put("a")
+    # Llena y sin consumidor: no hay hueco a tiempo
+    assert not queue.put("b", timeout=0.01)
+    assert queue.dropped == 0
+
+    consumer = threading.Timer(0.05, queue.get)
+    consumer.start()
+    assert queue.put("c", timeout=1.0)
+    consumer.join()
+    assert queue.get(timeout=0) == "c"
+
+
+def test_frame_queue_minimum_size_is_one():
+    queue = FrameQueue(maxsize=0)
+    assert queue.maxsize == 1
+
+
+def test_adaptive_stride_amortizes_detection_over_budget():
+    stride = AdaptiveStride(target_fps=10, stride=1, max_stride=6, adaptive=True)
+    stride.observe_overhead(0.02)
+    stride.observe_detection(0.25)
+    # 0.25 s de detección sobre 0.08 s libres por frame
+    assert stride.value == 4
+
+
+def test_adaptive_stride_is_clamped():
+    stride = AdaptiveStride(target_fps=30, stride=1, max_stride=3, adaptive=True)
+    stride.observe_detection(5.0)
+    assert stride.value == 3
+
+    stride = AdaptiveStride(target_fps=30, stride=3, max_stride=6, adaptive=True)
+    stride.observe_detection(0.001)
+    assert stride.value == 1
+
+
+def test_adaptive_stride_smooths_latency():
+    stride = AdaptiveStride(target_fps=10, adaptive=True)
+    stride.observe_detection(0.1)
+    stride.observe_detection(0.2)
+    assert stride.detection_latency == pytest.approx(0.8 * 0.1 + 0.2 * 0.2)
+
+
+@pytest.mark.parametrize("target_fps, adaptive", [(10, False), (0, True)])
+def test_stride_is_fixed_without_adaptive_mode_or_target(target_fps, adaptive):
+    stride = AdaptiveStride(target_fps=target_fps, stride=2, max_stride=6, adaptive=adaptive)
+    stride.observe_detection(1.0)
+    assert stride.value == 2
+
+
+class CroppingDetector:
+    """Detector falso: sólo recorta los rostros"""
+
+    def extract_face_roi(self, image, box):
+        x, y, w, h = box
+        return image[y:y + h, x:x + w]
+
+
+class RecordingClassifier:
+    def __init__(self):
+        self.batches = []
+
+    def classify_batch(self, rois):
+        self.batches.append(rois)
+        return [("felicidad", 0.9) for _ in rois]
+
+
+def ring_pipeline(published=None):
+    pipeline = CameraPipeline(
+        cap=None,
+        yolo=CroppingDetector(),
+        classifier=RecordingClassifier(),
+        storage=None,
+        get_session_id=lambda: None,
+        on_frame=lambda frame, snapshot: published.append(frame) if published is not None else None,
+        frame_ring_slots=2
+    )
+    pipeline.frame_ring = SharedFrameRing.create(2, (8, 8, 3))
+    return pipeline
+
+
+def ring_packet(pipeline, value):
+    ring = pipeline.frame_ring
+    seq = ring.write(np.full((8, 8, 3), value, dtype=np.uint8), captured_at=1.0)
+    return FramePacket(seq=seq, frame=ring.read(seq), captured_at=1.0, faces=[(0, 0, 4, 4, 0.9)])
+
+
+def test_classification_uses_ring_view_and_copies_only_crops():
+    pipeline = ring_pipeline()
+    try:
+        packet = ring_packet(pipeline, 7)
+        pipeline._classify(packet)
+
+        assert pipeline.frame_ring.owns(packet.frame)
+        (rois,) = pipeline.classifier.batches
+        assert not pipeline.frame_ring.owns(rois[0])
+        assert (rois[0] == 7).all()
+        assert pipeline.annotate_queue.get(timeout=0) is packet
+        assert pipeline.persist_queue.get(timeout=0) is not None
+    finally:
+        pipeline.frame_ring.close()
+
+
+def test_overwritten_slot_is_dropped_before_classifying():
+    pipeline = ring_pipeline()
+    try:
+        packet = ring_packet(pipeline, 7)
+        # La captura da la vuelta al anillo antes de que se clasifique
+        ring_packet(pipeline, 8)
+        ring_packet(pipeline, 9)
+        pipeline._classify(packet)
+
+        assert pipeline.classifier.batches == []
+        assert len(pipeline.annotate_queue) == 0
+        assert pipeline.get_stats()["dropped_frames"]["ring_overwritten"] == 1
+    finally:
+        pipeline.frame_ring.close()
+
+
+def test_annotation_publishes_a_copy_of_the_ring_frame():
+    published = []
+    pipeline = ring_pipeline(published)
+    try:
+        packet = ring_packet(pipeline, 7)
+        packet.detections = DetectionBatch.from_results(packet.faces, [], packet.captured_at)
+        pipeline._annotate(packet)
+
+        (frame,) = published
+        assert not pipeline.frame_ring.owns(frame)
+        assert (frame == 7).all()
+        assert pipeline.snapshots.latest().seq == packet.seq
+    finally:
+        pipeline.frame_ring.close()
+
+
+def test_stalled_persistence_drops_records_without_blocking():
+    pipeline = CameraPipeline(
+        cap=None,
+        yolo=CroppingDetector(),
+        classifier=RecordingClassifier(),
+        storage=None,
+        get_session_id=lambda: None,
+        on_frame=lambda frame, snapshot: None
+    )
+    capacity = pipeline.persist_queue.maxsize
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    started = time.perf_counter()
+    for seq in range(1, capacity + 3):
+        pipeline._classify(FramePacket(seq=seq, frame=frame, captured_at=1.0, faces=[(0, 0, 4, 4, 0.9)]))
+    assert time.perf_counter() - started < 0.5
+
+    assert pipeline.get_stats()["dropped_frames"]["persistence"] == 2
+    record = pipeline.persist_queue.get(timeout=0)
+    # La persistencia recibe sólo los resultados, no el frame
+    assert isinstance(record, PersistRecord)
+    assert record.seq == 1
+    assert len(record.detections) == 1
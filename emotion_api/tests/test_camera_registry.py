@@ -0,0 +1,147 @@
+"""Tests del registro de cámaras y del arranque/parada de sus workers"""
+
+import threading
+
+import pytest
+
+from app.services import camera_registry as registry_module
+from app.services.camera_registry import CameraEntry, CameraRegistry
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Sustituye el worker de captura por uno que sólo espera a su stop_event"""
+    started = []
+
+    def worker(self, stop_event):
+        started.append(self.camera_id)
+        stop_event.wait(timeout=5)
+
+    monkeypatch.setattr(CameraEntry, "_worker", worker)
+    return started
+
+
+def test_get_or_create_returns_the_same_entry(workers):
+    registry = CameraRegistry()
+    entry = registry.get_or_create("aula-1", "0")
+
+    assert registry.get_or_create("aula-1", "rtsp://otra") is entry
+    assert entry.source == 0
+    assert registry.get("aula-2") is None
+    assert [status["camera_id"] for status in registry.list_status()] == ["aula-1"]
+
+
+def test_remove_stops_and_unregisters(workers):
+    registry = CameraRegistry()
+    entry = registry.get_or_create("aula-1")
+    assert entry.start()
+
+    assert registry.remove("aula-1")
+    assert not entry.active
+    assert entry.thread is None
+    assert registry.get("aula-1") is None
+    assert not registry.remove("aula-1")
+
+
+def test_stop_all_stops_every_camera(workers):
+    registry = CameraRegistry()
+    entries = [registry.get_or_create(f"aula-{i}") for i in range(3)]
+    for entry in entries:
+        entry.start()
+
+    registry.stop_all()
+
+    assert not any(entry.active for entry in entries)
+    assert sorted(workers) == ["aula-0", "aula-1", "aula-2"]
+    # Siguen registradas, detenidas
+    assert len(registry.list_status()) == 3
+
+
+def test_concurrent_starts_launch_a_single_worker(workers):
+    entry = CameraEntry("aula-1")
+    barrier = threading.Barrier(8)
+    results = []
+
+    def start():
+        barrier.wait()
+        results.append(entry.start())
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+    assert workers == ["aula-1"]
+    assert entry.stop()
+    assert not entry.stop()
+
+
+def test_restart_uses_a_new_stop_event(workers):
+    entry = CameraEntry("aula-1")
+    entry.start()
+    first_event = entry.stop_event
+    entry.stop()
+    entry.start()
+
+    assert entry.stop_event is not first_event
+    assert first_event.is_set() and not entry.stop_event.is_set()
+    assert entry.active
+    entry.stop()
+
+
+class ClosedCapture:
+    def __init__(self, source):
+        self.released = False
+
+    def isOpened(self):
+        return False
+
+    def release(self):
+        self.released = True
+
+
+def test_worker_that_cannot_open_the_source_marks_the_camera_stopped(monkeypatch):
+    monkeypatch.setattr(registry_module.cv2, "VideoCapture", ClosedCapture)
+    entry = CameraEntry("aula-1", "rtsp://no-existe")
+
+    assert entry.start()
+    entry.thread.join(timeout=2)
+
+    assert not entry.active
+    assert entry.cap is None
+    # Detenida por su cuenta: se puede volver a iniciar
+    assert entry.start()
+    entry.thread.join(timeout=2)
+    assert not entry.active
+
+
+def test_stale_worker_does_not_stop_the_new_run(monkeypatch):
+    release = threading.Event()
+    entered = threading.Event()
+
+    class BlockingCapture(ClosedCapture):
+        def __init__(self, source):
+            super().__init__(source)
+            entered.set()
+            release.wait(timeout=5)
+
+    monkeypatch.setattr(registry_module.cv2, "VideoCapture", BlockingCapture)
+    entry = CameraEntry("aula-1")
+    entry.start()
+    entered.wait(timeout=2)
+    stale = entry.thread
+
+    # Ejecución nueva sin esperar a la anterior (bloqueada abriendo la fuente)
+    with entry._lock:
+        entry.active = False
+        entry.stop_event.set()
+    monkeypatch.setattr(CameraEntry, "_worker", lambda self, stop_event: stop_event.wait(timeout=5))
+    entry.thread = None
+    assert entry.start()
+
+    release.set()
+    stale.join(timeout=2)
+    assert entry.active
+    entry.stop()
@@ -0,0 +1,134 @@
+"""Tests de las colas por conexión del gestor de WebSockets"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.connection_manager import EVICTION_CLOSE_CODE, ConnectionManager
+
+
+class FakeWebSocket:
+    """WebSocket mínimo; los envíos esperan a ``gate`` para simular un cliente lento"""
+
+    def __init__(self):
+        self.client = SimpleNamespace(host="127.0.0.1", port=5000)
+        self.gate = asyncio.Event()
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def connected(manager):
+    websocket = FakeWebSocket()
+    await manager.connect(websocket)
+    # El primer mensaje queda bloqueado en el envío; los siguientes se acumulan en cola
+    manager.send(websocket, "bloqueado")
+    await asyncio.sleep(0)
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_keyed_messages_are_coalesced():
+    manager = ConnectionManager(queue_size=8)
+    websocket = await connected(manager)
+
+    manager.send(websocket, {"a": 1}, key="camera:default")
+    manager.send(websocket, {"b": 2}, key="camera:default", merge=lambda old, new: {**old, **new})
+    manager.send(websocket, "texto")
+    connection = manager.connections[websocket]
+    assert len(connection.queue) == 2
+    assert connection.coalesced == 1
+    assert manager.is_pending(websocket, "camera:default")
+
+    websocket.gate.set()
+    await asyncio.sleep(0.01)
+    assert websocket.sent == ["bloqueado", json.dumps({"a": 1, "b": 2}), "texto"]
+    assert not manager.is_pending(websocket, "camera:default")
+    manager.disconnect(websocket)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_unkeyed_message():
+    manager = ConnectionManager(queue_size=2)
+    websocket = await connected(manager)
+
+    for i in range(3):
+        assert manager.send(websocket, f"m{i}")
+    connection = manager.connections[websocket]
+    assert [item.payload for item in connection.queue] == ["m1", "m2"]
+    assert connection.dropped == 1
+
+    # Con la cola llena de mensajes con clave se descarta el mensaje nuevo sin clave
+    manager.send(websocket, "k1", key="a")
+    manager.send(websocket, "k2", key="b")
+    assert manager.send(websocket, "m3")
+    assert [item.payload for item in connection.queue] == ["k1", "k2"]
+    manager.disconnect(websocket)
+
+
+@pytest.mark.asyncio
+async def test_queue_full_of_keyed_messages_evicts():
+    manager = ConnectionManager(queue_size=2)
+    websocket = await connected(manager)
+    disconnected = []
+    manager.add_disconnect_handler(disconnected.append)
+
+    manager.send(websocket, "k1", key="a")
+    manager.send(websocket, "k2", key="b")
+    assert not manager.send(websocket, "k3", key="c")
+    await asyncio.sleep(0)
+
+    assert websocket not in manager.connections
+    assert manager.evicted == 1
+    assert disconnected == [websocket]
+    assert websocket.closed_with == EVICTION_CLOSE_CODE
+    assert not manager.send(websocket, "m")
+
+
+@pytest.mark.asyncio
+async def test_lagging_client_is_evicted():
+    manager = ConnectionManager(queue_size=8, max_lag=0.01)
+    websocket = await connected(manager)
+
+    assert manager.send(websocket, "m1")
+    await asyncio.sleep(0.02)
+    assert not manager.send(websocket, "m2")
+    await asyncio.sleep(0)
+
+    assert manager.evicted == 1
+    assert websocket.closed_with == EVICTION_CLOSE_CODE
+
+
+@pytest.mark.asyncio
+async def test_stuck_client_with_only_keyed_messages_is_evicted():
+    manager = ConnectionManager(queue_size=8, max_lag=0.05)
+    websocket = await connected(manager)
+
+    # Cada actualización del tópico se agrupa con la anterior: la cola no crece
+    for i in range(3):
+        assert manager.send(websocket, {"seq": i}, key="camera:default")
+        await asyncio.sleep(0.01)
+    assert len(manager.connections[websocket].queue) == 1
+
+    await asyncio.sleep(0.05)
+    assert not manager.send(websocket, {"seq": 3}, key="camera:default")
+    await asyncio.sleep(0)
+
+    assert websocket not in manager.connections
+    assert manager.evicted == 1
+    assert websocket.closed_with == EVICTION_CLOSE_CODE
@@ -0,0 +1,53 @@
+"""Tests del lote columnar de detecciones"""
+
+import numpy as np
+import pytest
+
+from app.services.detection_batch import UNCLASSIFIED, DetectionBatch
+from app.services.emotion_labels import LABEL_IDS
+
+FACES = [(10, 20, 30, 40, 0.9), (50, 60, 70, 80, 0.7), (1, 2, 3, 4, 0.5)]
+EMOTIONS = [(0, ("felicidad", 0.8)), (2, ("enojo", 0.6))]
+
+
+def test_from_results_round_trip():
+    batch = DetectionBatch.from_results(FACES, EMOTIONS, timestamp=100.0)
+
+    assert len(batch) == 3
+    assert batch.timestamp == 100.0
+    assert batch.boxes.dtype == np.int32
+    assert batch.label_ids.tolist() == [LABEL_IDS["felicidad"], UNCLASSIFIED, LABEL_IDS["enojo"]]
+    assert batch.labels() == ["felicidad", None, "enojo"]
+    assert np.allclose(batch.faces(), FACES)
+    assert [(i, (label, pytest.approx(confidence))) for i, (label, confidence) in batch.emotions()] == EMOTIONS
+
+
+def test_classified_emotions_and_counts():
+    batch = DetectionBatch.from_results(FACES, EMOTIONS, timestamp=0.0)
+
+    label_ids, confidences = batch.classified_emotions()
+    assert label_ids.tolist() == [LABEL_IDS["felicidad"], LABEL_IDS["enojo"]]
+    assert confidences.tolist() == pytest.approx([0.8, 0.6])
+
+    counts = batch.label_counts()
+    assert counts[LABEL_IDS["felicidad"]] == 1
+    assert counts.sum() == 2
+    assert batch.average_detection_confidence() == pytest.approx(0.7)
+
+
+def test_to_rows_with_precision():
+    batch = DetectionBatch.from_results(FACES[:2], EMOTIONS[:1], timestamp=0.0)
+    assert batch.to_rows(precision=2) == [
+        [10, 20, 30, 40, "felicidad", 0.8, 0.9],
+        [50, 60, 70, 80, None, 0.0, 0.7]
+    ]
+
+
+def test_empty_batch():
+    batch = DetectionBatch.from_results([], [], timestamp=0.0)
+    assert len(batch) == 0
+    assert batch.boxes.shape == (0, 4)
+    assert batch.labels() == []
+    assert batch.to_rows() == []
+    assert batch.label_counts().sum() == 0
+    assert batch.average_detection_confidence() == 0.0
@@ -0,0 +1,78 @@
+"""Tests del letterbox, la decodificación YOLOv8 y la selección de backend del detector"""
+
+import numpy as np
+import pytest
+
+from app.services.detector_backends import create_face_detector, decode_yolov8, letterbox
+
+
+def test_letterbox_keeps_aspect_ratio_and_centers():
+    image = np.full((240, 640, 3), 200, dtype=np.uint8)
+    canvas, scale, (x_offset, y_offset) = letterbox(image, 320)
+
+    assert canvas.shape == (320, 320, 3)
+    assert scale == 0.5
+    assert (x_offset, y_offset) == (0, 100)
+    # Relleno gris arriba y abajo, imagen en el centro
+    assert (canvas[:100] == 114).all()
+    assert (canvas[220:] == 114).all()
+    assert (canvas[100:220] == 200).all()
+
+
+def test_letterbox_reuse_matches_fresh_canvas():
+    image = np.random.default_rng(0).integers(0, 256, size=(100, 60, 3), dtype=np.uint8)
+    fresh, scale, offset = letterbox(image, 64)
+    reused, reused_scale, reused_offset = letterbox(image, 64, reuse=True)
+
+    assert (reused == fresh).all()
+    assert (reused_scale, reused_offset) == (scale, offset)
+    # El lienzo reutilizado se vuelve a rellenar en cada llamada
+    letterbox(np.zeros((64, 64, 3), dtype=np.uint8), 64, reuse=True)
+    assert (letterbox(image, 64, reuse=True)[0] == fresh).all()
+
+
+def yolo_output(*boxes):
+    """Salida (1, 5, anclas) con (cx, cy, w, h, confianza) por ancla"""
+    return np.array(boxes, dtype=np.float32).T[None]
+
+
+def test_decode_undoes_letterbox():
+    # Imagen 640x240 en un lienzo de 320: escala 0.5, desplazamiento vertical 100
+    output = yolo_output((50, 150, 20, 40, 0.9))
+    faces = decode_yolov8(output, 0.5, (0, 100), (240, 640), 0.5, 0.45)
+    assert faces == [(80, 60, 40, 80, pytest.approx(0.9))]
+
+
+def test_decode_filters_by_confidence_and_applies_nms():
+    output = yolo_output(
+        (100, 100, 40, 40, 0.9),
+        (102, 101, 40, 40, 0.8),    # Solapa con la primera: se suprime
+        (200, 200, 30, 30, 0.7),
+        (50, 50, 20, 20, 0.3)       # Por debajo del umbral
+    )
+    faces = decode_yolov8(output, 1.0, (0, 0), (320, 320), 0.5, 0.45)
+
+    assert [face[:4] for face in faces] == [(80, 80, 40, 40), (185, 185, 30, 30)]
+    assert [face[4] for face in faces] == pytest.approx([0.9, 0.7])
+
+
+def test_decode_clips_to_image_and_handles_no_detections():
+    output = yolo_output((5, 5, 20, 20, 0.9), (318, 318, 10, 10, 0.8))
+    faces = decode_yolov8(output, 1.0, (0, 0), (320, 320), 0.5, 0.45)
+    assert [face[:4] for face in faces] == [(0, 0, 15, 15), (313, 313, 7, 7)]
+
+    assert decode_yolov8(yolo_output((5, 5, 20, 20, 0.1)), 1.0, (0, 0), (320, 320), 0.5, 0.45) == []
+
+
+@pytest.mark.parametrize("backend", ["onnx", "openvino"])
+def test_configured_backend_that_fails_to_load_raises(backend, tmp_path, monkeypatch):
+    from app.config.settings import settings
+
+    monkeypatch.setattr(settings, "detector_onnx_path", str(tmp_path / "no-existe.onnx"))
+    with pytest.raises(RuntimeError, match=backend):
+        create_face_detector(backend)
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        create_face_detector("tensorrt")
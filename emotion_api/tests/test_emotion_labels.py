@@ -0,0 +1,79 @@
+"""Tests del registro de etiquetas y las matrices de mapeo frente a la agregación con diccionarios"""
+
+import numpy as np
+
+from app.services.emotion_labels import (
+    EMOTION_LABELS, LABEL_IDS, METRIC_CATEGORIES, METRIC_MATRIX, NUM_LABELS,
+    REALTIME_CATEGORIES, REALTIME_MATRIX, UNKNOWN_LABEL_ID,
+    encode_labels, label_counts, label_id
+)
+from app.services.realtime_snapshot import map_realtime_emotion, realtime_distribution
+
+DETECTIONS = [
+    "felicidad", "tristeza", "enojo", "frustracion", "desmotivacion", "atencion_baja",
+    "neutral", "asco", "alegria", "ira", "depresion", "satisfaccion", "miedo",
+    "sorpresa", "frustracion", "tristeza", "otra_cosa"
+]
+
+
+def old_metric_distribution(labels):
+    """Agregación anterior de ``EmotionAggregator`` (porcentajes por campo)"""
+    emotion_counts = {category: 0 for category in METRIC_CATEGORIES}
+    for emotion in labels:
+        if emotion in emotion_counts:
+            emotion_counts[emotion] += 1
+    return {category: count / len(labels) * 100 for category, count in emotion_counts.items()}
+
+
+def old_realtime_category(emotion):
+    """Cadena if/elif anterior del dashboard"""
+    if emotion in ("felicidad", "alegria", "satisfaccion"):
+        return "felicidad"
+    elif emotion in ("tristeza", "desmotivacion", "depresion"):
+        return "tristeza"
+    elif emotion in ("enojo", "frustracion", "ira"):
+        return "enojo"
+    return "neutral"
+
+
+def test_label_ids_and_unknown_labels():
+    assert [label_id(label) for label in EMOTION_LABELS] == list(range(NUM_LABELS))
+    assert label_id("no_existe") == UNKNOWN_LABEL_ID
+    assert encode_labels(["enojo", "no_existe", "neutral"]).tolist() == [
+        LABEL_IDS["enojo"], UNKNOWN_LABEL_ID, LABEL_IDS["neutral"]
+    ]
+    assert encode_labels([]).shape == (0,)
+
+
+def test_label_counts_and_weights():
+    ids = encode_labels(["tristeza", "tristeza", "enojo"])
+    counts = label_counts(ids)
+    assert counts.shape == (NUM_LABELS,)
+    assert counts[LABEL_IDS["tristeza"]] == 2
+    assert counts.sum() == 3
+
+    sums = label_counts(ids, np.array([0.5, 0.25, 0.8]))
+    assert sums[LABEL_IDS["tristeza"]] == 0.75
+    assert label_counts(np.array([], dtype=np.intp)).sum() == 0
+
+
+def test_metric_matrix_matches_dict_aggregation():
+    counts = label_counts(encode_labels(DETECTIONS))
+    percentages = counts @ METRIC_MATRIX / len(DETECTIONS) * 100
+
+    expected = old_metric_distribution(DETECTIONS)
+    assert dict(zip(METRIC_CATEGORIES, percentages.tolist())) == expected
+
+
+def test_realtime_matrix_matches_if_elif_mapping():
+    # Cada etiqueta cae en exactamente una categoría
+    assert (REALTIME_MATRIX.sum(axis=1) == 1).all()
+    for label in EMOTION_LABELS + ("no_existe",):
+        assert map_realtime_emotion(label) == old_realtime_category(label)
+
+    counts = label_counts(encode_labels(DETECTIONS))
+    distribution = realtime_distribution(counts, total_faces=20)
+    for category in REALTIME_CATEGORIES:
+        expected = sum(1 for emotion in DETECTIONS if old_realtime_category(emotion) == category)
+        assert distribution[category] == {"count": expected, "percentage": round(expected / 20 * 100, 1)}
+    assert distribution["total_detections"] == 20
@@ -0,0 +1,105 @@
+"""Tests del cambio de sesión y el guardado de la ventana de emociones de una cámara"""
+
+import threading
+import time
+
+from bson import ObjectId
+
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_storage import EmotionStorageService
+from app.services.emotion_window import session_windows
+
+FACE = (0, 0, 4, 4, 0.9)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+        return type("InsertResult", (), {"inserted_id": len(self.docs)})()
+
+
+class FakeDB:
+    def __init__(self):
+        self.emotion_metrics = FakeCollection()
+
+
+def storage_with_db(source_id):
+    storage = EmotionStorageService(source_id)
+    storage.db = FakeDB()
+    return storage
+
+
+def batch(count=1, emotion="felicidad"):
+    return DetectionBatch.from_results([FACE] * count, [(i, (emotion, 0.8)) for i in range(count)], time.time())
+
+
+def test_changing_session_saves_the_pending_window():
+    storage = storage_with_db("cam-save")
+    first, second = str(ObjectId()), str(ObjectId())
+    storage.set_session(first)
+    assert storage.add_batch(batch(2), first)
+
+    # El segundo en curso también se guarda: la sesión termina
+    storage.set_session(second)
+
+    (doc,) = storage.db.emotion_metrics.docs
+    assert doc["classroomSessions_id"] == ObjectId(first)
+    assert doc["total_faces_detected"] == 2
+    assert storage.total_detections == 0
+    assert session_windows.totals(first, seconds=60).classified == 0
+
+    storage.set_session(None)
+    assert len(storage.db.emotion_metrics.docs) == 1
+
+
+def test_batches_of_a_stale_session_are_dropped():
+    storage = storage_with_db("cam-stale")
+    first, second = str(ObjectId()), str(ObjectId())
+    storage.set_session(first)
+    storage.set_session(second)
+
+    # Un lote leído con la sesión anterior no la vuelve a asociar
+    assert not storage.add_batch(batch(), first)
+    assert storage.session_id == second
+    assert storage.total_detections == 0
+
+    # Ni se guarda de nuevo su ventana
+    storage.save_emotion_aggregation(first)
+    assert storage.db.emotion_metrics.docs == []
+    storage.set_session(None)
+
+
+def test_concurrent_batches_and_session_changes_keep_every_face():
+    storage = storage_with_db("cam-race")
+    sessions = [str(ObjectId()) for _ in range(20)]
+    storage.set_session(sessions[0])
+    added = []
+    done = threading.Event()
+
+    def persist():
+        while not done.is_set():
+            session_id = storage.session_id
+            if storage.add_batch(batch(), session_id):
+                added.append(session_id)
+
+    worker = threading.Thread(target=persist)
+    worker.start()
+    for session_id in sessions[1:]:
+        time.sleep(0.002)
+        storage.set_session(session_id)
+    done.set()
+    worker.join()
+    storage.set_session(None)
+
+    # Cada rostro agregado acaba guardado en la sesión con la que se leyó
+    saved = {}
+    for doc in storage.db.emotion_metrics.docs:
+        key = str(doc["classroomSessions_id"])
+        saved[key] = saved.get(key, 0) + doc["total_faces_detected"]
+    expected = {}
+    for session_id in added:
+        expected[session_id] = expected.get(session_id, 0) + 1
+    assert saved == expected
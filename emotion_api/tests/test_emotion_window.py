@@ -0,0 +1,93 @@
+"""Tests de las ventanas de emociones por buckets de un segundo"""
+
+import time
+
+import numpy as np
+
+from app.services.detection_batch import DetectionBatch
+from app.services.emotion_labels import LABEL_IDS, encode_labels
+from app.services.emotion_window import EmotionBucketRing, SessionWindowRegistry
+
+FELICIDAD = LABEL_IDS["felicidad"]
+TRISTEZA = LABEL_IDS["tristeza"]
+
+
+def add(ring, labels, timestamp, faces=None):
+    ring.add(encode_labels(labels), np.full(len(labels), 0.5), timestamp, faces)
+
+
+def test_totals_sum_recent_buckets():
+    ring = EmotionBucketRing(horizon_seconds=10)
+    add(ring, ["felicidad"], 1000.2)
+    add(ring, ["felicidad", "tristeza"], 1000.9, faces=3)
+    add(ring, ["tristeza"], 1003.5)
+
+    totals = ring.totals(seconds=5, now=1004.0)
+    assert totals.counts[FELICIDAD] == 2
+    assert totals.counts[TRISTEZA] == 2
+    assert totals.confidence_sums[TRISTEZA] == 1.0
+    assert totals.faces == 5
+    assert totals.classified == 4
+
+    # Los últimos 2 s sólo incluyen el segundo 1003
+    assert ring.totals(seconds=2, now=1004.0).faces == 1
+
+
+def test_totals_across_horizon_wraparound():
+    ring = EmotionBucketRing(horizon_seconds=4)
+    for second in range(1000, 1006):
+        add(ring, ["felicidad"] * (second - 999), second)
+
+    # 1000 y 1001 se sobrescribieron con 1004 y 1005 (mismos slots)
+    totals = ring.totals(seconds=10, now=1005.0)
+    assert totals.counts[FELICIDAD] == 3 + 4 + 5 + 6
+    assert ring.totals(since=1000, until=1002, now=1005.0).faces == 0
+    assert ring.totals(since=1002, until=1004, now=1005.0).faces == 3 + 4
+
+    # Un bucket sin datos recientes no cuenta aunque su slot tenga datos viejos
+    assert ring.totals(seconds=2, now=1009.0).faces == 0
+
+
+def test_stale_add_is_ignored():
+    ring = EmotionBucketRing(horizon_seconds=4)
+    add(ring, ["tristeza"], 1004)
+    # 1000 comparte slot con 1004 y ya quedó fuera del horizonte
+    add(ring, ["felicidad"], 1000)
+
+    totals = ring.totals(seconds=4, now=1004.0)
+    assert totals.counts[FELICIDAD] == 0
+    assert totals.counts[TRISTEZA] == 1
+
+
+def test_add_batch_counts_unclassified_faces():
+    ring = EmotionBucketRing(horizon_seconds=10)
+    batch = DetectionBatch.from_results(
+        [(0, 0, 10, 10, 0.9), (20, 0, 10, 10, 0.8)], [(0, ("felicidad", 0.7))], timestamp=500.0
+    )
+    ring.add_batch(batch)
+
+    totals = ring.totals(seconds=1, now=500.0)
+    assert totals.faces == 2
+    assert totals.classified == 1
+
+
+def test_registry_distribution_combines_session_cameras():
+    registry = SessionWindowRegistry(horizon_seconds=30)
+    now = time.time()
+    for source_id, labels in (("aula-1", ["felicidad", "tristeza"]), ("aula-2", ["felicidad", "enojo"])):
+        ring = registry.create_ring()
+        add(ring, labels, now)
+        registry.attach("sesion-1", source_id, ring)
+
+    distribution = registry.distribution("sesion-1", seconds=10)
+    assert distribution["total_detections"] == 4
+    assert distribution["felicidad"] == {"percentage": 50.0, "count": 2}
+    assert distribution["enojo"]["count"] == 1
+    assert distribution["window_seconds"] == 10
+    assert registry.distribution("sesion-1", seconds=999)["window_seconds"] == 30
+
+    registry.detach("sesion-1", "aula-1")
+    assert registry.totals("sesion-1", 10).faces == 2
+    registry.detach("sesion-1", "aula-2")
+    assert registry.get_stats()["sessions"] == {}
+    assert registry.distribution(None, seconds=10)["total_detections"] == 0
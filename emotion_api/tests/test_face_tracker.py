@@ -0,0 +1,151 @@
+"""Tests del tracker de rostros"""
+
+import numpy as np
+
+from app.services.face_tracker import FaceTracker, iou_matrix
+
+
+class CountingClassifier:
+    """Clasificador falso que cuenta los rostros que recibe"""
+
+    def __init__(self, label="felicidad"):
+        self.label = label
+        self.calls = []
+
+    def classify_batch(self, face_rois):
+        self.calls.append(len(face_rois))
+        return [(self.label, 0.9) for _ in face_rois]
+
+
+def face_roi(value=100):
+    return np.full((48, 48, 3), value, dtype=np.uint8)
+
+
+def test_iou_matrix():
+    boxes = np.array([[0, 0, 10, 10]])
+    ious = iou_matrix(boxes, np.array([[0, 0, 10, 10], [5, 0, 10, 10], [20, 20, 5, 5]]))
+    np.testing.assert_allclose(ious, [[1.0, 50 / 150, 0.0]])
+    assert iou_matrix(boxes, np.zeros((0, 4))).shape == (1, 0)
+
+
+def test_update_keeps_ids_for_overlapping_boxes():
+    tracker = FaceTracker(iou_threshold=0.3)
+    first = tracker.update([(10, 10, 50, 50, 0.9), (200, 10, 50, 50, 0.8)], timestamp=0.0)
+    second = tracker.update([(205, 12, 50, 50, 0.8), (12, 11, 50, 50, 0.9)], timestamp=0.1)
+
+    assert [track.track_id for track in second] == [first[1].track_id, first[0].track_id]
+    assert second[0].box == (205, 12, 50, 50)
+
+
+def test_update_creates_and_expires_tracks():
+    tracker = FaceTracker(iou_threshold=0.3, max_missed=2)
+    (track,) = tracker.update([(10, 10, 50, 50, 0.9)], timestamp=0.0)
+    (other,) = tracker.update([(300, 300, 50, 50, 0.9)], timestamp=0.1)
+    assert other.track_id != track.track_id
+
+    for i in range(3):
+        tracker.update([], timestamp=0.2 + i * 0.1)
+    assert tracker.tracks == {}
+    assert not tracker.has_tracks()
+
+
+def test_classify_reuses_label_until_reclassify_interval():
+    tracker = FaceTracker(reclassify_every=3, appearance_threshold=255)
+    classifier = CountingClassifier()
+    face = (10, 10, 50, 50, 0.9)
+
+    for i in range(9):
+        _, emotions = tracker.classify([face], [face_roi()], classifier, timestamp=i * 0.1)
+        assert emotions == [("felicidad", 0.9)]
+
+    # Tres frames entre reclasificaciones (0, 4 y 8); el resto reutiliza la etiqueta
+    assert classifier.calls == [1, 1, 1]
+    stats = tracker.get_stats()
+    assert stats["classified"] == 3
+    assert stats["carried_forward"] == 6
+
+
+def test_classify_reclassifies_on_appearance_change():
+    tracker = FaceTracker(reclassify_every=100, appearance_threshold=12.0)
+    classifier = CountingClassifier()
+    face = (10, 10, 50, 50, 0.9)
+
+    tracker.classify([face], [face_roi(100)], classifier, timestamp=0.0)
+    tracker.classify([face], [face_roi(105)], classifier, timestamp=0.1)
+    assert classifier.calls == [1]
+
+    tracker.classify([face], [face_roi(180)], classifier, timestamp=0.2)
+    assert classifier.calls == [1, 1]
+
+
+def test_predict_scales_velocity_by_elapsed_time():
+    tracker = FaceTracker()
+    tracker.update([(100, 100, 50, 50, 0.9)], timestamp=0.0)
+    # 10 px en 0.1 s: 100 px/s, suavizado a la mitad en la primera asociación
+    tracker.update([(110, 100, 50, 50, 0.9)], timestamp=0.1)
+
+    (near,) = tracker.predict(timestamp=0.2)
+    (far,) = tracker.predict(timestamp=0.5)
+    assert near == (115, 100, 50, 50, 0.9)
+    assert far == (130, 100, 50, 50, 0.9)
+    # Un instante anterior a la última posición no retrocede la caja
+    assert tracker.predict(timestamp=0.05)[0][:2] == (110, 100)
+
+
+def test_predict_skips_missed_tracks():
+    tracker = FaceTracker()
+    tracker.update([(100, 100, 50, 50, 0.9)], timestamp=0.0)
+    assert tracker.has_tracks()
+    tracker.update([], timestamp=0.1)
+    assert tracker.predict(timestamp=0.2) == []
+    assert not tracker.has_tracks()
+
+
+def test_predicted_frames_do_not_update_tracks():
+    tracker = FaceTracker(reclassify_every=100, appearance_threshold=255)
+    classifier = CountingClassifier()
+    tracker.classify([(10, 10, 50, 50, 0.9)], [face_roi()], classifier, timestamp=0.0)
+    tracker.classify([(20, 10, 50, 50, 0.9)], [face_roi()], classifier, timestamp=0.1)
+    (track,) = tracker.tracks.values()
+    velocity = track.velocity.copy()
+
+    predicted = tracker.predict(timestamp=0.2)
+    tracks, emotions = tracker.classify(predicted, [face_roi()], classifier, timestamp=0.2, detected=False)
+
+    assert tracks == [track]
+    assert emotions == [("felicidad", 0.9)]
+    assert classifier.calls == [1]
+    # La caja medida, la velocidad y el instante no cambian con una predicción
+    assert track.box == (20, 10, 50, 50)
+    assert track.updated_at == 0.1
+    np.testing.assert_allclose(track.velocity, velocity)
+
+
+def test_face_leaving_frame_expires_within_max_missed_detected_frames():
+    tracker = FaceTracker(max_missed=2, reclassify_every=100, appearance_threshold=255)
+    classifier = CountingClassifier()
+    tracker.classify([(10, 10, 50, 50, 0.9)], [face_roi()], classifier, timestamp=0.0)
+
+    timestamp = 0.0
+    for _ in range(3):
+        # Varios frames sin detector entre cada detección (el rostro ya salió del encuadre)
+        for _ in range(4):
+            timestamp += 0.05
+            predicted = tracker.predict(timestamp)
+            if predicted:
+                tracker.classify(predicted, [face_roi()] * len(predicted), classifier, timestamp, detected=False)
+        timestamp += 0.05
+        tracker.classify([], [], classifier, timestamp)
+
+    assert tracker.tracks == {}
+    assert tracker.predict(timestamp + 0.05) == []
+
+
+def test_predicted_box_without_track_is_classified_without_creating_one():
+    tracker = FaceTracker()
+    classifier = CountingClassifier("tristeza")
+    tracks, emotions = tracker.classify([(10, 10, 50, 50, 0.9)], [face_roi()], classifier, detected=False)
+
+    assert tracks == [None]
+    assert emotions == [("tristeza", 0.9)]
+    assert tracker.tracks == {}
@@ -0,0 +1,59 @@
+"""Tests de los perfiles de stream y la codificación compartida del broadcaster"""
+
+import cv2
+import numpy as np
+
+from app.services.frame_broadcaster import FrameBroadcaster, StreamProfile
+
+
+def test_from_params_defaults():
+    profile = StreamProfile.from_params()
+    assert profile == StreamProfile(max_width=0, fps=0.0, quality=85, annotated=False)
+
+    profile = StreamProfile.from_params(default_quality=70, default_annotated=True)
+    assert profile.quality == 70
+    assert profile.annotated is True
+
+
+def test_from_params_clamps_ranges():
+    low = StreamProfile.from_params(max_width=10, fps=0.1, quality=1, annotated=False)
+    assert (low.max_width, low.fps, low.quality) == (64, 0.5, 10)
+
+    high = StreamProfile.from_params(max_width=4000, fps=500, quality=100)
+    assert (high.max_width, high.fps, high.quality) == (4000, 60.0, 95)
+
+
+def test_variant_key_ignores_fps():
+    slow = StreamProfile.from_params(max_width=320, fps=2, quality=60)
+    fast = StreamProfile.from_params(max_width=320, fps=30, quality=60)
+    assert slow.variant_key == fast.variant_key == (320, 60, False)
+
+
+def test_get_jpeg_encodes_once_per_version():
+    broadcaster = FrameBroadcaster(quality=80)
+    profile = broadcaster.profile(max_width=64)
+    broadcaster.subscribe(profile)
+    broadcaster.publish(np.zeros((120, 160, 3), dtype=np.uint8))
+
+    first = broadcaster.get_jpeg(profile)
+    second = broadcaster.get_jpeg(profile)
+    assert first.data is not None
+    assert second.data is first.data
+    assert broadcaster.frames_encoded == 1
+
+    decoded = cv2.imdecode(np.frombuffer(first.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape[1] == 64
+
+    broadcaster.publish(np.zeros((120, 160, 3), dtype=np.uint8))
+    assert broadcaster.get_jpeg(profile).version == 2
+    assert broadcaster.frames_encoded == 2
+
+
+def test_get_jpeg_after_clear_returns_nothing():
+    broadcaster = FrameBroadcaster()
+    broadcaster.subscribe()
+    broadcaster.publish(np.zeros((32, 32, 3), dtype=np.uint8))
+    assert broadcaster.get_jpeg().data is not None
+
+    broadcaster.clear()
+    assert broadcaster.get_jpeg().data is None
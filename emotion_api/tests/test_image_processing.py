@@ -0,0 +1,35 @@
+"""Tests de la reducción de resolución y el escalado de detecciones"""
+
+import numpy as np
+
+from app.utils.image_processing import downscale_to_width, scale_detections
+
+
+def test_downscale_to_width_keeps_aspect_ratio():
+    image = np.zeros((480, 1280, 3), dtype=np.uint8)
+    resized, scale = downscale_to_width(image, 640)
+    assert resized.shape == (240, 640, 3)
+    assert scale == 0.5
+
+
+def test_downscale_to_width_noop():
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    assert downscale_to_width(image, 0)[0] is image
+    resized, scale = downscale_to_width(image, 800)
+    assert resized is image
+    assert scale == 1.0
+
+
+def test_scale_detections_to_full_resolution():
+    faces = [(10, 20, 30, 40, 0.9)]
+    assert scale_detections(faces, (240, 320, 3), (480, 640, 3)) == [(20, 40, 60, 80, 0.9)]
+    # Misma forma: sin cambios
+    assert scale_detections(faces, (240, 320), (240, 320, 3)) == faces
+
+
+def test_scale_detections_clips_to_bounds():
+    faces = [(300, 200, 40, 60, 0.8), (-5, -5, 10, 10, 0.7), (0, 0, 0, 5, 0.6)]
+    scaled = scale_detections(faces, (240, 320), (480, 640))
+
+    # Las cajas se recortan a la imagen y las vacías se descartan
+    assert scaled == [(600, 400, 40, 80, 0.8), (0, 0, 10, 10, 0.7)]
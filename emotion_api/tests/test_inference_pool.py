@@ -0,0 +1,48 @@
+"""Tests del límite de concurrencia del servicio de inferencia"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.inference_pool import (
+    InferenceSaturatedError, InferenceService, InferenceUnavailableError
+)
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_in_executor():
+    service = InferenceService(workers=0, max_pending=2, timeout=1.0)
+    assert await service.run(sum, [1, 2, 3]) == 6
+    assert service.pending == 0
+    assert service.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_timed_out_task_keeps_its_slot_until_it_finishes():
+    service = InferenceService(workers=0, max_pending=1, timeout=0.01)
+    release = threading.Event()
+
+    with pytest.raises(InferenceUnavailableError):
+        await service.run(release.wait, 1.0)
+
+    # La tarea sigue ejecutándose: el hueco no se libera con el timeout
+    assert service.pending == 1
+    with pytest.raises(InferenceSaturatedError):
+        await service.run(sum, [1])
+
+    release.set()
+    for _ in range(100):
+        if service.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert service.pending == 0
+    assert await service.run(sum, [1]) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_without_started_pool_is_unavailable():
+    service = InferenceService(workers=2)
+    with pytest.raises(InferenceUnavailableError):
+        await service.run(sum, [1])
+    assert service.pending == 0
@@ -0,0 +1,82 @@
+"""Tests de los deltas y la combinación de mensajes de actualizaciones en vivo"""
+
+from app.services.live_updates import compute_delta, merge_delta, merge_messages, without_path
+
+
+def apply_message(state, message):
+    """Lo que hace el cliente: primero ``removed`` y después ``data``"""
+    if message["type"] == "snapshot":
+        return message["data"]
+    for path in message["removed"]:
+        state = without_path(state, path)
+    return merge_delta(state, message["data"])
+
+
+def delta_message(old, new, seq):
+    data, removed = compute_delta(old, new)
+    return {"type": "delta", "topic": "camera:default", "seq": seq, "data": data, "removed": removed}
+
+
+def test_compute_delta_only_changed_keys():
+    old = {"faces": 2, "emotions": {"felicidad": 50.0, "tristeza": 50.0}, "fps": 15}
+    new = {"faces": 3, "emotions": {"felicidad": 50.0, "tristeza": 25.0, "enojo": 25.0}, "fps": 15}
+
+    assert compute_delta(old, new) == ({"faces": 3, "emotions": {"tristeza": 25.0, "enojo": 25.0}}, [])
+
+
+def test_compute_delta_removed_keys_and_non_dicts():
+    assert compute_delta({"a": 1, "b": 2}, {"a": 1}) == ({}, [["b"]])
+    assert compute_delta({"a": {"x": 1, "y": 2}}, {"a": {"x": 1}}, ("window",)) == ({"a": {}}, [["window", "a", "y"]])
+    assert compute_delta({"a": 1}, {"a": 1}) == ({}, [])
+    assert compute_delta([1, 2], [3]) == ([3], [])
+    assert compute_delta({"a": {"x": 1}}, {"a": [1]}) == ({"a": [1]}, [])
+
+
+def test_compute_delta_keeps_real_none_values():
+    old = {"camera_id": "default", "session_id": "abc"}
+    new = {"camera_id": "default", "session_id": None}
+
+    data, removed = compute_delta(old, new)
+    assert data == {"session_id": None}
+    assert removed == []
+    assert apply_message(old, delta_message(old, new, 1)) == new
+
+
+def test_merged_messages_equivalent_to_consecutive_deltas():
+    first = {"faces": 2, "emotions": {"felicidad": 50.0, "tristeza": 50.0}, "session_id": "abc"}
+    second = {"faces": 3, "emotions": {"felicidad": 40.0, "tristeza": 50.0, "enojo": 10.0}, "session_id": None}
+    third = {"faces": 3, "emotions": {"felicidad": 40.0, "enojo": 60.0}}
+    fourth = {"faces": 3, "emotions": {"felicidad": 40.0, "enojo": 60.0}, "session_id": "def"}
+
+    states = [first, second, third, fourth]
+    messages = [delta_message(old, new, seq) for seq, (old, new) in enumerate(zip(states, states[1:]), 1)]
+    merged = messages[0]
+    for message in messages[1:]:
+        merged = merge_messages(merged, message)
+
+    assert merged["seq"] == 3
+    assert apply_message(first, merged) == fourth
+    assert apply_message(first, merge_messages(messages[0], messages[1])) == third
+    # Los mensajes en cola no se modifican
+    assert messages[0]["data"] == {"faces": 3, "emotions": {"felicidad": 40.0, "enojo": 10.0}, "session_id": None}
+
+
+def test_merge_messages():
+    queued = {"type": "delta", "topic": "camera:default", "seq": 4, "data": {"distribution": {"faces": 1}}, "removed": []}
+    delta = {"type": "delta", "topic": "camera:default", "seq": 5, "data": {"camera_status": {"fps": 12}},
+             "removed": [["distribution", "faces"]]}
+    merged = merge_messages(queued, delta)
+    assert merged["seq"] == 5
+    assert merged["data"] == {"distribution": {}, "camera_status": {"fps": 12}}
+    assert merged["removed"] == [["distribution", "faces"]]
+    # El mensaje en cola no se modifica
+    assert queued["data"] == {"distribution": {"faces": 1}}
+
+    snapshot = {"type": "snapshot", "topic": "camera:default", "seq": 6, "data": {"distribution": {"faces": 0, "fps": 9}}}
+    assert merge_messages(merged, snapshot) is snapshot
+
+    # Un delta sobre un snapshot aún en cola deja el estado completo
+    merged = merge_messages(snapshot, {**delta, "seq": 7})
+    assert merged == {"type": "snapshot", "topic": "camera:default", "seq": 7,
+                      "data": {"distribution": {"fps": 9}, "camera_status": {"fps": 12}}}
+    assert snapshot["data"] == {"distribution": {"faces": 0, "fps": 9}}
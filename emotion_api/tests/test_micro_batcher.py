@@ -0,0 +1,86 @@
+"""Tests del planificador de micro-lotes"""
+
+import asyncio
+
+import pytest
+
+from app.services.inference_pool import InferenceSaturatedError
+from app.services.micro_batcher import MicroBatcher
+
+
+class RecordingRunner:
+    """``run_batch`` falso que guarda los lotes y puede retenerlos"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await self.release.wait()
+        return [item * 10 for item in items]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_batch_is_full():
+    runner = RecordingRunner()
+    batcher = MicroBatcher(runner, max_batch_size=3, max_wait_ms=10_000)
+
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+
+    assert results == [0, 10, 20]
+    assert runner.batches == [[0, 1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_flushes_partial_batch_after_max_wait():
+    runner = RecordingRunner()
+    batcher = MicroBatcher(runner, max_batch_size=8, max_wait_ms=5)
+
+    results = await asyncio.wait_for(asyncio.gather(batcher.submit(1), batcher.submit(2)), timeout=1.0)
+
+    assert results == [10, 20]
+    assert runner.batches == [[1, 2]]
+    assert batcher.get_stats()["batch_size_histogram"] == {"2": 1}
+
+
+@pytest.mark.asyncio
+async def test_remainder_waits_for_next_batch():
+    runner = RecordingRunner()
+    batcher = MicroBatcher(runner, max_batch_size=2, max_wait_ms=5)
+
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(3))), timeout=1.0)
+
+    assert results == [0, 10, 20]
+    assert runner.batches == [[0, 1], [2]]
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_in_flight_frames_reach_limit():
+    runner = RecordingRunner()
+    runner.release.clear()
+    batcher = MicroBatcher(runner, max_batch_size=2, max_wait_ms=10_000, max_queued=2)
+
+    in_flight = [asyncio.ensure_future(batcher.submit(i)) for i in range(2)]
+    await asyncio.sleep(0.01)
+    assert runner.batches == [[0, 1]]
+
+    # El lote sigue en curso: sus frames cuentan para el límite (HTTP 429)
+    with pytest.raises(InferenceSaturatedError):
+        await batcher.submit(2)
+
+    runner.release.set()
+    assert await asyncio.gather(*in_flight) == [0, 10]
+    assert batcher.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_error_reaches_every_caller():
+    async def saturated(items):
+        raise InferenceSaturatedError("pool lleno")
+
+    batcher = MicroBatcher(saturated, max_batch_size=2, max_wait_ms=10_000)
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    assert all(isinstance(result, InferenceSaturatedError) for result in results)
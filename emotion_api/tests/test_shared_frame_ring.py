@@ -0,0 +1,163 @@
+"""Tests del anillo de frames en memoria compartida"""
+
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from app.utils.shared_frame_ring import SharedFrameRing
+
+SHAPE = (4, 6, 3)
+
+
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create(4, SHAPE)
+    yield ring
+    ring.close()
+
+
+def test_write_assigns_increasing_sequences(ring):
+    assert ring.read_latest() == (0, None)
+    assert [ring.write(frame(i)) for i in range(3)] == [1, 2, 3]
+    seq, latest = ring.read_latest()
+    assert seq == 3
+    assert (latest == 2).all()
+
+
+def test_wraparound_invalidates_overwritten_slots(ring):
+    views = {}
+    for i in range(1, 7):
+        seq = ring.write(frame(i))
+        views[seq] = ring.read(seq)
+
+    # Con 4 slots, los frames 1 y 2 se reescribieron con 5 y 6
+    assert [ring.is_valid(seq) for seq in range(1, 7)] == [False, False, True, True, True, True]
+    assert ring.read(1) is None
+    assert ring.timestamp(2) is None
+    # La vista antigua apunta ahora al frame nuevo: por eso hay que validar tras usarla
+    assert (views[1] == 5).all()
+    assert (ring.read(6) == 6).all()
+
+
+def test_read_returns_view_or_copy(ring):
+    seq = ring.write(frame(9), captured_at=123.0)
+    view = ring.read(seq)
+    copy = ring.read(seq, copy=True)
+
+    assert ring.owns(view)
+    assert not ring.owns(copy)
+    assert ring.timestamp(seq) == 123.0
+
+    for i in range(4):
+        ring.write(frame(i))
+    assert (copy == 9).all()
+
+
+def test_write_resizes_mismatched_frames(ring):
+    seq = ring.write(np.full((8, 12, 3), 7, dtype=np.uint8))
+    assert ring.read(seq).shape == SHAPE
+    assert ring.frames_resized == 1
+
+
+def test_invalid_sequences_and_closed_ring():
+    ring = SharedFrameRing.create(2, SHAPE)
+    seq = ring.write(frame(1))
+    assert not ring.is_valid(0)
+    assert not ring.is_valid(seq + 1)
+
+    ring.close()
+    assert not ring.is_valid(seq)
+    assert ring.read(seq) is None
+    assert ring.write_seq == 0
+    assert not ring.owns(frame(1))
+
+
+def test_reader_tracks_lag_and_skips(ring):
+    ring.write(frame(0))
+    reader = ring.reader("detección")
+    # Empieza en el frame actual
+    assert reader.lag == 0
+    assert reader.read_next() == (0, None)
+
+    for i in range(1, 4):
+        ring.write(frame(i))
+    assert reader.lag == 3
+    seq, view = reader.read_next()
+    assert seq == 2
+    assert (view == 1).all()
+
+    # Se queda atrás más de lo que cabe en el anillo: salta al más antiguo disponible
+    for i in range(4, 10):
+        ring.write(frame(i))
+    seq, view = reader.read_next()
+    assert seq == 7
+    assert reader.skipped == 4
+    assert (view == 6).all()
+
+    seq, view = reader.read_latest(copy=True)
+    assert seq == 10
+    assert reader.skipped == 6
+    assert reader.lag == 0
+    assert not ring.owns(view)
+    assert ring.get_stats()["readers"] == [
+        {"name": "detección", "last_seq": 10, "lag": 0, "frames_read": 3, "skipped": 6}
+    ]
+
+
+def test_attach_by_name_shares_slots(ring):
+    attached = SharedFrameRing.attach(ring.name)
+    try:
+        assert not attached.owner
+        assert attached.slots == ring.slots
+        assert attached.shape == ring.shape
+
+        seq = ring.write(frame(5), captured_at=7.0)
+        assert (attached.read(seq) == 5).all()
+        assert attached.timestamp(seq) == 7.0
+    finally:
+        attached.close()
+
+    # Cerrar un anillo adjunto no elimina el bloque
+    assert ring.read(seq) is not None
+
+
+def _read_in_child(name, results):
+    ring = SharedFrameRing.attach(name)
+    reader = ring.reader("proceso")
+    results.put("listo")
+    received = []
+    while len(received) < 3:
+        seq, view = reader.read_next()
+        if view is None:
+            continue
+        value = int(view[0, 0, 0])
+        # Vista sin copia: se valida después de usarla
+        if ring.is_valid(seq):
+            received.append((seq, value))
+    results.put((received, reader.skipped))
+    ring.close()
+
+
+def test_reader_in_another_process(ring):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    child = context.Process(target=_read_in_child, args=(ring.name, results))
+    child.start()
+    try:
+        assert results.get(timeout=30) == "listo"
+        for i in range(1, 4):
+            ring.write(frame(i * 10))
+            time.sleep(0.05)
+        received, skipped = results.get(timeout=30)
+    finally:
+        child.join(timeout=30)
+
+    assert child.exitcode == 0
+    assert received == [(1, 10), (2, 20), (3, 30)]
+    assert skipped == 0
@@ -0,0 +1,101 @@
+"""Tests del transporte binario de video: cabecera y calidad adaptativa"""
+
+import struct
+from types import SimpleNamespace
+
+from app.services.frame_broadcaster import FrameBroadcaster, StreamProfile
+from app.services.video_transport import (
+    MIN_ADAPTIVE_QUALITY, QUALITY_STEP, RECOVERY_FRAMES, VideoSubscription, encode_video_message, video_key
+)
+
+
+def decode_video_message(message):
+    """Lo que hace el cliente con cada mensaje binario"""
+    camera_length, seq = struct.unpack_from("!HI", message)
+    camera_id = message[6:6 + camera_length].decode("utf-8")
+    return camera_id, seq, message[6 + camera_length:]
+
+
+def test_header_packs_camera_and_sequence():
+    message = encode_video_message("aula-1", 42, b"\xff\xd8jpeg\xff\xd9")
+
+    assert message[:6] == b"\x00\x06\x00\x00\x00\x2a"
+    assert decode_video_message(message) == ("aula-1", 42, b"\xff\xd8jpeg\xff\xd9")
+
+
+def test_header_utf8_camera_id_and_sequence_wraparound():
+    camera_id, seq, jpeg = decode_video_message(encode_video_message("cámara", 2 ** 32 + 5, b"x"))
+
+    assert camera_id == "cámara"
+    assert seq == 5
+    assert jpeg == b"x"
+    assert video_key("cámara") == "video:cámara"
+
+
+def subscription(quality=80, adaptive=True):
+    broadcaster = FrameBroadcaster(quality=quality)
+    profile = StreamProfile(max_width=320, fps=10, quality=quality)
+    video = VideoSubscription(
+        connections=None, websocket=None, camera_id="aula-1",
+        entry=SimpleNamespace(broadcaster=broadcaster), profile=profile, adaptive=adaptive
+    )
+    # Lo que hace _run al empezar
+    broadcaster.subscribe(video.profile)
+    return video, broadcaster
+
+
+def variants(broadcaster):
+    return {(variant["quality"], variant["subscribers"]) for variant in broadcaster.get_stats()["variants"]}
+
+
+def test_adaptive_quality_steps_down_while_lagging():
+    video, broadcaster = subscription(quality=80)
+
+    video._adapt(lagging=True)
+    assert video.profile.quality == 80 - QUALITY_STEP
+    assert video.profile.max_width == 320 and video.profile.fps == 10
+    # El cliente pasa a la variante nueva y la anterior se descarta
+    assert variants(broadcaster) == {(80 - QUALITY_STEP, 1)}
+
+    for _ in range(10):
+        video._adapt(lagging=True)
+    assert video.profile.quality == MIN_ADAPTIVE_QUALITY
+    assert variants(broadcaster) == {(MIN_ADAPTIVE_QUALITY, 1)}
+    assert broadcaster.subscribers == 1
+
+
+def test_adaptive_quality_recovers_after_clean_frames():
+    video, broadcaster = subscription(quality=80)
+    video._adapt(lagging=True)
+    video._adapt(lagging=True)
+    assert video.profile.quality == 60
+
+    for _ in range(RECOVERY_FRAMES - 1):
+        video._adapt(lagging=False)
+    assert video.profile.quality == 60
+
+    video._adapt(lagging=False)
+    assert video.profile.quality == 70
+
+    # Un atraso reinicia la cuenta de frames limpios
+    for _ in range(RECOVERY_FRAMES - 1):
+        video._adapt(lagging=False)
+    video._adapt(lagging=True)
+    for _ in range(RECOVERY_FRAMES - 1):
+        video._adapt(lagging=False)
+    assert video.profile.quality == 60
+
+    # Nunca supera la calidad negociada
+    for _ in range(RECOVERY_FRAMES * 5):
+        video._adapt(lagging=False)
+    assert video.profile.quality == 80
+    assert variants(broadcaster) == {(80, 1)}
+
+
+def test_quality_is_fixed_without_adaptive_mode():
+    video, broadcaster = subscription(quality=80, adaptive=False)
+    for _ in range(5):
+        video._adapt(lagging=True)
+
+    assert video.profile.quality == 80
+    assert variants(broadcaster) == {(80, 1)}
@@ -22,6 +22,39 @@ interface ClassroomSession {
 }
 
 
+// Cámara cuyo tópico en vivo sigue la página
+const CAMERA_ID = 'default'
+
+type LiveState = Record<string, any>
+
+const isPlainObject = (value: unknown): value is LiveState =>
+  typeof value === 'object' && value !== null && !Array.isArray(value)
+
+// Copia de state sin la clave de path
+const withoutPath = (state: any, path: string[]): any => {
+  if (path.length === 0 || !isPlainObject(state) || !(path[0] in state)) return state
+  const copy = { ...state }
+  if (path.length === 1) {
+    delete copy[path[0]]
+  } else {
+    copy[path[0]] = withoutPath(state[path[0]], path.slice(1))
+  }
+  return copy
+}
+
+const mergeLiveData = (state: any, data: any): any => {
+  if (!isPlainObject(state) || !isPlainObject(data)) return data
+  const merged = { ...state }
+  for (const [key, value] of Object.entries(data)) {
+    merged[key] = key in state ? mergeLiveData(state[key], value) : value
+  }
+  return merged
+}
+
+// Aplica un delta de /ws: primero las claves eliminadas y después los cambios
+const applyLiveDelta = (state: LiveState, data: LiveState, removed: string[][] = []): LiveState =>
+  mergeLiveData(removed.reduce(withoutPath, state), data)
+
 const ClassroomMonitoring: React.FC = () => {
   const [searchParams] = useSearchParams()
   const [classroomSessions, setClassroomSessions] = useState<ClassroomSession[]>([])
@@ -84,70 +117,9 @@ const ClassroomMonitoring: React.FC = () => {
     
     return () => clearInterval(durationInterval)
     
-    // Actualización automática cada 30 segundos
-    const interval = setInterval(() => {
-      console.log('🔄 Actualizando datos automáticamente...')
-      loadActiveSessions()
-      if (currentSession) {
-        checkCameraStatus()
-        fetchEmotionData()
-      }
-    }, 30000) // 30 segundos
-    
-    // WebSocket para actualizaciones en tiempo real
-    const ws = new WebSocket('ws://127.0.0.1:8000/ws')
-    
-    ws.onopen = () => {
-      console.log('🔌 Conectado al WebSocket')
-    }
-    
-    ws.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data)
-        console.log('📡 Datos recibidos del WebSocket:', data)
-        
-        // Actualizar sesiones si hay cambios
-        if (data.type === 'session_update') {
-          loadActiveSessions()
-        }
-        
-        // Actualizar datos emocionales si hay cambios
-        if (data.type === 'emotion_update' && currentSession) {
-          fetchEmotionData()
-        }
-        
-        // Actualizar estado de cámara si hay cambios
-        if (data.type === 'camera_update' && currentSession) {
-          checkCameraStatus()
-        }
-      } catch (err) {
-        console.error('Error procesando mensaje WebSocket:', err)
-      }
-    }
-    
-    ws.onerror = (error) => {
-      console.error('❌ Error en WebSocket:', error)
-    }
-    
-    ws.onclose = () => {
-      console.log('🔌 WebSocket desconectado')
-    }
-    
-    // Limpiar el intervalo y WebSocket cuando el componente se desmonte
-    return () => {
-      clearInterval(interval)
-      ws.close()
-    }
-    
     // Obtener aula desde URL
     searchParams.get('classroom')
     
-    // Verificar estado de cámara cada 2 segundos
-    const cameraInterval = setInterval(checkCameraStatus, 2000)
-    
-    // Obtener datos emocionales cada 1 segundo para tiempo real
-    const emotionInterval = setInterval(fetchEmotionData, 1000)
-    
     // Listener para detectar salida de pantalla completa
      const handleFullscreenChange = () => {
        if (!document.fullscreenElement && videoSize === 'fullscreen') {
@@ -167,8 +139,6 @@ const ClassroomMonitoring: React.FC = () => {
      document.addEventListener('keydown', handleKeyDown)
      
     return () => {
-      clearInterval(cameraInterval)
-      clearInterval(emotionInterval)
       document.removeEventListener('fullscreenchange', handleFullscreenChange)
       document.removeEventListener('keydown', handleKeyDown)
     }
@@ -189,6 +159,42 @@ const ClassroomMonitoring: React.FC = () => {
      }
    }, [cameraActive])
 
+   // Distribución y estado de la cámara en vivo por /ws (sin sondeo)
+   useEffect(() => {
+     let topicState: LiveState = {}
+     const ws = new WebSocket(`ws://127.0.0.1:8000/ws?topics=camera:${CAMERA_ID}`)
+
+     ws.onmessage = (event) => {
+       try {
+         const message = JSON.parse(event.data)
+         if (message.type === 'snapshot') {
+           topicState = message.data
+         } else if (message.type === 'delta') {
+           topicState = applyLiveDelta(topicState, message.data, message.removed)
+         } else {
+           return
+         }
+
+         const status = topicState.camera_status
+         if (status) {
+           setCameraActive(status.active)
+         }
+         if (topicState.distribution) {
+           const distribution = topicState.distribution
+           setEmotionData(previous => ({ ...previous, ...distribution, camera_active: status?.active ?? previous.camera_active }))
+         }
+       } catch (err) {
+         console.error('Error procesando mensaje WebSocket:', err)
+       }
+     }
+
+     ws.onerror = (error) => {
+       console.error('❌ Error en WebSocket:', error)
+     }
+
+     return () => ws.close()
+   }, [])
+
   const loadClassrooms = async () => {
     try {
       const response = await fetch('http://127.0.0.1:8000/api/classroom/list')